@@ -1,4 +1,5 @@
 ﻿# alembic/env.py
+import re
 import sys
 from pathlib import Path
 
@@ -24,6 +25,21 @@ import app.models  # ¡Importante! registra todos tus modelos en SQLModel.metada
 # Metadata objetivo (para autogenerate)
 target_metadata = SQLModel.metadata
 
+# Particiones de movimiento: las crea/archiva movimiento_asegurar_particiones()
+# y app/core/particiones.py, no el modelo. Autogenerate no debe tocarlas.
+_PARTICION_MOVIMIENTO = re.compile(r"^movimiento_(p\d{6}|default)$")
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """
+    Excluye de autogenerate/check las particiones de movimiento y sus índices.
+    """
+    if type_ == "table":
+        return not _PARTICION_MOVIMIENTO.match(name)
+    if type_ == "index" and object.table is not None:
+        return not _PARTICION_MOVIMIENTO.match(object.table.name)
+    return True
+
 
 def _is_sqlite_url(url: str) -> bool:
     return url.startswith("sqlite")
@@ -49,6 +65,7 @@ def run_migrations_offline() -> None:
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
         compare_server_default=True,
+        include_object=include_object,
         # En SQLite conviene batch mode para ciertas operaciones ALTER
         render_as_batch=_is_sqlite_url(url),
     )
@@ -72,6 +89,7 @@ def run_migrations_online() -> None:
             target_metadata=target_metadata,
             compare_type=True,
             compare_server_default=True,
+            include_object=include_object,
             render_as_batch=is_sqlite,
         )
         with context.begin_transaction():
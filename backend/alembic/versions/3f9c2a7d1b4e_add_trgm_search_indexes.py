@@ -0,0 +1,46 @@
+"""add_trgm_search_indexes
+
+Revision ID: 3f9c2a7d1b4e
+Revises: 7d0bddf01669
+Create Date: 2026-10-17 09:12:40.118204
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b4e'
+down_revision = '7d0bddf01669'
+branch_labels = None
+depends_on = None
+
+# (índice, tabla, expresión) — las columnas CITEXT se indexan como ::text,
+# que es la expresión que usa app/core/search.py al filtrar.
+TRGM_INDEXES = [
+    ("ix_equipo_identidad_trgm", "equipo", "identidad"),
+    ("ix_equipo_numero_serie_trgm", "equipo", "numero_serie"),
+    ("ix_equipo_tipo_trgm", "equipo", "tipo"),
+    ("ix_incidencia_titulo_trgm", "incidencia", "titulo"),
+    ("ix_incidencia_descripcion_trgm", "incidencia", "descripcion"),
+    ("ix_usuario_username_trgm", "usuario", "(username::text)"),
+    ("ix_usuario_email_trgm", "usuario", "(email::text)"),
+    ("ix_usuario_nombre_trgm", "usuario", "nombre"),
+    ("ix_usuario_apellidos_trgm", "usuario", "apellidos"),
+    ("ix_ubicacion_nombre_trgm", "ubicacion", "nombre"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, expr in TRGM_INDEXES:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({expr} gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    for name, _table, _expr in reversed(TRGM_INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    # La extensión pg_trgm se deja instalada (puede usarla otro esquema)
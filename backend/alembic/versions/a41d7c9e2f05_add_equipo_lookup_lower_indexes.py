@@ -0,0 +1,27 @@
+"""add_equipo_lookup_lower_indexes
+
+Revision ID: a41d7c9e2f05
+Revises: 3f9c2a7d1b4e
+Create Date: 2026-10-17 10:03:18.552310
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41d7c9e2f05'
+down_revision = '3f9c2a7d1b4e'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Las búsquedas por NFC/identidad filtran por lower(col): índices funcionales
+    # para los fallos de caché (app/core/cache.py)
+    op.create_index('ix_equipo_nfc_tag_lower', 'equipo', [sa.text('lower(nfc_tag)')], unique=False)
+    op.create_index('ix_equipo_identidad_lower', 'equipo', [sa.text('lower(identidad)')], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_equipo_identidad_lower', table_name='equipo')
+    op.drop_index('ix_equipo_nfc_tag_lower', table_name='equipo')
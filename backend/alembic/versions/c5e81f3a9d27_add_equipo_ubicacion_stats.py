@@ -0,0 +1,101 @@
+"""add_equipo_ubicacion_stats
+
+Revision ID: c5e81f3a9d27
+Revises: a41d7c9e2f05
+Create Date: 2026-10-17 12:41:09.118204
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e81f3a9d27'
+down_revision = 'a41d7c9e2f05'
+branch_labels = None
+depends_on = None
+
+# Copia congelada de app/models/stats.py (STATS_SPECS / trigger_ddl): la
+# migración no debe cambiar si el modelo evoluciona.
+_SPECS = [
+    ("equipo", "equipo_stats", [
+        ("total", "''", "1"),
+        ("estado", "coalesce(r.estado, '')", "1"),
+        ("tipo", "coalesce(r.tipo, '')", "1"),
+        ("sin_ubicacion", "''", "CASE WHEN r.ubicacion_id IS NULL THEN 1 ELSE 0 END"),
+    ]),
+    ("ubicacion", "ubicacion_stats", [
+        ("total", "''", "1"),
+        ("seccion", "coalesce(r.seccion_id::text, '')", "1"),
+    ]),
+]
+_OPS = (
+    ("insert", "INSERT", "NEW TABLE AS new_rows"),
+    ("update", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("delete", "DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+def _deltas(dims, source, sign="1"):
+    values = ", ".join(
+        f"('{d}', {clave}, {delta if sign == '1' else f'({delta}) * {sign}'})" for d, clave, delta in dims
+    )
+    return (
+        f"SELECT v.dimension, v.clave, v.delta FROM {source} r "
+        f"CROSS JOIN LATERAL (VALUES {values}) AS v(dimension, clave, delta)"
+    )
+
+
+def _apply(stats_table, deltas):
+    return (
+        f"INSERT INTO {stats_table} (dimension, clave, total) "
+        f"SELECT dimension, clave, sum(delta) FROM ({deltas}) d "
+        f"GROUP BY dimension, clave HAVING sum(delta) <> 0 ORDER BY dimension, clave "
+        f"ON CONFLICT (dimension, clave) DO UPDATE SET total = {stats_table}.total + EXCLUDED.total"
+    )
+
+
+def upgrade() -> None:
+    for _, stats_table, _ in _SPECS:
+        op.create_table(
+            stats_table,
+            sa.Column('dimension', sa.String(length=20), nullable=False),
+            sa.Column('clave', sa.String(length=100), nullable=False),
+            sa.Column('total', sa.BigInteger(), server_default='0', nullable=False),
+            sa.PrimaryKeyConstraint('dimension', 'clave'),
+        )
+
+    for table, stats_table, dims in _SPECS:
+        on_insert = _apply(stats_table, _deltas(dims, "new_rows"))
+        on_update = _apply(stats_table, f"{_deltas(dims, 'new_rows')} UNION ALL {_deltas(dims, 'old_rows', '-1')}")
+        on_delete = _apply(stats_table, _deltas(dims, "old_rows", "-1"))
+        op.execute(
+            f"""CREATE OR REPLACE FUNCTION {stats_table}_aplicar() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {on_insert};
+    ELSIF TG_OP = 'UPDATE' THEN
+        {on_update};
+    ELSE
+        {on_delete};
+    END IF;
+    RETURN NULL;
+END $$"""
+        )
+        # Carga inicial en la misma transacción que crea los triggers
+        op.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+        op.execute(_apply(stats_table, _deltas(dims, table)))
+        for suffix, event, refs in _OPS:
+            op.execute(
+                f"CREATE TRIGGER trg_{stats_table}_{suffix} AFTER {event} ON {table} "
+                f"REFERENCING {refs} FOR EACH STATEMENT EXECUTE FUNCTION {stats_table}_aplicar()"
+            )
+
+
+def downgrade() -> None:
+    for table, stats_table, _ in reversed(_SPECS):
+        for suffix, _, _ in _OPS:
+            op.execute(f"DROP TRIGGER IF EXISTS trg_{stats_table}_{suffix} ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {stats_table}_aplicar()")
+        op.drop_table(stats_table)
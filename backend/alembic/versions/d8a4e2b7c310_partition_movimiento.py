@@ -0,0 +1,132 @@
+"""partition_movimiento
+
+Revision ID: d8a4e2b7c310
+Revises: c5e81f3a9d27
+Create Date: 2026-10-17 14:22:51.604117
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a4e2b7c310'
+down_revision = 'c5e81f3a9d27'
+branch_labels = None
+depends_on = None
+
+# Meses por delante del actual que se crean al migrar (el resto lo hace
+# app/core/particiones.py en cada arranque / día)
+_MESES_ADELANTE = 3
+
+_INDICES = (
+    ('ix_movimiento_desde_ubicacion_id', ['desde_ubicacion_id']),
+    ('ix_movimiento_equipo_fecha', ['equipo_id', 'fecha']),
+    ('ix_movimiento_fecha', ['fecha']),
+    ('ix_movimiento_hacia_ubicacion_id', ['hacia_ubicacion_id']),
+)
+
+_COLUMNAS = "id, equipo_id, fecha, actualizado_en, desde_ubicacion_id, hacia_ubicacion_id, comentario, usuario_id"
+
+# Copia congelada de PARTICIONES_DDL (app/models/movimiento.py)
+_FUNCION = """CREATE OR REPLACE FUNCTION movimiento_asegurar_particiones(desde date, meses integer)
+RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    mes date := date_trunc('month', desde)::date;
+    ini timestamptz;
+    fin timestamptz;
+    nombre text;
+    creadas integer := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('movimiento_particiones'));
+    FOR i IN 1..meses LOOP
+        ini := mes::timestamp AT TIME ZONE 'UTC';
+        fin := (mes + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+        nombre := 'movimiento_p' || to_char(mes, 'YYYYMM');
+        IF to_regclass(nombre) IS NULL THEN
+            IF EXISTS (SELECT 1 FROM movimiento_default WHERE fecha >= ini AND fecha < fin) THEN
+                EXECUTE format('CREATE TABLE %I (LIKE movimiento INCLUDING DEFAULTS)', nombre);
+                EXECUTE format(
+                    'WITH m AS (DELETE FROM movimiento_default WHERE fecha >= %L AND fecha < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM m', ini, fin, nombre);
+                EXECUTE format('ALTER TABLE movimiento ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                               nombre, ini, fin);
+            ELSE
+                EXECUTE format('CREATE TABLE %I PARTITION OF movimiento FOR VALUES FROM (%L) TO (%L)',
+                               nombre, ini, fin);
+            END IF;
+            creadas := creadas + 1;
+        END IF;
+        mes := (mes + interval '1 month')::date;
+    END LOOP;
+    RETURN creadas;
+END $$"""
+
+
+def _crear_tabla(nombre, particionada):
+    op.create_table(
+        nombre,
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('movimiento_id_seq'::regclass)"), nullable=False),
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('fecha', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('desde_ubicacion_id', sa.Integer(), nullable=True),
+        sa.Column('hacia_ubicacion_id', sa.Integer(), nullable=True),
+        sa.Column('comentario', sqlmodel.sql.sqltypes.AutoString(length=500), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['desde_ubicacion_id'], ['ubicacion.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['equipo_id'], ['equipo.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['hacia_ubicacion_id'], ['ubicacion.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint(*(['id', 'fecha'] if particionada else ['id']), name=f'{nombre}_pkey'),
+        postgresql_partition_by='RANGE (fecha)' if particionada else None,
+    )
+
+
+def _sustituir(particionada):
+    # La tabla actual pasa a 'movimiento_old' conservando la secuencia de ids
+    op.execute("LOCK TABLE movimiento IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER SEQUENCE movimiento_id_seq OWNED BY NONE")
+    for nombre, _ in _INDICES:
+        op.drop_index(nombre, table_name='movimiento')
+    op.execute("ALTER TABLE movimiento RENAME TO movimiento_old")
+    op.execute("ALTER INDEX movimiento_pkey RENAME TO movimiento_old_pkey")
+    for col in ('equipo_id', 'desde_ubicacion_id', 'hacia_ubicacion_id', 'usuario_id'):
+        op.drop_constraint(f'movimiento_{col}_fkey', 'movimiento_old', type_='foreignkey')
+
+    _crear_tabla('movimiento', particionada)
+    if particionada:
+        op.execute("CREATE TABLE movimiento_default PARTITION OF movimiento DEFAULT")
+        op.execute(_FUNCION)
+        # Desde el mes del movimiento más antiguo hasta _MESES_ADELANTE después del actual
+        bind = op.get_bind()
+        hoy = bind.execute(sa.text("SELECT (now() AT TIME ZONE 'UTC')::date")).scalar_one()
+        desde = bind.execute(
+            sa.text("SELECT (min(fecha) AT TIME ZONE 'UTC')::date FROM movimiento_old")
+        ).scalar_one() or hoy
+        meses = (hoy.year - desde.year) * 12 + (hoy.month - desde.month) + _MESES_ADELANTE + 1
+        bind.execute(
+            sa.text("SELECT movimiento_asegurar_particiones(:desde, :meses)"),
+            {"desde": desde, "meses": meses},
+        )
+    for nombre, cols in _INDICES:
+        op.create_index(nombre, 'movimiento', cols, unique=False)
+
+    # 'fecha' pasa a NOT NULL: los huecos (no debería haberlos) toman actualizado_en
+    op.execute(
+        f"INSERT INTO movimiento ({_COLUMNAS}) "
+        f"SELECT {_COLUMNAS.replace('fecha,', 'coalesce(fecha, actualizado_en, now()),', 1)} FROM movimiento_old"
+    )
+    op.execute("DROP TABLE movimiento_old")
+    op.execute("ALTER SEQUENCE movimiento_id_seq OWNED BY movimiento.id")
+    op.execute("ANALYZE movimiento")
+
+
+def upgrade() -> None:
+    _sustituir(particionada=True)
+
+
+def downgrade() -> None:
+    _sustituir(particionada=False)
+    op.execute("DROP FUNCTION IF EXISTS movimiento_asegurar_particiones(date, integer)")
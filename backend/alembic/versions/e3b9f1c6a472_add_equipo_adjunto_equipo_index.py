@@ -0,0 +1,27 @@
+"""add_equipo_adjunto_equipo_index
+
+Revision ID: e3b9f1c6a472
+Revises: d8a4e2b7c310
+Create Date: 2026-10-17 18:02:44.519031
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b9f1c6a472'
+down_revision = 'd8a4e2b7c310'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_equipo_adjunto_equipo_subido', 'equipo_adjunto', ['equipo_id', 'subido_en'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_equipo_adjunto_equipo_subido', table_name='equipo_adjunto')
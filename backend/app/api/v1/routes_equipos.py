@@ -1,15 +1,26 @@
 # backend/app/api/v1/routes_equipos.py
-from typing import Optional, List, Dict, Any, Literal, get_args
+from datetime import datetime
+from typing import Optional, List, Dict, Any, get_args
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Query, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.exc import IntegrityError, DBAPIError
 from sqlalchemy import func
 
-from app.core.deps import get_db, current_user, require_role
+from app.core.deps import get_async_db, get_async_read_db, get_db, get_read_db, get_stream_read_db, current_user, require_role
+from app.core.export import ExportFormat, stream_export
+from app.core.expand import Expand, cargar_relaciones, expand_options, expand_param, expandir, modelo_expandido
+from app.core.equipo_import import ImportFormatError, formato_de, importar_equipos, invalidar_cache, leer_filas
 from app.core.file_manager import FileManager
-from app.models.equipo import Equipo
+from app.core.cache import get_equipo_by_lookup_async, invalidate_equipo_lookup
+from app.core.pagination import IncludeTotal, asc, desc, paginate, set_total_count_async
+from app.core.inventario import inventario_stmt
+from app.core.stats import resumen_equipos
+from app.core.timeline import timeline_equipo
+from app.core.search import relevance_keys, search_condition
+from app.models.equipo import Equipo, EstadoEquipo, TIPOS_CANONICOS, TIPOS_VALIDOS
 from app.models.seccion import Seccion
 from app.models.ubicacion import Ubicacion
 from app.models.equipo_adjunto import EquipoAdjunto
@@ -17,35 +28,18 @@ from app.models.equipo_adjunto import EquipoAdjunto
 router = APIRouter(prefix="/equipos", tags=["equipos"])
 
 # ---------- Constantes y Helpers ----------
-EstadoEquipo = Literal["OPERATIVO", "MANTENIMIENTO", "BAJA", "CALIBRACION", "RESERVA"]
-TIPOS_VALIDOS = {
-    "Masas",
-    "Fuerza",
-    "Dimensional",
-    "3D",
-    "Par",
-    "Verificación Dimensional",
-    "Temperatura",
-    "Electricidad",
-    "Químico",
-    "Limpieza",
-    "Acelerómetros",
-    "Acústica",
-    "Caudal",
-    "Presión",
-    "Densidad y Volumen",
-    "Óptica y radiometría",
-    "Ultrasonidos",
-    "Calibrador",
-    "Multímetro",
-    "Generador",
-    "Osciloscopio",
-    "Fuente",
-    "Analizador",
-    "Otro",
+# Claves de ordenación por valor de 'ordenar' (el id siempre como desempate)
+SORT_KEYS = {
+    "id_asc": [asc(Equipo.id)],
+    "id_desc": [desc(Equipo.id)],
+    "identidad_asc": [asc(Equipo.identidad, nulls_last=True), asc(Equipo.id)],
+    "identidad_desc": [desc(Equipo.identidad, nulls_last=True), desc(Equipo.id)],
+    "tipo_asc": [asc(Equipo.tipo), asc(Equipo.id)],
+    "tipo_desc": [desc(Equipo.tipo), desc(Equipo.id)],
 }
-TIPOS_CANONICOS = {t.lower(): t for t in TIPOS_VALIDOS}
-ALLOWED_ORDEN = {"id_asc", "id_desc", "identidad_asc", "identidad_desc", "tipo_asc", "tipo_desc"}
+# 'relevancia' (requiere q) ordena por similitud trigram; sólo admite offset
+ALLOWED_ORDEN = set(SORT_KEYS) | {"relevancia"}
+SEARCH_COLS = (Equipo.identidad, Equipo.numero_serie, Equipo.tipo)
 
 def _norm(s: Optional[str]) -> Optional[str]:
     if s is None:
@@ -65,6 +59,10 @@ def _validar_tipo(tipo: str, errors: List[Dict[str, Any]]) -> None:
         })
 
 # ---------- Schemas ----------
+# Lecturas con ?expand=ubicacion,seccion (objetos anidados, ver core/expand.py)
+EquipoOut = modelo_expandido(Equipo, {"ubicacion": Ubicacion, "seccion": Seccion})
+ExpandEquipo = expand_param("ubicacion", "seccion")
+
 class EquipoCreateIn(BaseModel):
     identidad: Optional[str] = Field(None, min_length=1, max_length=100, examples=["EQ-0001"])
     numero_serie: Optional[str] = Field(None, max_length=150)
@@ -160,46 +158,82 @@ def crear_equipo(
         db.rollback()
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Error interno de base de datos")
 
+    # Limpia posibles entradas negativas de la caché de lookup
+    invalidate_equipo_lookup(nfc_tags=(equipo.nfc_tag,), identidades=(equipo.identidad,))
+
     base_url = str(request.base_url).rstrip("/")
     response.headers["Location"] = f"{base_url}/api/v1/equipos/{equipo.id}"
     response.headers["Cache-Control"] = "no-store"
     return equipo
 
 
-@router.get(
-    "",
-    response_model=list[Equipo],
-    response_model_exclude_none=True,
-    dependencies=[Depends(current_user)],
+@router.post(
+    "/import",
+    dependencies=[Depends(require_role("ADMIN", "MANTENIMIENTO"))],
 )
-def listar_equipos(
+def importar_equipos_fichero(
     response: Response,
+    file: UploadFile = File(..., description="CSV (UTF-8, cabecera) o XLSX; columna 'tipo' obligatoria"),
+    dry_run: bool = Query(False, description="Sólo validar, sin crear nada"),
+    todo_o_nada: bool = Query(False, description="Si alguna fila falla no se crea ninguna"),
     db: Session = Depends(get_db),
-    limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    q: Optional[str] = Query(None),
-    seccion_id: Optional[int] = Query(None, gt=0),
-    ubicacion_id: Optional[int] = Query(None, gt=0),
-    estado: Optional[EstadoEquipo] = Query(None),
-    estados: Optional[str] = Query(None),
-    ordenar: Optional[str] = Query("id_desc"),
-    identidad_eq: Optional[str] = Query(None),
-    nfc_tag_eq: Optional[str] = Query(None),
 ):
+    """
+    Alta masiva de equipos. Columnas: identidad, numero_serie, tipo, estado,
+    notas, seccion_id, ubicacion_id, nfc_tag (las demás se ignoran).
+    Mismas reglas que POST /equipos; devuelve un informe con los errores por
+    fila (nº de fila del fichero, contando la cabecera como 1).
+    """
+    try:
+        informe = importar_equipos(db, leer_filas(file.file, formato_de(file.filename)), dry_run=dry_run)
+    except ImportFormatError as e:
+        db.rollback()
+        _raise_422([{"loc": ["body", "file"], "msg": str(e), "type": "value_error"}])
+    except DBAPIError:
+        db.rollback()
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Error interno de base de datos")
+
+    if dry_run or (todo_o_nada and informe.errores_total):
+        db.rollback()
+        if not dry_run:
+            informe.creadas = 0
+    else:
+        db.commit()
+        invalidar_cache(informe)
+
+    response.headers["Cache-Control"] = "no-store"
+    return {"dry_run": dry_run, **informe.as_dict()}
+
+
+def _validar_orden(ordenar: Optional[str], q: Optional[str]) -> None:
     if ordenar not in ALLOWED_ORDEN:
         _raise_422([{
             "loc": ["query", "ordenar"],
             "msg": f"Orden inválido. Válidos: {', '.join(sorted(ALLOWED_ORDEN))}",
             "type": "value_error"
         }])
+    if ordenar == "relevancia" and not (q and q.strip()):
+        _raise_422([{
+            "loc": ["query", "ordenar"],
+            "msg": "ordenar=relevancia requiere el parámetro q",
+            "type": "value_error",
+        }])
 
-    stmt = select(Equipo)
-    count_stmt = select(func.count()).select_from(Equipo)
 
+def _condiciones(
+    db,
+    q: Optional[str],
+    seccion_id: Optional[int],
+    ubicacion_id: Optional[int],
+    estado: Optional[str],
+    estados: Optional[str],
+    identidad_eq: Optional[str],
+    nfc_tag_eq: Optional[str],
+) -> List[Any]:
+    """Filtros comunes de GET /equipos y /equipos/export."""
     conds = []
     if q:
-        like = f"%{q}%"
-        conds.append((Equipo.identidad.ilike(like)) | (Equipo.numero_serie.ilike(like)) | (Equipo.tipo.ilike(like)))
+        conds.append(search_condition(db, SEARCH_COLS, q))
     if identidad_eq:
         conds.append(func.lower(Equipo.identidad) == identidad_eq.strip().lower())
     if nfc_tag_eq:
@@ -215,55 +249,180 @@ def listar_equipos(
         estados_validos = [e for e in estados_list if e in get_args(EstadoEquipo)]
         if estados_validos:
             conds.append(Equipo.estado.in_(estados_validos))
+    return conds
+
+
+@router.get(
+    "",
+    response_model=list[EquipoOut],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_user)],
+)
+async def listar_equipos(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor (ignora offset)"),
+    include_total: IncludeTotal = Query("exact", description="exact|estimate|false"),
+    q: Optional[str] = Query(None),
+    seccion_id: Optional[int] = Query(None, gt=0),
+    ubicacion_id: Optional[int] = Query(None, gt=0),
+    estado: Optional[EstadoEquipo] = Query(None),
+    estados: Optional[str] = Query(None),
+    ordenar: Optional[str] = Query("id_desc"),
+    identidad_eq: Optional[str] = Query(None),
+    nfc_tag_eq: Optional[str] = Query(None),
+    expand: Expand = Depends(ExpandEquipo),
+):
+    _validar_orden(ordenar, q)
+
+    stmt = select(Equipo).options(*expand_options(Equipo, expand))
+    count_stmt = select(func.count()).select_from(Equipo)
 
+    conds = _condiciones(db, q, seccion_id, ubicacion_id, estado, estados, identidad_eq, nfc_tag_eq)
     if conds:
         stmt = stmt.where(*conds)
         count_stmt = count_stmt.where(*conds)
 
-    if ordenar == "id_asc":
-        stmt = stmt.order_by(Equipo.id.asc())
-    elif ordenar == "identidad_asc":
-        stmt = stmt.order_by(Equipo.identidad.asc().nulls_last(), Equipo.id.asc())
-    elif ordenar == "identidad_desc":
-        stmt = stmt.order_by(Equipo.identidad.desc().nulls_last(), Equipo.id.desc())
-    elif ordenar == "tipo_asc":
-        stmt = stmt.order_by(Equipo.tipo.asc(), Equipo.id.asc())
-    elif ordenar == "tipo_desc":
-        stmt = stmt.order_by(Equipo.tipo.desc(), Equipo.id.desc())
-    else:
-        stmt = stmt.order_by(Equipo.id.desc())
+    await set_total_count_async(db, response, count_stmt, stmt, include_total)
+
+    keys = relevance_keys(db, SEARCH_COLS, q, Equipo.id) if ordenar == "relevancia" else SORT_KEYS[ordenar]
+    rows = await db.run_sync(paginate, stmt, response, keys, ordenar, limit, offset, cursor)
+    return [expandir(e, expand) for e in rows]
 
-    total = db.exec(count_stmt).one()
-    response.headers["X-Total-Count"] = str(total)
 
-    stmt = stmt.limit(limit).offset(offset)
-    return db.exec(stmt).all()
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(current_user)],
+)
+def exportar_equipos(
+    session_factory=Depends(get_stream_read_db),
+    formato: ExportFormat = Query("csv", description="csv|ndjson"),
+    q: Optional[str] = Query(None),
+    seccion_id: Optional[int] = Query(None, gt=0),
+    ubicacion_id: Optional[int] = Query(None, gt=0),
+    estado: Optional[EstadoEquipo] = Query(None),
+    estados: Optional[str] = Query(None),
+    ordenar: Optional[str] = Query("id_desc"),
+    identidad_eq: Optional[str] = Query(None),
+    nfc_tag_eq: Optional[str] = Query(None),
+):
+    """
+    Todos los equipos que cumplen los filtros de GET /equipos, en CSV o NDJSON
+    y en streaming (sin paginar ni contar).
+    """
+    _validar_orden(ordenar, q)
+
+    def build(db: Session):
+        return select(Equipo).where(
+            *_condiciones(db, q, seccion_id, ubicacion_id, estado, estados, identidad_eq, nfc_tag_eq)
+        )
+
+    def keys(db: Session):
+        return relevance_keys(db, SEARCH_COLS, q, Equipo.id) if ordenar == "relevancia" else SORT_KEYS[ordenar]
+
+    return stream_export(session_factory, build, keys, formato, "equipos")
+
+
+class InventarioItemOut(BaseModel):
+    id: int
+    identidad: Optional[str] = None
+    numero_serie: Optional[str] = None
+    tipo: str
+    ubicacion_id: Optional[int] = None
+    movimiento_id: Optional[int] = None  # movimiento que lo dejó en esa ubicación
+    desde: Optional[datetime] = None  # fecha de ese movimiento
+
+
+@router.get(
+    "/inventario",
+    response_model=list[InventarioItemOut],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_user)],
+)
+async def inventario_a_fecha(
+    response: Response,
+    fecha: datetime = Query(..., description="Instante T (ISO-8601, UTC)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    seccion_id: Optional[int] = Query(None, gt=0),
+    ubicacion_id: Optional[int] = Query(None, gt=0, description="Sólo lo que había en esta ubicación en T"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor"),
+):
+    """
+    Dónde estaba cada equipo en 'fecha', según el historial de movimientos
+    (ver core/inventario.py). Ordenado por id de equipo, paginado por cursor.
+    """
+    stmt = inventario_stmt(fecha, seccion_id, ubicacion_id)
+    return await db.run_sync(paginate, stmt, response, [asc(Equipo.id)], "inventario", limit, 0, cursor)
 
 
 @router.get(
     "/{equipo_id}",
-    response_model=Equipo,
+    response_model=EquipoOut,
     response_model_exclude_none=True,
     dependencies=[Depends(current_user)],
 )
-def obtener_equipo(equipo_id: int, db: Session = Depends(get_db)):
-    obj = db.get(Equipo, equipo_id)
+async def obtener_equipo(
+    equipo_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    expand: Expand = Depends(ExpandEquipo),
+):
+    obj = await db.get(Equipo, equipo_id, options=expand_options(Equipo, expand))
     if not obj:
         raise HTTPException(status_code=404, detail="Equipo no encontrado")
-    return obj
+    return expandir(obj, expand)
+
+
+class EventoTimelineOut(BaseModel):
+    tipo: str  # movimiento | incidencia | reparacion | adjunto
+    id: int
+    fecha: datetime
+    titulo: Optional[str] = None
+    estado: Optional[str] = None
+    usuario_id: Optional[int] = None
+    incidencia_id: Optional[int] = None
+    desde_ubicacion_id: Optional[int] = None
+    hacia_ubicacion_id: Optional[int] = None
+
+
+@router.get(
+    "/{equipo_id}/timeline",
+    response_model=list[EventoTimelineOut],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_user)],
+)
+async def timeline(
+    equipo_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor"),
+):
+    """
+    Historial completo del equipo (movimientos, incidencias, reparaciones y
+    adjuntos) en una sola consulta, del más reciente al más antiguo.
+    Paginación por cursor (X-Next-Cursor).
+    """
+    if not await db.get(Equipo, equipo_id):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Equipo no encontrado")
+    return await db.run_sync(timeline_equipo, response, equipo_id, limit, cursor)
 
 
 @router.get(
     "/buscar/nfc/{nfc_tag}",
-    response_model=Equipo,
+    response_model=EquipoOut,
     response_model_exclude_none=True,
     dependencies=[Depends(current_user)],
 )
-def buscar_equipo_por_nfc(nfc_tag: str, db: Session = Depends(get_db)):
-    nfc_tag_clean = nfc_tag.strip().lower()
-    equipo = db.exec(
-        select(Equipo).where(func.lower(Equipo.nfc_tag) == nfc_tag_clean)
-    ).first()
+async def buscar_equipo_por_nfc(
+    nfc_tag: str,
+    db: AsyncSession = Depends(get_async_db),
+    expand: Expand = Depends(ExpandEquipo),
+):
+    equipo = await get_equipo_by_lookup_async(db, "nfc_tag", nfc_tag)
 
     if not equipo:
         raise HTTPException(
@@ -271,23 +430,26 @@ def buscar_equipo_por_nfc(nfc_tag: str, db: Session = Depends(get_db)):
             "No se encontró ningún equipo con el NFC tag proporcionado"
         )
 
-    return equipo
+    await db.run_sync(cargar_relaciones, equipo, expand)
+    return expandir(equipo, expand)
 
 
 @router.get(
     "/buscar/identidad/{identidad}",
-    response_model=Equipo,
+    response_model=EquipoOut,
     response_model_exclude_none=True,
     dependencies=[Depends(current_user)],
 )
-def buscar_equipo_por_identidad(identidad: str, db: Session = Depends(get_db)):
-    ident = (identidad or "").strip().lower()
-    equipo = db.exec(
-        select(Equipo).where(func.lower(Equipo.identidad) == ident)
-    ).first()
+async def buscar_equipo_por_identidad(
+    identidad: str,
+    db: AsyncSession = Depends(get_async_db),
+    expand: Expand = Depends(ExpandEquipo),
+):
+    equipo = await get_equipo_by_lookup_async(db, "identidad", identidad)
     if not equipo:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "No existe equipo con esa identidad")
-    return equipo
+    await db.run_sync(cargar_relaciones, equipo, expand)
+    return expandir(equipo, expand)
 
 
 @router.get(
@@ -296,9 +458,9 @@ def buscar_equipo_por_identidad(identidad: str, db: Session = Depends(get_db)):
     response_model_exclude_none=True,
     dependencies=[Depends(current_user)],
 )
-def listar_equipos_sin_ubicacion(
+async def listar_equipos_sin_ubicacion(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
 ):
@@ -311,10 +473,10 @@ def listar_equipos_sin_ubicacion(
     )
 
     count_stmt = select(func.count()).select_from(Equipo).where(Equipo.ubicacion_id.is_(None))
-    total = db.exec(count_stmt).one()
+    total = (await db.exec(count_stmt)).one()
 
     response.headers["X-Total-Count"] = str(total)
-    return db.exec(stmt).all()
+    return (await db.exec(stmt)).all()
 
 
 @router.patch(
@@ -382,6 +544,7 @@ def actualizar_equipo(
     if errors:
         _raise_422(errors)
 
+    nfc_tag_previo, identidad_previa = obj.nfc_tag, obj.identidad
     if payload.identidad is not None:
         obj.identidad = identidad
     if payload.numero_serie is not None:
@@ -403,6 +566,9 @@ def actualizar_equipo(
         db.add(obj)
         db.commit()
         db.refresh(obj)
+        invalidate_equipo_lookup(
+            nfc_tags=(nfc_tag_previo, obj.nfc_tag), identidades=(identidad_previa, obj.identidad)
+        )
         return obj
     except IntegrityError:
         db.rollback()
@@ -422,9 +588,11 @@ def eliminar_equipo(equipo_id: int, db: Session = Depends(get_db)):
     if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Equipo no encontrado")
 
+    nfc_tag_previo, identidad_previa = obj.nfc_tag, obj.identidad
     try:
         db.delete(obj)
         db.commit()
+        invalidate_equipo_lookup(nfc_tags=(nfc_tag_previo,), identidades=(identidad_previa,))
         return 
     except IntegrityError:
         db.rollback()
@@ -439,33 +607,9 @@ def eliminar_equipo(equipo_id: int, db: Session = Depends(get_db)):
     response_model_exclude_none=True,
     dependencies=[Depends(current_user)],
 )
-def resumen_estadisticas(db: Session = Depends(get_db)):
-    total = db.exec(select(func.count(Equipo.id))).one()
-
-    por_estado_rows = db.exec(
-        select(Equipo.estado, func.count(Equipo.id)).group_by(Equipo.estado)
-    ).all()
-    por_estado = {k: v for k, v in por_estado_rows if k is not None}
-
-    por_tipo_rows = db.exec(
-        select(Equipo.tipo, func.count(Equipo.id))
-        .group_by(Equipo.tipo)
-        .order_by(func.count(Equipo.id).desc())
-        .limit(10)
-    ).all()
-    por_tipo = {k: v for k, v in por_tipo_rows if k is not None}
-
-    sin_ubicacion = db.exec(
-        select(func.count(Equipo.id)).where(Equipo.ubicacion_id.is_(None))
-    ).one()
-
-    return {
-        "total_equipos": total,
-        "por_estado": por_estado,
-        "tipos_mas_comunes": por_tipo,
-        "sin_ubicacion": sin_ubicacion,
-        "con_ubicacion": total - sin_ubicacion,
-    }
+def resumen_estadisticas(db: Session = Depends(get_read_db)):
+    """Contadores mantenidos por triggers (equipo_stats): no recorre la tabla equipo."""
+    return resumen_equipos(db)
 
 
 @router.post(
@@ -494,11 +638,13 @@ def asignar_nfc(
     if conflict:
         raise HTTPException(status.HTTP_409_CONFLICT, "nfc_tag ya asignado a otro equipo")
 
+    nfc_tag_previo = eq.nfc_tag
     eq.nfc_tag = tag
     try:
         db.add(eq)
         db.commit()
         db.refresh(eq)
+        invalidate_equipo_lookup(nfc_tags=(nfc_tag_previo, tag))
         return eq
     except IntegrityError:
         db.rollback()
@@ -521,9 +667,11 @@ def desasignar_nfc(
     if not eq.nfc_tag:
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+    nfc_tag_previo = eq.nfc_tag
     eq.nfc_tag = None
     db.add(eq)
     db.commit()
+    invalidate_equipo_lookup(nfc_tags=(nfc_tag_previo,))
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # --- SECCIÓN NUEVA: ADJUNTOS EQUIPO (INVENTARIO) ---
@@ -3,14 +3,18 @@ from typing import Optional, Literal, List, Dict, Any
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status, Response, Request, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import func, select as sa_select
 from sqlalchemy.exc import IntegrityError, DBAPIError, OperationalError
 
-from app.core.deps import get_db, current_user, require_role
+from app.core.deps import get_async_db, get_db, get_stream_read_db, current_user, require_role
+from app.core.export import ExportFormat, stream_export
 from app.core.file_manager import FileManager
+from app.core.pagination import IncludeTotal, asc, desc, paginate, set_total_count_async
+from app.core.search import relevance_keys, search_condition
 from app.models.incidencia import Incidencia
 from app.models.equipo import Equipo
 from app.models.incidencia_adjunto import IncidenciaAdjunto
@@ -18,7 +22,16 @@ from app.models.incidencia_adjunto import IncidenciaAdjunto
 router = APIRouter(prefix="/incidencias", tags=["incidencias"])
 
 Estado = Literal["ABIERTA", "EN_PROGRESO", "CERRADA"]
-ALLOWED_ORDEN = {"fecha_desc", "fecha_asc", "id_desc", "id_asc"}
+# Claves de ordenación por valor de 'ordenar' (el id siempre como desempate)
+SORT_KEYS = {
+    "fecha_desc": [desc(Incidencia.fecha), desc(Incidencia.id)],
+    "fecha_asc": [asc(Incidencia.fecha), asc(Incidencia.id)],
+    "id_desc": [desc(Incidencia.id)],
+    "id_asc": [asc(Incidencia.id)],
+}
+# 'relevancia' (requiere q) ordena por similitud trigram; sólo admite offset
+ALLOWED_ORDEN = set(SORT_KEYS) | {"relevancia"}
+SEARCH_COLS = (Incidencia.titulo, Incidencia.descripcion)
 
 # ---------- Helpers ----------
 def _norm(s: Optional[str]) -> Optional[str]:
@@ -84,40 +97,36 @@ def crear_incidencia(
     return inc
 
 
-@router.get(
-    "",
-    response_model=list[Incidencia],
-    dependencies=[Depends(current_user)],
-)
-def listar_incidencias(
-    response: Response,
-    db: Session = Depends(get_db),
-    limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    q: Optional[str] = Query(None),
-    estado: Optional[Estado] = Query(None),
-    estados: Optional[str] = Query(None),
-    equipo_id: Optional[int] = Query(None, gt=0),
-    desde: datetime | None = Query(None),
-    hasta: datetime | None = Query(None),
-    ordenar: str = Query("fecha_desc"),
-):
+def _validar_filtros(ordenar: str, q: Optional[str], desde: Optional[datetime], hasta: Optional[datetime]) -> None:
     if ordenar not in ALLOWED_ORDEN:
         _raise_422([{
             "loc": ["query", "ordenar"],
             "msg": f"Orden inválido. Válidos: {', '.join(sorted(ALLOWED_ORDEN))}",
             "type": "value_error"
         }])
+    if ordenar == "relevancia" and not (q and q.strip()):
+        _raise_422([{
+            "loc": ["query", "ordenar"],
+            "msg": "ordenar=relevancia requiere el parámetro q",
+            "type": "value_error",
+        }])
     if desde and hasta and desde > hasta:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Rango de fechas inválido (desde > hasta)")
 
-    total_stmt = select(func.count()).select_from(Incidencia)
-    data_stmt = select(Incidencia)
 
+def _condiciones(
+    db,
+    q: Optional[str],
+    estado: Optional[str],
+    estados: Optional[str],
+    equipo_id: Optional[int],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+) -> List[Any]:
+    """Filtros comunes de GET /incidencias y /incidencias/export."""
     conds = []
     if q:
-        like = f"%{q.strip()}%"
-        conds.append((Incidencia.titulo.ilike(like)) | (Incidencia.descripcion.ilike(like)))
+        conds.append(search_condition(db, SEARCH_COLS, q))
     if estado:
         conds.append(Incidencia.estado == estado)
     if estados:
@@ -131,26 +140,71 @@ def listar_incidencias(
         conds.append(Incidencia.fecha >= desde)
     if hasta:
         conds.append(Incidencia.fecha <= hasta)
+    return conds
+
 
+@router.get(
+    "",
+    response_model=list[Incidencia],
+    dependencies=[Depends(current_user)],
+)
+async def listar_incidencias(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor (ignora offset)"),
+    include_total: IncludeTotal = Query("exact", description="exact|estimate|false"),
+    q: Optional[str] = Query(None),
+    estado: Optional[Estado] = Query(None),
+    estados: Optional[str] = Query(None),
+    equipo_id: Optional[int] = Query(None, gt=0),
+    desde: datetime | None = Query(None),
+    hasta: datetime | None = Query(None),
+    ordenar: str = Query("fecha_desc"),
+):
+    _validar_filtros(ordenar, q, desde, hasta)
+
+    total_stmt = select(func.count()).select_from(Incidencia)
+    data_stmt = select(Incidencia)
+
+    conds = _condiciones(db, q, estado, estados, equipo_id, desde, hasta)
     if conds:
         total_stmt = total_stmt.where(*conds)
         data_stmt = data_stmt.where(*conds)
 
-    # Orden
-    if ordenar == "fecha_asc":
-        data_stmt = data_stmt.order_by(Incidencia.fecha.asc(), Incidencia.id.asc())
-    elif ordenar == "id_asc":
-        data_stmt = data_stmt.order_by(Incidencia.id.asc())
-    elif ordenar == "id_desc":
-        data_stmt = data_stmt.order_by(Incidencia.id.desc())
-    else:  # fecha_desc
-        data_stmt = data_stmt.order_by(Incidencia.fecha.desc(), Incidencia.id.desc())
+    await set_total_count_async(db, response, total_stmt, data_stmt, include_total)
 
-    total = db.exec(total_stmt).one()
-    response.headers["X-Total-Count"] = str(total)
+    keys = relevance_keys(db, SEARCH_COLS, q, Incidencia.id) if ordenar == "relevancia" else SORT_KEYS[ordenar]
+    return await db.run_sync(paginate, data_stmt, response, keys, ordenar, limit, offset, cursor)
 
-    data_stmt = data_stmt.limit(limit).offset(offset)
-    return db.exec(data_stmt).all()
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(current_user)],
+)
+def exportar_incidencias(
+    session_factory=Depends(get_stream_read_db),
+    formato: ExportFormat = Query("csv", description="csv|ndjson"),
+    q: Optional[str] = Query(None),
+    estado: Optional[Estado] = Query(None),
+    estados: Optional[str] = Query(None),
+    equipo_id: Optional[int] = Query(None, gt=0),
+    desde: datetime | None = Query(None),
+    hasta: datetime | None = Query(None),
+    ordenar: str = Query("fecha_desc"),
+):
+    """Incidencias con los filtros de GET /incidencias, en CSV o NDJSON (streaming)."""
+    _validar_filtros(ordenar, q, desde, hasta)
+
+    def build(db: Session):
+        return select(Incidencia).where(*_condiciones(db, q, estado, estados, equipo_id, desde, hasta))
+
+    def keys(db: Session):
+        return relevance_keys(db, SEARCH_COLS, q, Incidencia.id) if ordenar == "relevancia" else SORT_KEYS[ordenar]
+
+    return stream_export(session_factory, build, keys, formato, "incidencias")
 
 
 @router.get(
@@ -158,8 +212,8 @@ def listar_incidencias(
     response_model=Incidencia,
     dependencies=[Depends(current_user)],
 )
-def obtener_incidencia(incidencia_id: int, db: Session = Depends(get_db)):
-    obj = db.get(Incidencia, incidencia_id)
+async def obtener_incidencia(incidencia_id: int, db: AsyncSession = Depends(get_async_db)):
+    obj = await db.get(Incidencia, incidencia_id)
     if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Incidencia no encontrada")
     return obj
@@ -3,12 +3,19 @@
 from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import select as sa_select, func
 from sqlalchemy.exc import OperationalError, DBAPIError, IntegrityError
 
-from app.core.deps import get_db, current_user, require_role
+from app.core.deps import get_async_db, get_async_read_db, get_db, get_stream_read_db, current_user, require_role
+from app.core.export import ExportFormat, stream_export
+from app.core.expand import Expand, UsuarioResumen, expand_options, expand_param, expandir, modelo_expandido
+from app.core.cache import get_equipo_by_lookup_async
+from app.core.pagination import IncludeTotal, asc, desc, paginate, set_total_count_async
 from app.models.equipo import Equipo
 from app.models.ubicacion import Ubicacion
 from app.models.movimiento import Movimiento
@@ -16,12 +23,18 @@ from app.models.movimiento import Movimiento
 # Seguridad NFC / rate-limit / idempotencia
 from app.core.security import (
     assert_idempotent,
-    assert_debounce,
-    check_rate_limit_nfc,
+    assert_nfc_guard,
 )
 
 router = APIRouter(prefix="/movimientos", tags=["movimientos"])
 
+# Lecturas con ?expand=equipo,desde_ubicacion,hacia_ubicacion,usuario (ver core/expand.py)
+MovimientoOut = modelo_expandido(
+    Movimiento,
+    {"equipo": Equipo, "desde_ubicacion": Ubicacion, "hacia_ubicacion": Ubicacion, "usuario": UsuarioResumen},
+)
+ExpandMovimiento = expand_param("equipo", "desde_ubicacion", "hacia_ubicacion", "usuario")
+
 # ---------- Helpers ----------
 def _norm_str(s: Optional[str]) -> Optional[str]:
     if s is None:
@@ -34,7 +47,14 @@ def _raise_422(errors: List[Dict[str, Any]]) -> None:
     raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors)
 
 
-ALLOWED_ORDEN = {"fecha_desc", "fecha_asc", "id_desc", "id_asc"}
+# Claves de ordenación por valor de 'ordenar' (el id siempre como desempate)
+SORT_KEYS = {
+    "fecha_desc": [desc(Movimiento.fecha), desc(Movimiento.id)],
+    "fecha_asc": [asc(Movimiento.fecha), asc(Movimiento.id)],
+    "id_desc": [desc(Movimiento.id)],
+    "id_asc": [asc(Movimiento.id)],
+}
+ALLOWED_ORDEN = set(SORT_KEYS)
 
 
 # ---------- Schemas ----------
@@ -252,28 +272,7 @@ def retirar_como_tecnico(
 
 
 # ---------- Listados & lectura ----------
-@router.get(
-    "",
-    response_model=list[Movimiento],
-    response_model_exclude_none=True,
-    dependencies=[Depends(require_role("MANTENIMIENTO", "ADMIN"))],
-)
-def listar_movimientos(
-    response: Response,
-    db: Session = Depends(get_db),
-    limit: int = Query(50, ge=1, le=200, description="Límite de resultados (1-200)"),
-    offset: int = Query(0, ge=0, description="Desplazamiento para paginación"),
-    desde: datetime | None = Query(None, description="Filtrar desde esta fecha (ISO-8601, UTC)"),
-    hasta: datetime | None = Query(None, description="Filtrar hasta esta fecha (ISO-8601, UTC)"),
-    equipo_id: int | None = Query(None, gt=0, description="Filtrar por ID de equipo"),
-    desde_ubicacion_id: int | None = Query(None, gt=0, description="Filtrar por ubicación de origen"),
-    hacia_ubicacion_id: int | None = Query(None, gt=0, description="Filtrar por ubicación de destino"),
-    ordenar: str = Query("fecha_desc", description="fecha_desc|fecha_asc|id_desc|id_asc"),
-):
-    """
-    Lista movimientos con filtros, orden y paginación.
-    Devuelve cabecera `X-Total-Count` con el total sin paginar.
-    """
+def _validar_filtros(ordenar: str, desde: Optional[datetime], hasta: Optional[datetime]) -> None:
     if ordenar not in ALLOWED_ORDEN:
         _raise_422([{
             "loc": ["query", "ordenar"],
@@ -284,9 +283,15 @@ def listar_movimientos(
     if desde and hasta and desde > hasta:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Rango de fechas inválido (desde > hasta)")
 
-    total_stmt = select(func.count()).select_from(Movimiento)
-    data_stmt = select(Movimiento)
 
+def _condiciones(
+    equipo_id: Optional[int],
+    desde_ubicacion_id: Optional[int],
+    hacia_ubicacion_id: Optional[int],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+) -> List[Any]:
+    """Filtros comunes de GET /movimientos y /movimientos/export."""
     conds = []
     if equipo_id:
         conds.append(Movimiento.equipo_id == equipo_id)
@@ -298,76 +303,126 @@ def listar_movimientos(
         conds.append(Movimiento.fecha >= desde)
     if hasta:
         conds.append(Movimiento.fecha <= hasta)
+    return conds
 
+
+@router.get(
+    "",
+    response_model=list[MovimientoOut],
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_role("MANTENIMIENTO", "ADMIN"))],
+)
+async def listar_movimientos(
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    limit: int = Query(50, ge=1, le=200, description="Límite de resultados (1-200)"),
+    offset: int = Query(0, ge=0, description="Desplazamiento para paginación"),
+    cursor: str | None = Query(None, description="Cursor opaco de X-Next-Cursor (ignora offset)"),
+    include_total: IncludeTotal = Query("exact", description="exact|estimate|false"),
+    desde: datetime | None = Query(None, description="Filtrar desde esta fecha (ISO-8601, UTC)"),
+    hasta: datetime | None = Query(None, description="Filtrar hasta esta fecha (ISO-8601, UTC)"),
+    equipo_id: int | None = Query(None, gt=0, description="Filtrar por ID de equipo"),
+    desde_ubicacion_id: int | None = Query(None, gt=0, description="Filtrar por ubicación de origen"),
+    hacia_ubicacion_id: int | None = Query(None, gt=0, description="Filtrar por ubicación de destino"),
+    ordenar: str = Query("fecha_desc", description="fecha_desc|fecha_asc|id_desc|id_asc"),
+    expand: Expand = Depends(ExpandMovimiento),
+):
+    """
+    Lista movimientos con filtros, orden y paginación (offset o cursor).
+    Devuelve cabecera `X-Total-Count` con el total sin paginar y
+    `X-Next-Cursor` si hay más páginas.
+    """
+    _validar_filtros(ordenar, desde, hasta)
+
+    total_stmt = select(func.count()).select_from(Movimiento)
+    data_stmt = select(Movimiento).options(*expand_options(Movimiento, expand))
+
+    conds = _condiciones(equipo_id, desde_ubicacion_id, hacia_ubicacion_id, desde, hasta)
     if conds:
         total_stmt = total_stmt.where(*conds)
         data_stmt = data_stmt.where(*conds)
 
-    # Orden
-    if ordenar == "fecha_asc":
-        data_stmt = data_stmt.order_by(Movimiento.fecha.asc(), Movimiento.id.asc())
-    elif ordenar == "id_asc":
-        data_stmt = data_stmt.order_by(Movimiento.id.asc())
-    elif ordenar == "id_desc":
-        data_stmt = data_stmt.order_by(Movimiento.id.desc())
-    else:  # fecha_desc
-        data_stmt = data_stmt.order_by(Movimiento.fecha.desc(), Movimiento.id.desc())
+    await set_total_count_async(db, response, total_stmt, data_stmt, include_total)
 
-    total = db.exec(total_stmt).one()
-    response.headers["X-Total-Count"] = str(total)
+    rows = await db.run_sync(paginate, data_stmt, response, SORT_KEYS[ordenar], ordenar, limit, offset, cursor)
+    return [expandir(m, expand) for m in rows]
 
-    data_stmt = data_stmt.limit(limit).offset(offset)
-    return db.exec(data_stmt).all()
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_role("MANTENIMIENTO", "ADMIN"))],
+)
+def exportar_movimientos(
+    session_factory=Depends(get_stream_read_db),
+    formato: ExportFormat = Query("csv", description="csv|ndjson"),
+    desde: datetime | None = Query(None, description="Filtrar desde esta fecha (ISO-8601, UTC)"),
+    hasta: datetime | None = Query(None, description="Filtrar hasta esta fecha (ISO-8601, UTC)"),
+    equipo_id: int | None = Query(None, gt=0, description="Filtrar por ID de equipo"),
+    desde_ubicacion_id: int | None = Query(None, gt=0, description="Filtrar por ubicación de origen"),
+    hacia_ubicacion_id: int | None = Query(None, gt=0, description="Filtrar por ubicación de destino"),
+    ordenar: str = Query("fecha_desc", description="fecha_desc|fecha_asc|id_desc|id_asc"),
+):
+    """
+    Movimientos con los filtros de GET /movimientos, en CSV o NDJSON y en
+    streaming. Con desde/hasta sólo se leen las particiones de esos meses.
+    """
+    _validar_filtros(ordenar, desde, hasta)
+    conds = _condiciones(equipo_id, desde_ubicacion_id, hacia_ubicacion_id, desde, hasta)
+    return stream_export(
+        session_factory, lambda db: select(Movimiento).where(*conds), SORT_KEYS[ordenar], formato, "movimientos"
+    )
 
 
 @router.get(
     "/equipo/{equipo_id}",
-    response_model=list[Movimiento],
+    response_model=list[MovimientoOut],
     response_model_exclude_none=True,
     dependencies=[Depends(current_user)],
 )
-def historial_equipo(
+async def historial_equipo(
     equipo_id: int,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(50, ge=1, le=200, description="Límite de resultados (1-200)"),
     offset: int = Query(0, ge=0, description="Desplazamiento para paginación"),
+    cursor: str | None = Query(None, description="Cursor opaco de X-Next-Cursor (ignora offset)"),
+    include_total: IncludeTotal = Query("exact", description="exact|estimate|false"),
+    expand: Expand = Depends(ExpandMovimiento),
 ):
     """
     Historial de movimientos de un equipo (autenticado).
-    Devuelve cabecera `X-Total-Count` del total del historial.
+    Devuelve cabecera `X-Total-Count` del total del historial y
+    `X-Next-Cursor` si hay más páginas (usa ix_movimiento_equipo_fecha).
     """
-    eq = db.get(Equipo, equipo_id)
+    eq = await db.get(Equipo, equipo_id)
     if not eq:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Equipo no encontrado")
 
-    total = db.exec(
-        select(func.count()).select_from(Movimiento).where(Movimiento.equipo_id == equipo_id)
-    ).scalar_one()
-    response.headers["X-Total-Count"] = str(total)
-
-    stmt = (
-        select(Movimiento)
-        .where(Movimiento.equipo_id == equipo_id)
-        .order_by(Movimiento.fecha.desc(), Movimiento.id.desc())
-        .limit(limit)
-        .offset(offset)
-    )
-    return db.exec(stmt).all()
+    stmt = select(Movimiento).where(Movimiento.equipo_id == equipo_id).options(*expand_options(Movimiento, expand))
+    count_stmt = select(func.count()).select_from(Movimiento).where(Movimiento.equipo_id == equipo_id)
+    await set_total_count_async(db, response, count_stmt, stmt, include_total)
+
+    rows = await db.run_sync(paginate, stmt, response, SORT_KEYS["fecha_desc"], "fecha_desc", limit, offset, cursor)
+    return [expandir(m, expand) for m in rows]
 
 
 @router.get(
     "/{movimiento_id}",
-    response_model=Movimiento,
+    response_model=MovimientoOut,
     response_model_exclude_none=True,
     dependencies=[Depends(require_role("MANTENIMIENTO", "ADMIN"))],
 )
-def obtener_movimiento(movimiento_id: int, db: Session = Depends(get_db)):
+async def obtener_movimiento(
+    movimiento_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    expand: Expand = Depends(ExpandMovimiento),
+):
     """Obtener un movimiento por ID (roles: mantenimiento/admin)."""
-    mov = db.get(Movimiento, movimiento_id)
+    mov = await db.get(Movimiento, movimiento_id, options=expand_options(Movimiento, expand))
     if not mov:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Movimiento no encontrado")
-    return mov
+    return expandir(mov, expand)
 
 
 @router.patch(
@@ -418,34 +473,54 @@ class MovimientoNFCIn(BaseModel):
     comentario: Optional[str] = Field(None, max_length=500)
 
 
-def _equipo_por_nfc_or_404(db: Session, nfc_tag: str) -> Equipo:
-    tag = (nfc_tag or "").strip().lower()
-    eq = db.exec(select(Equipo).where(func.lower(Equipo.nfc_tag) == tag)).first()
+async def _equipo_por_nfc_or_404(db: AsyncSession, nfc_tag: str) -> Equipo:
+    eq = await get_equipo_by_lookup_async(db, "nfc_tag", nfc_tag)
     if not eq:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "No existe equipo con ese nfc_tag")
     return eq
 
 
+def _mover_por_nfc(
+    db: Session,
+    equipo_id: int,
+    hacia_ubicacion_id: Optional[int],
+    comentario: Optional[str],
+    actor_id: int,
+) -> Movimiento:
+    """
+    Mueve el equipo resuelto por NFC (sin destino: ubicación del técnico).
+    Síncrono: las rutas async lo ejecutan con db.run_sync().
+    Confirma la transacción: el lookup ya la abrió y _mover_equipo sólo
+    libera su SAVEPOINT.
+    """
+    if hacia_ubicacion_id is None:
+        hacia_ubicacion_id = _get_ubicacion_tecnico_or_422(db, actor_id).id
+    mov = _mover_equipo(db, equipo_id, hacia_ubicacion_id, comentario, actor_id)
+    db.commit()
+    return mov
+
+
 @router.post(
     "/retirar/nfc",
     response_model=Movimiento,
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_role("OPERARIO", "MANTENIMIENTO", "ADMIN"))],
 )
-def retirar_por_nfc(
+async def retirar_por_nfc(
     payload: MovimientoNFCIn,
     response: Response,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(current_user),
 ):
-    # Seguridad NFC: idempotencia + debounce + rate limit
-    assert_idempotent(request, ttl_sec=30)
-    assert_debounce(f"nfc:{user['id']}:{payload.nfc_tag}:retirar", ttl_sec=3)
-    check_rate_limit_nfc(str(user["id"]), payload.nfc_tag, limit=5, window_sec=10)
+    # Seguridad NFC: idempotencia + debounce + rate limit (1 round trip atómico;
+    # Redis síncrono, en el threadpool)
+    await run_in_threadpool(assert_nfc_guard, request, user["id"], payload.nfc_tag, "retirar")
 
-    eq = _equipo_por_nfc_or_404(db, payload.nfc_tag)
-    mov = _mover_equipo(db, eq.id, payload.hacia_ubicacion_id, payload.comentario, int(user["id"]))
+    eq = await _equipo_por_nfc_or_404(db, payload.nfc_tag)
+    mov = await db.run_sync(
+        _mover_por_nfc, eq.id, payload.hacia_ubicacion_id, payload.comentario, int(user["id"])
+    )
     base_url = str(request.base_url).rstrip("/")
     response.headers["Location"] = f"{base_url}/api/v1/movimientos/{mov.id}"
     response.headers["Cache-Control"] = "no-store"
@@ -458,24 +533,25 @@ def retirar_por_nfc(
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_role("OPERARIO", "MANTENIMIENTO", "ADMIN"))],
 )
-def retirar_como_tecnico_por_nfc(
+async def retirar_como_tecnico_por_nfc(
     payload: MovimientoTecnicoNFCIn,
     response: Response,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(current_user),
 ):
     """
     Variante NFC: el técnico escanea el equipo y se asigna automáticamente
     a su ubicación personal.
     """
-    assert_idempotent(request, ttl_sec=30)
-    assert_debounce(f"nfc:{user['id']}:{payload.nfc_tag}:retirar_me", ttl_sec=3)
-    check_rate_limit_nfc(str(user["id"]), payload.nfc_tag, limit=5, window_sec=10)
+    # Seguridad NFC: idempotencia + debounce + rate limit (1 round trip atómico;
+    # Redis síncrono, en el threadpool)
+    await run_in_threadpool(assert_nfc_guard, request, user["id"], payload.nfc_tag, "retirar_me")
 
-    eq = _equipo_por_nfc_or_404(db, payload.nfc_tag)
-    ubi_tecnico = _get_ubicacion_tecnico_or_422(db, int(user["id"]))
-    mov = _mover_equipo(db, eq.id, ubi_tecnico.id, payload.comentario, int(user["id"]))
+    eq = await _equipo_por_nfc_or_404(db, payload.nfc_tag)
+    mov = await db.run_sync(
+        _mover_por_nfc, eq.id, None, payload.comentario, int(user["id"])
+    )
 
     base_url = str(request.base_url).rstrip("/")
     response.headers["Location"] = f"{base_url}/api/v1/movimientos/{mov.id}"
@@ -489,21 +565,191 @@ def retirar_como_tecnico_por_nfc(
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_role("OPERARIO", "MANTENIMIENTO", "ADMIN"))],
 )
-def devolver_por_nfc(
+async def devolver_por_nfc(
     payload: MovimientoNFCIn,
     response: Response,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(current_user),
 ):
-    # Seguridad NFC: idempotencia + debounce + rate limit
-    assert_idempotent(request, ttl_sec=30)
-    assert_debounce(f"nfc:{user['id']}:{payload.nfc_tag}:devolver", ttl_sec=3)
-    check_rate_limit_nfc(str(user["id"]), payload.nfc_tag, limit=5, window_sec=10)
+    # Seguridad NFC: idempotencia + debounce + rate limit (1 round trip atómico;
+    # Redis síncrono, en el threadpool)
+    await run_in_threadpool(assert_nfc_guard, request, user["id"], payload.nfc_tag, "devolver")
 
-    eq = _equipo_por_nfc_or_404(db, payload.nfc_tag)
-    mov = _mover_equipo(db, eq.id, payload.hacia_ubicacion_id, payload.comentario, int(user["id"]))
+    eq = await _equipo_por_nfc_or_404(db, payload.nfc_tag)
+    mov = await db.run_sync(
+        _mover_por_nfc, eq.id, payload.hacia_ubicacion_id, payload.comentario, int(user["id"])
+    )
     base_url = str(request.base_url).rstrip("/")
     response.headers["Location"] = f"{base_url}/api/v1/movimientos/{mov.id}"
     response.headers["Cache-Control"] = "no-store"
     return mov
+
+
+# ---------- Lote (varios equipos, un destino) ----------
+MAX_LOTE = 200
+
+ResultadoLote = Literal["ok", "conflicto", "no_encontrado"]
+
+
+class MovimientoLoteIn(BaseModel):
+    nfc_tags: List[str] = Field(default_factory=list, max_length=MAX_LOTE)
+    equipo_ids: List[int] = Field(default_factory=list, max_length=MAX_LOTE)
+    # Si no se indica, se usa la ubicación de técnico del usuario autenticado
+    hacia_ubicacion_id: Optional[int] = Field(None, gt=0)
+    comentario: Optional[str] = Field(None, max_length=500)
+
+
+class MovimientoLoteItemOut(BaseModel):
+    nfc_tag: Optional[str] = None
+    equipo_id: Optional[int] = None
+    resultado: ResultadoLote
+    detalle: Optional[str] = None
+    movimiento_id: Optional[int] = None
+
+
+class MovimientoLoteOut(BaseModel):
+    hacia_ubicacion_id: int
+    movidos: int
+    resultados: List[MovimientoLoteItemOut]
+
+
+def _mover_equipos_lote(
+    db: Session,
+    payload: MovimientoLoteIn,
+    dest: Ubicacion,
+    actor_id: Optional[int] = None,
+) -> List[MovimientoLoteItemOut]:
+    """
+    Variante por lotes de _mover_equipo, en una sola transacción:
+    - Resuelve todos los nfc_tag en una consulta.
+    - Bloquea todas las filas con un único SELECT ... FOR UPDATE ordenado por id
+      (mismo orden en todas las transacciones => sin interbloqueos).
+    - Inserta todos los Movimiento con un único flush.
+    Los errores de negocio no abortan el lote: se informan por elemento.
+    """
+    tags = [(t or "").strip().lower() for t in payload.nfc_tags]
+    ids_por_tag: Dict[str, int] = {}
+    if tags:
+        rows = db.exec(
+            sa_select(func.lower(Equipo.nfc_tag), Equipo.id).where(func.lower(Equipo.nfc_tag).in_(set(tags)))
+        ).all()
+        ids_por_tag = {tag: eq_id for tag, eq_id in rows}
+
+    # (nfc_tag, equipo_id) en el orden de la petición
+    refs = [(t, ids_por_tag.get(t)) for t in tags] + [(None, i) for i in payload.equipo_ids]
+    ids = sorted({eq_id for _, eq_id in refs if eq_id is not None})
+
+    try:
+        equipos: Dict[int, Equipo] = {}
+        if ids:
+            equipos = {
+                eq.id: eq
+                for eq in db.exec(
+                    sa_select(Equipo).where(Equipo.id.in_(ids)).order_by(Equipo.id).with_for_update()
+                ).scalars()
+            }
+
+        resultados: List[MovimientoLoteItemOut] = []
+        movs: List[tuple[MovimientoLoteItemOut, Movimiento]] = []
+        vistos: set[int] = set()
+        comentario = _norm_str(payload.comentario)
+
+        for tag, eq_id in refs:
+            item = MovimientoLoteItemOut(nfc_tag=tag, equipo_id=eq_id, resultado="ok")
+            resultados.append(item)
+            eq = equipos.get(eq_id) if eq_id is not None else None
+            if eq is None:
+                item.resultado, item.detalle = "no_encontrado", "Equipo no encontrado"
+            elif eq.id in vistos:
+                item.resultado, item.detalle = "conflicto", "Equipo repetido en el lote"
+            elif not eq.puede_moverse:
+                item.resultado, item.detalle = "conflicto", "El equipo no puede moverse en su estado actual"
+            elif eq.ubicacion_id == dest.id:
+                item.resultado, item.detalle = "conflicto", "El equipo ya se encuentra en esta ubicación"
+            else:
+                mov = Movimiento(
+                    equipo_id=eq.id,
+                    desde_ubicacion_id=eq.ubicacion_id,
+                    hacia_ubicacion_id=dest.id,
+                    comentario=comentario,
+                    usuario_id=actor_id,
+                )
+                eq.ubicacion_id = dest.id
+                movs.append((item, mov))
+            if eq is not None:
+                vistos.add(eq.id)
+
+        if movs:
+            db.add_all([mov for _, mov in movs])
+            db.flush()
+            for item, mov in movs:
+                item.movimiento_id = mov.id
+        db.commit()
+        return resultados
+
+    except OperationalError:
+        db.rollback()
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Error temporal de base de datos. Intente nuevamente.",
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            detail="Conflicto de integridad (revise FK/estado).",
+        )
+    except DBAPIError:
+        db.rollback()
+        raise HTTPException(
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno de base de datos",
+        )
+
+
+@router.post(
+    "/lote",
+    response_model=MovimientoLoteOut,
+    dependencies=[Depends(require_role("OPERARIO", "MANTENIMIENTO", "ADMIN"))],
+)
+def mover_lote(
+    payload: MovimientoLoteIn,
+    response: Response,
+    request: Request,
+    db: Session = Depends(get_db),
+    user=Depends(current_user),
+):
+    """
+    Mueve varios equipos (por nfc_tag y/o equipo_id) a un mismo destino.
+    Devuelve 200 con el resultado de cada elemento: ok | conflicto | no_encontrado.
+    El lote cuenta como una sola petición para idempotencia.
+    """
+    n = len(payload.nfc_tags) + len(payload.equipo_ids)
+    if n == 0 or n > MAX_LOTE:
+        _raise_422([{
+            "loc": ["body"],
+            "msg": f"El lote debe tener entre 1 y {MAX_LOTE} equipos",
+            "type": "value_error",
+        }])
+
+    assert_idempotent(request, ttl_sec=30)
+
+    if payload.hacia_ubicacion_id is None:
+        dest = _get_ubicacion_tecnico_or_422(db, int(user["id"]))
+    else:
+        dest = db.get(Ubicacion, payload.hacia_ubicacion_id)
+        if not dest:
+            _raise_422([{
+                "loc": ["body", "hacia_ubicacion_id"],
+                "msg": "Ubicación destino inexistente",
+                "type": "value_error.foreign_key",
+            }])
+
+    resultados = _mover_equipos_lote(db, payload, dest, int(user["id"]))
+    response.headers["Cache-Control"] = "no-store"
+    return MovimientoLoteOut(
+        hacia_ubicacion_id=dest.id,
+        movidos=sum(1 for r in resultados if r.resultado == "ok"),
+        resultados=resultados,
+    )
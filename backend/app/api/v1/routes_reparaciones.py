@@ -13,14 +13,17 @@ from fastapi import (
     UploadFile,
     File,
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import func, select as sa_select
 from sqlalchemy.exc import IntegrityError, DBAPIError, OperationalError
 
-from app.core.deps import get_db, current_user, require_role
+from app.core.deps import get_async_db, get_db, get_stream_read_db, current_user, require_role
+from app.core.export import ExportFormat, stream_export
 from app.core.file_manager import FileManager
+from app.core.pagination import IncludeTotal, asc, desc, paginate, set_total_count_async
 from app.models.equipo import Equipo
 from app.models.reparacion import Reparacion
 from app.models.reparacion_factura import ReparacionFactura
@@ -29,9 +32,16 @@ router = APIRouter(prefix="/reparaciones", tags=["reparaciones"])
 
 # ----------------- Constantes / helpers -----------------
 EstadoReparacion = Literal["ABIERTA", "EN_PROGRESO", "CERRADA"]
-ALLOWED_ORDEN = {
-    "id_asc", "id_desc", "inicio_asc", "inicio_desc", "estado_asc", "estado_desc",
+# Claves de ordenación por valor de 'ordenar' (el id siempre como desempate)
+SORT_KEYS = {
+    "id_asc": [asc(Reparacion.id)],
+    "id_desc": [desc(Reparacion.id)],
+    "inicio_asc": [asc(Reparacion.fecha_inicio), asc(Reparacion.id)],
+    "inicio_desc": [desc(Reparacion.fecha_inicio), desc(Reparacion.id)],
+    "estado_asc": [asc(Reparacion.estado), desc(Reparacion.fecha_inicio), desc(Reparacion.id)],
+    "estado_desc": [desc(Reparacion.estado), desc(Reparacion.fecha_inicio), desc(Reparacion.id)],
 }
+ALLOWED_ORDEN = set(SORT_KEYS)
 
 def _norm(s: Optional[str]) -> Optional[str]:
     if s is None:
@@ -207,12 +217,41 @@ def crear_reparacion(
     return rep
 
 
+def _condiciones(
+    q: Optional[str],
+    equipo_id: Optional[int],
+    estado: Optional[str],
+    estados: Optional[str],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+) -> List[Any]:
+    """Filtros comunes de GET /reparaciones y /reparaciones/export."""
+    conds = []
+    if q:
+        conds.append(Reparacion.titulo.ilike(f"%{q}%"))
+    if equipo_id:
+        conds.append(Reparacion.equipo_id == equipo_id)
+    if estado:
+        conds.append(Reparacion.estado == estado)
+    if estados:
+        l = [e.strip().upper() for e in estados.split(",") if e.strip()]
+        v = [e for e in l if e in ("ABIERTA", "EN_PROGRESO", "CERRADA")]
+        if v: conds.append(Reparacion.estado.in_(v))
+    if desde:
+        conds.append(Reparacion.fecha_inicio >= desde)
+    if hasta:
+        conds.append(Reparacion.fecha_inicio <= hasta)
+    return conds
+
+
 @router.get("", response_model=list[Reparacion], response_model_exclude_none=True, dependencies=[Depends(require_role("MANTENIMIENTO", "ADMIN"))])
-def listar_reparaciones(
+async def listar_reparaciones(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor (ignora offset)"),
+    include_total: IncludeTotal = Query("exact", description="exact|estimate|false"),
     q: Optional[str] = Query(None),
     equipo_id: Optional[int] = Query(None, gt=0),
     estado: Optional[EstadoReparacion] = Query(None),
@@ -226,52 +265,51 @@ def listar_reparaciones(
     
     stmt = select(Reparacion)
     count_stmt = select(func.count()).select_from(Reparacion)
-    conds = []
-    if q:
-        conds.append(Reparacion.titulo.ilike(f"%{q}%"))
-    if equipo_id:
-        conds.append(Reparacion.equipo_id == equipo_id)
-    if estado:
-        conds.append(Reparacion.estado == estado)
-    if estados:
-        l = [e.strip().upper() for e in estados.split(",") if e.strip()]
-        v = [e for e in l if e in ("ABIERTA", "EN_PROGRESO", "CERRADA")]
-        if v: conds.append(Reparacion.estado.in_(v))
-    if desde:
-        conds.append(Reparacion.fecha_inicio >= desde)
-    if hasta:
-        conds.append(Reparacion.fecha_inicio <= hasta)
+    conds = _condiciones(q, equipo_id, estado, estados, desde, hasta)
 
     if conds:
         stmt = stmt.where(*conds)
         count_stmt = count_stmt.where(*conds)
 
-    if ordenar == "id_asc": stmt = stmt.order_by(Reparacion.id.asc())
-    elif ordenar == "id_desc": stmt = stmt.order_by(Reparacion.id.desc())
-    elif ordenar == "estado_asc": stmt = stmt.order_by(Reparacion.estado.asc(), Reparacion.fecha_inicio.desc())
-    elif ordenar == "estado_desc": stmt = stmt.order_by(Reparacion.estado.desc(), Reparacion.fecha_inicio.desc())
-    elif ordenar == "inicio_asc": stmt = stmt.order_by(Reparacion.fecha_inicio.asc())
-    else: stmt = stmt.order_by(Reparacion.fecha_inicio.desc())
+    await set_total_count_async(db, response, count_stmt, stmt, include_total)
+    return await db.run_sync(paginate, stmt, response, SORT_KEYS[ordenar], ordenar, limit, offset, cursor)
+
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(require_role("MANTENIMIENTO", "ADMIN"))])
+def exportar_reparaciones(
+    session_factory=Depends(get_stream_read_db),
+    formato: ExportFormat = Query("csv", description="csv|ndjson"),
+    q: Optional[str] = Query(None),
+    equipo_id: Optional[int] = Query(None, gt=0),
+    estado: Optional[EstadoReparacion] = Query(None),
+    estados: Optional[str] = Query(None),
+    desde: Optional[datetime] = Query(None),
+    hasta: Optional[datetime] = Query(None),
+    ordenar: str = Query("inicio_desc"),
+):
+    """Reparaciones con los filtros de GET /reparaciones, en CSV o NDJSON (streaming)."""
+    if ordenar not in ALLOWED_ORDEN:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Orden inválido")
+    conds = _condiciones(q, equipo_id, estado, estados, desde, hasta)
+    return stream_export(
+        session_factory, lambda db: select(Reparacion).where(*conds), SORT_KEYS[ordenar], formato, "reparaciones"
+    )
 
-    total = db.exec(count_stmt).one()
-    response.headers["X-Total-Count"] = str(total)
-    stmt = stmt.limit(limit).offset(offset)
-    return db.exec(stmt).all()
 
 @router.get("/{reparacion_id}", response_model=Reparacion, dependencies=[Depends(require_role("MANTENIMIENTO", "ADMIN"))])
-def obtener_reparacion(reparacion_id: int, db: Session = Depends(get_db)):
-    rep = db.get(Reparacion, reparacion_id)
+async def obtener_reparacion(reparacion_id: int, db: AsyncSession = Depends(get_async_db)):
+    rep = await db.get(Reparacion, reparacion_id)
     if not rep: raise HTTPException(status.HTTP_404_NOT_FOUND, "Reparación no encontrada")
     return rep
 
 @router.get("/equipo/{equipo_id}", response_model=list[Reparacion], response_model_exclude_none=True, dependencies=[Depends(current_user)])
-def listar_por_equipo(equipo_id: int, response: Response, db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    equipo = db.get(Equipo, equipo_id)
+async def listar_por_equipo(equipo_id: int, response: Response, db: AsyncSession = Depends(get_async_db), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
+    equipo = await db.get(Equipo, equipo_id)
     if not equipo: raise HTTPException(status.HTTP_404_NOT_FOUND, "Equipo no encontrado")
-    total = db.exec(select(func.count()).select_from(Reparacion).where(Reparacion.equipo_id == equipo_id)).scalar_one()
+    total = (await db.exec(select(func.count()).select_from(Reparacion).where(Reparacion.equipo_id == equipo_id))).one()
     response.headers["X-Total-Count"] = str(total)
     stmt = select(Reparacion).where(Reparacion.equipo_id == equipo_id).order_by(Reparacion.fecha_inicio.desc()).limit(limit).offset(offset)
-    return db.exec(stmt).all()
+    return (await db.exec(stmt)).all()
 
 @router.patch("/{reparacion_id}", response_model=Reparacion, response_model_exclude_none=True, dependencies=[Depends(require_role("MANTENIMIENTO", "ADMIN"))])
 def actualizar_reparacion(reparacion_id: int, payload: ReparacionUpdateIn, db: Session = Depends(get_db), user=Depends(current_user)):
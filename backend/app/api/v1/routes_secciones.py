@@ -4,10 +4,12 @@ from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Query
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.exc import IntegrityError, DBAPIError
 from sqlalchemy import func
 
-from app.core.deps import get_db, current_user, require_role
+from app.core.deps import get_async_db, get_db, current_user, require_role
+from app.core.pagination import IncludeTotal, asc, desc, paginate, set_total_count_async
 from app.models.seccion import Seccion
 
 router = APIRouter(prefix="/secciones", tags=["secciones"])
@@ -20,7 +22,14 @@ class SeccionUpdateIn(BaseModel):
     nombre: Optional[str] = Field(None, min_length=2, max_length=150)
 
 # ---------- Helpers ----------
-ALLOWED_ORDEN = {"nombre_asc", "nombre_desc", "id_asc", "id_desc"}
+# Claves de ordenación por valor de 'ordenar' (el id siempre como desempate)
+SORT_KEYS = {
+    "nombre_asc": [asc(Seccion.nombre), asc(Seccion.id)],
+    "nombre_desc": [desc(Seccion.nombre), desc(Seccion.id)],
+    "id_asc": [asc(Seccion.id)],
+    "id_desc": [desc(Seccion.id)],
+}
+ALLOWED_ORDEN = set(SORT_KEYS)
 
 def _norm_name(s: Optional[str]) -> Optional[str]:
     if s is None:
@@ -80,12 +89,14 @@ def crear_seccion(
     response_model_exclude_none=True,
     dependencies=[Depends(require_role("OPERARIO", "MANTENIMIENTO", "ADMIN"))],
 )
-def listar_secciones(
+async def listar_secciones(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     q: Optional[str] = Query(None, description="Filtro por nombre (icontains)"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor (ignora offset)"),
+    include_total: IncludeTotal = Query("exact", description="exact|estimate|false"),
     ordenar: str = Query("nombre_asc", description="nombre_asc|nombre_desc|id_asc|id_desc"),
 ):
     if ordenar not in ALLOWED_ORDEN:
@@ -108,20 +119,9 @@ def listar_secciones(
         stmt = stmt.where(*conds)
         total_stmt = total_stmt.where(*conds)
 
-    if ordenar == "nombre_desc":
-        stmt = stmt.order_by(Seccion.nombre.desc(), Seccion.id.desc())
-    elif ordenar == "id_asc":
-        stmt = stmt.order_by(Seccion.id.asc())
-    elif ordenar == "id_desc":
-        stmt = stmt.order_by(Seccion.id.desc())
-    else:  # nombre_asc
-        stmt = stmt.order_by(Seccion.nombre.asc(), Seccion.id.asc())
-
-    total = db.exec(total_stmt).one()
-    response.headers["X-Total-Count"] = str(total)
+    await set_total_count_async(db, response, total_stmt, stmt, include_total)
 
-    stmt = stmt.limit(limit).offset(offset)
-    return db.exec(stmt).all()
+    return await db.run_sync(paginate, stmt, response, SORT_KEYS[ordenar], ordenar, limit, offset, cursor)
 
 
 @router.get(
@@ -130,8 +130,8 @@ def listar_secciones(
     response_model_exclude_none=True,
     dependencies=[Depends(require_role("OPERARIO", "MANTENIMIENTO", "ADMIN"))],
 )
-def obtener_seccion(seccion_id: int, db: Session = Depends(get_db)):
-    obj = db.get(Seccion, seccion_id)
+async def obtener_seccion(seccion_id: int, db: AsyncSession = Depends(get_async_db)):
+    obj = await db.get(Seccion, seccion_id)
     if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Sección no encontrada")
     return obj
@@ -3,10 +3,17 @@ from typing import Optional, List, Dict, Any, Literal
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Query
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.exc import IntegrityError, DBAPIError
 from sqlalchemy import func
 
-from app.core.deps import get_db, current_user, require_role
+from app.core.config import settings
+from app.core.deps import get_async_db, get_db, get_read_db, current_user, require_role
+from app.core.pagination import IncludeTotal, asc, desc, paginate, set_total_count_async
+from app.core.recuento import conciliar, corregir
+from app.core.security import assert_idempotent
+from app.core.stats import resumen_ubicaciones as resumen_ubicaciones_stats
+from app.core.search import relevance_keys, search_condition
 from app.models.ubicacion import Ubicacion
 from app.models.seccion import Seccion
 from app.models.usuario import Usuario
@@ -14,7 +21,18 @@ from app.models.usuario import Usuario
 router = APIRouter(prefix="/ubicaciones", tags=["ubicaciones"])
 
 # ---------- Helpers ----------
-ALLOWED_ORDEN = {"id_desc", "id_asc", "nombre_asc", "nombre_desc", "creado_desc", "creado_asc"}
+# Claves de ordenación por valor de 'ordenar' (el id siempre como desempate)
+SORT_KEYS = {
+    "id_desc": [desc(Ubicacion.id)],
+    "id_asc": [asc(Ubicacion.id)],
+    "nombre_asc": [asc(Ubicacion.nombre), asc(Ubicacion.id)],
+    "nombre_desc": [desc(Ubicacion.nombre), desc(Ubicacion.id)],
+    "creado_desc": [desc(Ubicacion.creado_en), desc(Ubicacion.id)],
+    "creado_asc": [asc(Ubicacion.creado_en), asc(Ubicacion.id)],
+}
+# 'relevancia' (requiere q) ordena por similitud trigram; sólo admite offset
+ALLOWED_ORDEN = set(SORT_KEYS) | {"relevancia"}
+SEARCH_COLS = (Ubicacion.nombre,)
 
 TipoUbicacionLiteral = Literal["ALMACEN", "LABORATORIO", "TECNICO", "OTRO"]
 
@@ -144,18 +162,20 @@ def crear_ubicacion(
     response_model_exclude_none=True,
     dependencies=[Depends(current_user)],
 )
-def listar_ubicaciones(
+async def listar_ubicaciones(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(50, ge=1, le=200, description="Resultados por página"),
     offset: int = Query(0, ge=0, description="Desplazamiento"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor (ignora offset)"),
+    include_total: IncludeTotal = Query("exact", description="exact|estimate|false"),
     q: Optional[str] = Query(None, description="Búsqueda por nombre (contiene)"),
     seccion_id: Optional[int] = Query(None, gt=0),
-    ordenar: str = Query("id_desc", description="id_desc|id_asc|nombre_asc|nombre_desc|creado_desc|creado_asc"),
+    ordenar: str = Query("id_desc", description="id_desc|id_asc|nombre_asc|nombre_desc|creado_desc|creado_asc|relevancia"),
 ):
     """
-    Lista ubicaciones con filtros y paginación.
-    Devuelve `X-Total-Count` con el total sin paginar.
+    Lista ubicaciones con filtros y paginación (offset o cursor).
+    Devuelve `X-Total-Count` con el total sin paginar y `X-Next-Cursor` si hay más.
     Requiere autenticación.
     """
     if ordenar not in ALLOWED_ORDEN:
@@ -164,14 +184,19 @@ def listar_ubicaciones(
             "msg": f"Orden inválido. Válidos: {', '.join(sorted(ALLOWED_ORDEN))}",
             "type": "value_error"
         }])
+    if ordenar == "relevancia" and not (q and q.strip()):
+        _raise_422([{
+            "loc": ["query", "ordenar"],
+            "msg": "ordenar=relevancia requiere el parámetro q",
+            "type": "value_error",
+        }])
 
     stmt = select(Ubicacion)
     count_stmt = select(func.count()).select_from(Ubicacion)
 
     conds = []
     if q:
-        like = f"%{q.strip()}%"
-        conds.append(Ubicacion.nombre.ilike(like))
+        conds.append(search_condition(db, SEARCH_COLS, q))
     if seccion_id:
         conds.append(Ubicacion.seccion_id == seccion_id)
 
@@ -180,32 +205,10 @@ def listar_ubicaciones(
             stmt = stmt.where(c)
             count_stmt = count_stmt.where(c)
 
-    # Orden
-    if ordenar == "id_asc":
-        stmt = stmt.order_by(Ubicacion.id.asc())
-    elif ordenar == "nombre_asc":
-        stmt = stmt.order_by(Ubicacion.nombre.asc())
-    elif ordenar == "nombre_desc":
-        stmt = stmt.order_by(Ubicacion.nombre.desc())
-    elif ordenar == "creado_asc":
-        # si el modelo tiene creado_en; si no, cae a id_asc
-        if hasattr(Ubicacion, "creado_en"):
-            stmt = stmt.order_by(Ubicacion.creado_en.asc(), Ubicacion.id.asc())
-        else:
-            stmt = stmt.order_by(Ubicacion.id.asc())
-    elif ordenar == "creado_desc":
-        if hasattr(Ubicacion, "creado_en"):
-            stmt = stmt.order_by(Ubicacion.creado_en.desc(), Ubicacion.id.desc())
-        else:
-            stmt = stmt.order_by(Ubicacion.id.desc())
-    else:  # id_desc
-        stmt = stmt.order_by(Ubicacion.id.desc())
-
-    total = db.exec(count_stmt).one()
-    response.headers["X-Total-Count"] = str(total)
-
-    stmt = stmt.limit(limit).offset(offset)
-    return db.exec(stmt).all()
+    await set_total_count_async(db, response, count_stmt, stmt, include_total)
+
+    keys = relevance_keys(db, SEARCH_COLS, q, Ubicacion.id) if ordenar == "relevancia" else SORT_KEYS[ordenar]
+    return await db.run_sync(paginate, stmt, response, keys, ordenar, limit, offset, cursor)
 
 
 @router.get(
@@ -214,8 +217,8 @@ def listar_ubicaciones(
     response_model_exclude_none=True,
     dependencies=[Depends(current_user)],
 )
-def obtener_ubicacion(ubicacion_id: int, db: Session = Depends(get_db)):
-    obj = db.get(Ubicacion, ubicacion_id)
+async def obtener_ubicacion(ubicacion_id: int, db: AsyncSession = Depends(get_async_db)):
+    obj = await db.get(Ubicacion, ubicacion_id)
     if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Ubicación no encontrada")
     return obj
@@ -349,24 +352,96 @@ def eliminar_ubicacion(ubicacion_id: int, db: Session = Depends(get_db)):
     "/estadisticas/resumen",
     dependencies=[Depends(current_user)],
 )
-def resumen_ubicaciones(db: Session = Depends(get_db)):
+def resumen_ubicaciones(db: Session = Depends(get_read_db)):
     """
-    Resumen rápido: total ubicaciones y por sección (si existe).
+    Resumen rápido: total ubicaciones y por sección (contadores de ubicacion_stats).
     """
-    total = db.exec(select(func.count(Ubicacion.id))).one()
-
-    if hasattr(Ubicacion, "seccion_id"):
-        por_seccion_rows = db.exec(
-            select(Ubicacion.seccion_id, func.count(Ubicacion.id))
-            .group_by(Ubicacion.seccion_id)
-            .order_by(func.count(Ubicacion.id).desc())
-        ).all()
-        # Limpia claves None
-        por_seccion = {str(k): v for k, v in por_seccion_rows if k is not None}
-    else:
-        por_seccion = {}
-
-    return {
-        "total_ubicaciones": total,
-        "por_seccion": por_seccion,
-    }
+    return resumen_ubicaciones_stats(db)
+
+
+# ---------- Recuento (stocktake) ----------
+class RecuentoIn(BaseModel):
+    nfc_tags: List[str] = Field(default_factory=list, description="Todos los tags escaneados en la ubicación")
+    # Mueve aquí (con su Movimiento) los equipos escaneados que constaban en otra ubicación
+    corregir: bool = False
+    comentario: Optional[str] = Field(None, max_length=500)
+
+
+class RecuentoItemOut(BaseModel):
+    equipo_id: int
+    identidad: Optional[str] = None
+    nfc_tag: Optional[str] = None
+    ubicacion_id: Optional[int] = None  # ubicación registrada antes del recuento
+    estado: str
+    movimiento_id: Optional[int] = None  # si se ha corregido
+
+
+class RecuentoOut(BaseModel):
+    ubicacion_id: int
+    escaneados: int
+    presentes: int
+    faltantes: List[RecuentoItemOut]
+    en_otra_ubicacion: List[RecuentoItemOut]
+    desconocidos: List[str]
+    movidos: int = 0
+
+
+@router.post(
+    "/{ubicacion_id}/recuento",
+    response_model=RecuentoOut,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_role("OPERARIO", "MANTENIMIENTO", "ADMIN"))],
+)
+def recuento_ubicacion(
+    ubicacion_id: int,
+    payload: RecuentoIn,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    user=Depends(current_user),
+):
+    """
+    Concilia los tags NFC escaneados en una ubicación con lo registrado:
+    faltantes, presentes pero registrados en otra ubicación y tags
+    desconocidos. Con corregir=true mueve en bloque los segundos a esta
+    ubicación (sólo los que pueden moverse) creando sus movimientos.
+    """
+    if len(payload.nfc_tags) > settings.RECUENTO_MAX_TAGS:
+        _raise_422([{
+            "loc": ["body", "nfc_tags"],
+            "msg": f"Máximo {settings.RECUENTO_MAX_TAGS} tags por recuento",
+            "type": "value_error",
+        }])
+    if not db.get(Ubicacion, ubicacion_id):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Ubicación no encontrada")
+    if payload.corregir:
+        assert_idempotent(request, ttl_sec=30)
+
+    res = conciliar(db, ubicacion_id, payload.nfc_tags)
+    movidos: Dict[int, int] = {}
+    if payload.corregir:
+        try:
+            movidos = corregir(
+                db,
+                ubicacion_id,
+                [r["equipo_id"] for r in res["otra_ubicacion"]],
+                _norm(payload.comentario) or "Recuento",
+                int(user["id"]),
+            )
+            db.commit()
+        except DBAPIError:
+            db.rollback()
+            raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Error interno de base de datos")
+        for r in res["otra_ubicacion"]:
+            r["movimiento_id"] = movidos.get(r["equipo_id"])
+
+    response.headers["Cache-Control"] = "no-store"
+    return RecuentoOut(
+        ubicacion_id=ubicacion_id,
+        escaneados=sum(len(res[c]) for c in ("presente", "otra_ubicacion", "desconocido")),
+        presentes=len(res["presente"]),
+        faltantes=res["faltante"],
+        en_otra_ubicacion=res["otra_ubicacion"],
+        desconocidos=[r["nfc_tag"] for r in res["desconocido"]],
+        movidos=len(movidos),
+    )
@@ -1,14 +1,18 @@
 # backend/app/api/v1/routes_usuarios.py
 from typing import Optional, List, Literal
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, EmailStr
 from fastapi.responses import FileResponse
 from sqlmodel import Session, select
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import IntegrityError, DBAPIError
 
 from app.core.deps import get_db, current_user, require_role
-from app.core.security import hash_password
+from app.core.pagination import IncludeTotal, desc, paginate, set_total_count
+from app.core.search import relevance_keys, search_condition
+from app.core.security import hash_password_pooled, revoke_all_user_tokens
 from app.core.file_manager import FileManager
 from app.models.usuario import Usuario
 from app.models.ubicacion import Ubicacion
@@ -18,6 +22,15 @@ router = APIRouter(prefix="/usuarios", tags=["usuarios"])
 
 RoleLiteral = Literal["ADMIN", "MANTENIMIENTO", "OPERARIO"]
 
+# Listado de usuarios: por id descendente o, con q, por relevancia (sólo offset)
+SORT_KEYS = {"id_desc": [desc(Usuario.id)]}
+SEARCH_COLS = (Usuario.username, Usuario.email, Usuario.nombre, Usuario.apellidos)
+
+# UsuarioOut.ubicacion_id sale de la relación ubicacion_asociada: se trae en la
+# misma consulta (LEFT JOIN, sólo el id; ubicacion.usuario_id es único) en vez
+# de un SELECT por usuario al serializar
+CON_UBICACION = joinedload(Usuario.ubicacion_asociada).load_only(Ubicacion.id)
+
 
 # ---------------------------
 # Schemas
@@ -100,7 +113,7 @@ def _last_admin_guard(db: Session, exclude_user_id: Optional[int] = None) -> boo
 # ---------------------------
 @router.get("/me", response_model=UsuarioOut, response_model_exclude_none=True, dependencies=[Depends(current_user)])
 def me(user=Depends(current_user), db: Session = Depends(get_db)):
-    u = db.get(Usuario, int(user["id"]))
+    u = db.get(Usuario, int(user["id"]), options=[CON_UBICACION])
     if not u:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Usuario no encontrado")
     return u
@@ -141,14 +154,43 @@ def update_me(payload: UsuarioUpdateIn, user=Depends(current_user), db: Session
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Error interno de base de datos")
 
 
-@router.post("/me/password", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(current_user)])
-def change_my_password(payload: PasswordChangeIn, user=Depends(current_user), db: Session = Depends(get_db)):
-    u = db.get(Usuario, int(user["id"]))
+# Endpoints de contraseña: async para esperar el hash Argon2 en el event loop
+# (pool propio, app/core/password_pool.py) sin retener un hilo del threadpool;
+# la BD y Redis van al threadpool en los tramos síncronos.
+def _get_usuario_or_404(db: Session, user_id: int) -> Usuario:
+    u = db.get(Usuario, user_id)
     if not u:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Usuario no encontrado")
-    u.password_hash = hash_password(payload.password)
+    return u
+
+
+def _revocar_sesiones(user_id: int) -> None:
+    """
+    Logout global del usuario (ver security.revoke_all_user_tokens) antes de
+    aplicar el cambio. Si Redis no responde el cambio no se aplica y se
+    devuelve 503, como en /auth/logout-all: mejor reintentar que dejar
+    sesiones abiertas con la contraseña o el rol anteriores.
+    """
+    if not revoke_all_user_tokens(user_id):
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No se pudieron cerrar las sesiones del usuario; inténtelo de nuevo",
+        )
+
+
+def _guardar_password(db: Session, u: Usuario, password_hash: str) -> None:
+    # Las sesiones abiertas con la contraseña anterior dejan de valer
+    _revocar_sesiones(u.id)
+    u.password_hash = password_hash
     db.add(u)
     db.commit()
+
+
+@router.post("/me/password", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(current_user)])
+async def change_my_password(payload: PasswordChangeIn, user=Depends(current_user), db: Session = Depends(get_db)):
+    u = await run_in_threadpool(_get_usuario_or_404, db, int(user["id"]))
+    password_hash = await hash_password_pooled(payload.password)
+    await run_in_threadpool(_guardar_password, db, u, password_hash)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -162,11 +204,17 @@ def change_my_password(payload: PasswordChangeIn, user=Depends(current_user), db
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(require_role("ADMIN"))],
 )
-def create_user(payload: UsuarioCreateIn, db: Session = Depends(get_db)):
+async def create_user(payload: UsuarioCreateIn, db: Session = Depends(get_db)):
+    ubicacion_obj = await run_in_threadpool(_ubicacion_para_usuario_nuevo, db, payload.ubicacion_id)
+    password_hash = await hash_password_pooled(payload.password)
+    return await run_in_threadpool(_crear_usuario, db, payload, password_hash, ubicacion_obj)
+
+
+def _ubicacion_para_usuario_nuevo(db: Session, ubicacion_id: Optional[int]) -> Optional[Ubicacion]:
     # Validación previa de la ubicación (si viene)
     ubicacion_obj: Optional[Ubicacion] = None
-    if payload.ubicacion_id is not None:
-        ubicacion_obj = db.get(Ubicacion, payload.ubicacion_id)
+    if ubicacion_id is not None:
+        ubicacion_obj = db.get(Ubicacion, ubicacion_id)
         if not ubicacion_obj:
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST,
@@ -182,11 +230,16 @@ def create_user(payload: UsuarioCreateIn, db: Session = Depends(get_db)):
                 status.HTTP_409_CONFLICT,
                 "La ubicación ya está asociada a otro usuario",
             )
+    return ubicacion_obj
+
 
+def _crear_usuario(
+    db: Session, payload: UsuarioCreateIn, password_hash: str, ubicacion_obj: Optional[Ubicacion]
+) -> UsuarioOut:
     u = Usuario(
         username=payload.username.strip(),
         email=str(payload.email).strip(),
-        password_hash=hash_password(payload.password),
+        password_hash=password_hash,
         role=payload.role,
         active=payload.active,
         # Nuevos campos
@@ -226,7 +279,8 @@ def create_user(payload: UsuarioCreateIn, db: Session = Depends(get_db)):
                 "Error interno de base de datos al asociar la ubicación",
             )
 
-    return u
+    # Serializado aquí: ubicacion_id es una relación y se carga en este hilo
+    return UsuarioOut.model_validate(u)
 
 
 
@@ -241,23 +295,26 @@ def list_users(
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor (ignora offset)"),
+    include_total: IncludeTotal = Query("exact", description="exact|estimate|false"),
     q: Optional[str] = Query(None, description="Busca en username, email, nombre o apellidos (contiene)"),
     role: Optional[RoleLiteral] = Query(None),
     active: Optional[bool] = Query(None),
+    ordenar: Literal["id_desc", "relevancia"] = Query("id_desc"),
 ):
-    stmt = select(Usuario)
+    if ordenar == "relevancia" and not (q and q.strip()):
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[{"loc": ["query", "ordenar"], "msg": "ordenar=relevancia requiere el parámetro q", "type": "value_error"}],
+        )
+
+    stmt = select(Usuario).options(CON_UBICACION)
     count_stmt = select(func.count()).select_from(Usuario)
 
     conds = []
     if q:
-        like = f"%{q.strip()}%"
         # Búsqueda ampliada a nombre y apellidos
-        conds.append(
-            Usuario.username.ilike(like) | 
-            Usuario.email.ilike(like) | 
-            Usuario.nombre.ilike(like) | 
-            Usuario.apellidos.ilike(like)
-        )
+        conds.append(search_condition(db, SEARCH_COLS, q))
     if role:
         conds.append(Usuario.role == role)
     if active is not None:
@@ -268,13 +325,10 @@ def list_users(
             stmt = stmt.where(c)
             count_stmt = count_stmt.where(c)
 
-    stmt = stmt.order_by(Usuario.id.desc())
-
-    total = db.exec(count_stmt).one()
-    response.headers["X-Total-Count"] = str(total)
+    set_total_count(db, response, count_stmt, stmt, include_total)
 
-    stmt = stmt.limit(limit).offset(offset)
-    return db.exec(stmt).all()
+    keys = relevance_keys(db, SEARCH_COLS, q, Usuario.id) if ordenar == "relevancia" else SORT_KEYS[ordenar]
+    return paginate(db, stmt, response, keys, ordenar, limit, offset, cursor)
 
 
 @router.get(
@@ -284,7 +338,7 @@ def list_users(
     dependencies=[Depends(require_role("ADMIN"))],
 )
 def get_user(user_id: int, db: Session = Depends(get_db)):
-    u = db.get(Usuario, user_id)
+    u = db.get(Usuario, user_id, options=[CON_UBICACION])
     if not u:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Usuario no encontrado")
     return u
@@ -334,6 +388,10 @@ def update_user(user_id: int, payload: UsuarioUpdateIn, db: Session = Depends(ge
                 "La ubicación ya está asociada a otro usuario",
             )
 
+    # Desactivar o cambiar el rol invalida sus tokens (llevan el rol en el claim)
+    if (payload.active is False and u.active) or (payload.role is not None and payload.role != u.role):
+        _revocar_sesiones(u.id)
+
     # Campos básicos
     if payload.email is not None:
         u.email = str(payload.email).strip()
@@ -363,7 +421,6 @@ def update_user(user_id: int, payload: UsuarioUpdateIn, db: Session = Depends(ge
         db.add(u)
         db.commit()
         db.refresh(u)
-        return u
     except IntegrityError:
         db.rollback()
         raise HTTPException(status.HTTP_409_CONFLICT, "Email ya en uso")
@@ -373,6 +430,7 @@ def update_user(user_id: int, payload: UsuarioUpdateIn, db: Session = Depends(ge
             status.HTTP_500_INTERNAL_SERVER_ERROR,
             "Error interno de base de datos",
         )
+    return u
 
 
 
@@ -381,13 +439,10 @@ def update_user(user_id: int, payload: UsuarioUpdateIn, db: Session = Depends(ge
     status_code=status.HTTP_204_NO_CONTENT,
     dependencies=[Depends(require_role("ADMIN"))],
 )
-def reset_password(user_id: int, payload: PasswordChangeIn, db: Session = Depends(get_db)):
-    u = db.get(Usuario, user_id)
-    if not u:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Usuario no encontrado")
-    u.password_hash = hash_password(payload.password)
-    db.add(u)
-    db.commit()
+async def reset_password(user_id: int, payload: PasswordChangeIn, db: Session = Depends(get_db)):
+    u = await run_in_threadpool(_get_usuario_or_404, db, user_id)
+    password_hash = await hash_password_pooled(payload.password)
+    await run_in_threadpool(_guardar_password, db, u, password_hash)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -405,6 +460,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     if u.role == "ADMIN" and u.active and not _last_admin_guard(db, exclude_user_id=user_id):
         raise HTTPException(status.HTTP_409_CONFLICT, "No puedes borrar al último ADMIN activo")
 
+    _revocar_sesiones(user_id)
     try:
         db.delete(u)
         db.commit()
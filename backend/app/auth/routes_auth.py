@@ -4,26 +4,30 @@ from typing import Optional, Dict, Any
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
 from jose import jwt, JWTError
 
+from app.core.client_ip import client_ip
 from app.core.config import settings
 from app.core.deps import get_db
 from app.core.security import (
-    verify_password,
+    verify_password_pooled,
     issue_token_pair,
     revoke_token_by_payload,
+    revoke_all_user_tokens,
+    is_epoch_revoked,
     is_revoked,
     decode_token,
     validate_token_type,
     try_decode_token,
 )
 from app.core.rate_limit import (
-    is_locked as rl_is_locked,
-    incr_login_fail as rl_incr_fail,
-    lock_if_needed as rl_lock_if_needed,
+    check_login_attempt as rl_check_attempt,
+    give_back_login_attempt as rl_give_back,
+    register_login_fail as rl_register_fail,
     reset_login_counters_and_unlock as rl_reset_ok,
 )
 from app.models.usuario import Usuario
@@ -72,17 +76,8 @@ def _db_user_by_username_or_email(db: Session, username_or_email: str) -> Option
 
 
 def _client_ip(req: Request) -> str:
-    # Respeta proxy inverso si existe
-    xfwd = req.headers.get("x-forwarded-for")
-    if xfwd:
-        # Toma el primer IP de la lista
-        ip = xfwd.split(",")[0].strip()
-        if ip:
-            return ip
-    xreal = req.headers.get("x-real-ip")
-    if xreal:
-        return xreal.strip()
-    return req.client.host if req.client else "unknown"
+    # X-Forwarded-For / X-Real-IP sólo si la conexión viene de TRUSTED_PROXIES
+    return client_ip(req.scope) or "unknown"
 
 
 def _decode_unverified(token: str) -> Dict[str, Any]:
@@ -119,29 +114,55 @@ def _auth_401(detail: str) -> HTTPException:
 # ---------------------------
 # Endpoints
 # ---------------------------
-@router.post("/login", response_model=TokenOut)
-def login(payload: LoginIn, req: Request, resp: Response, db: Session = Depends(get_db)) -> TokenOut:
-    ip = _client_ip(req)
-    user_key = _norm_login_key(payload.username_or_email)
+def _give_back_attempt(user_key: str, ip: str) -> None:
+    # Fallo ajeno a las credenciales: el intento no cuenta para el bloqueo
+    try:
+        rl_give_back(user_key, ip)
+    except Exception as e:
+        logger.error("No se pudo descontar el intento de login: %s", e)
+
 
-    # Verificar bloqueo por rate limiting
-    locked, ttl, _ = rl_is_locked(user_key, ip)
+def _login_prepare(db: Session, user_key: str, ip: str, username_or_email: str) -> Optional[Usuario]:
+    # Verificar bloqueo por rate limiting (y contar este intento)
+    locked, ttl, _ = rl_check_attempt(user_key, ip)
     if locked:
         raise HTTPException(
             status.HTTP_429_TOO_MANY_REQUESTS,
             detail=f"Demasiados intentos. Intente en {ttl}s",
         )
+    try:
+        return _db_user_by_username_or_email(db, username_or_email)
+    except Exception:
+        _give_back_attempt(user_key, ip)
+        raise
+
+
+def _login_ok(user_key: str, ip: str, user: Usuario):
+    rl_reset_ok(user_key, ip)
+    return issue_token_pair(user.id, user.role)
+
+
+@router.post("/login", response_model=TokenOut)
+async def login(payload: LoginIn, req: Request, resp: Response, db: Session = Depends(get_db)) -> TokenOut:
+    # async: la verificación Argon2 se espera en el event loop (pool propio);
+    # Redis y BD van al threadpool sólo lo que duran
+    ip = _client_ip(req)
+    user_key = _norm_login_key(payload.username_or_email)
 
     # Buscar usuario y verificar credenciales
-    user = _db_user_by_username_or_email(db, payload.username_or_email)
-    if not user or not user.active or not verify_password(payload.password, user.password_hash):
-        rl_incr_fail(user_key, ip)
-        rl_lock_if_needed(user_key, ip)
+    user = await run_in_threadpool(_login_prepare, db, user_key, ip, payload.username_or_email)
+    try:
+        ok = bool(user and user.active and await verify_password_pooled(payload.password, user.password_hash))
+    except Exception:
+        # 503 del pool de Argon2 u otro error: no es un fallo de credenciales
+        await run_in_threadpool(_give_back_attempt, user_key, ip)
+        raise
+    if not ok:
+        await run_in_threadpool(rl_register_fail, user_key, ip)
         raise _auth_401("Credenciales inválidas")
 
     # Login exitoso
-    rl_reset_ok(user_key, ip)
-    access_token, refresh_token, _, _ = issue_token_pair(user.id, user.role)
+    access_token, refresh_token, _, _ = await run_in_threadpool(_login_ok, user_key, ip, user)
 
     logger.info(
         "Login exitoso",
@@ -183,7 +204,8 @@ def refresh_token(resp: Response, creds: Optional[HTTPAuthorizationCredentials]
         raise _auth_401("Token no es de tipo refresh")
 
     jti = claims.get("jti")
-    if is_revoked(jti):
+    # strict: la rotación de refresh siempre se valida contra Redis
+    if is_revoked(jti, strict=True) or is_epoch_revoked(claims, strict=True):
         logger.warning("Refresh token revocado", extra={"event": "auth_refresh_revoked"})
         raise _auth_401("Refresh token revocado")
 
@@ -260,9 +282,9 @@ def logout_all(
     db: Session = Depends(get_db),
 ):
     """
-    Logout global - revoca el token actual y prepara el terreno para revocar todos.
-    Nota: para revocar *todos* los tokens de un usuario de forma efectiva
-    habría que mantener un set de JTI por usuario en Redis (pendiente de implementar).
+    Logout global: invalida todos los tokens (access y refresh) emitidos
+    hasta ahora para el usuario, incluido el actual, incrementando su época
+    de token (ver security.revoke_all_user_tokens).
     """
     if not creds or not creds.credentials:
         raise _auth_401("Falta token en Authorization")
@@ -276,20 +298,22 @@ def logout_all(
     user_id = claims.get("sub")
     if not user_id:
         raise _auth_401("Token sin subject")
+    if is_revoked(claims.get("jti")) or is_epoch_revoked(claims):
+        raise _auth_401("Token revocado")
 
     user = db.get(Usuario, int(user_id))
     if not user:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
 
-    # Revocamos, al menos, el token actual
-    revoke_token_by_payload(claims)
-    logger.info("Logout global iniciado", extra={"event": "auth_logout_all", "user_id": user_id})
+    epoch = revoke_all_user_tokens(user.id)
+    if not epoch:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="No se pudo cerrar la sesión en todos los dispositivos; inténtelo de nuevo",
+        )
+    logger.info("Logout global", extra={"event": "auth_logout_all", "user_id": user_id, "epoch": epoch})
 
-    return {
-        "detail": "Logout global iniciado",
-        "user_id": user_id,
-        "mensaje": "Token actual revocado. Para revocar todos los tokens activos, implementa tracking de JTI por usuario.",
-    }
+    return {"detail": "Sesiones cerradas", "user_id": user_id}
 
 
 @router.post("/debug/decode")
@@ -1,8 +1,126 @@
 # app/core/cache.py
+import logging
+from typing import Literal, Optional, Tuple
+
 import redis
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
 from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models.equipo import Equipo
+
+log = logging.getLogger(__name__)
+
+
+# ===========================
+#   LOOKUP DE EQUIPOS (NFC / identidad)
+# ===========================
+# Read-through: "equipo:lookup:{campo}:{valor normalizado}" -> id del equipo,
+# o "-" si no existe (caché negativa, TTL corto). Se guarda el id y no la fila:
+# el equipo se relee por PK, así un movimiento (cambio de ubicación/estado) no
+# deja datos obsoletos. Si Redis falla se consulta la BD directamente.
+LookupField = Literal["nfc_tag", "identidad"]
+
+_NEGATIVE = "-"
+
+
+def _lookup_key(campo: LookupField, valor: str) -> str:
+    return f"equipo:lookup:{campo}:{valor}"
+
+
+def _norm_lookup(valor: Optional[str]) -> str:
+    return (valor or "").strip().lower()
+
+
+def _query_equipo(db: Session, campo: LookupField, valor: str) -> Optional[Equipo]:
+    col = Equipo.nfc_tag if campo == "nfc_tag" else Equipo.identidad
+    return db.exec(select(Equipo).where(func.lower(col) == valor)).first()
+
+
+def _read_lookup(key: str) -> Tuple[bool, Optional[str]]:
+    """(Redis disponible, valor cacheado)."""
+    try:
+        return True, get_redis().get(key)
+    except redis.RedisError as e:
+        log.warning("Caché de equipos no disponible: %s", e)
+        return False, None
+
+
+def _resolve_lookup(
+    db: Session, campo: LookupField, valor: str, cached: Optional[str]
+) -> Tuple[Optional[Equipo], bool]:
+    """Sólo BD: (equipo, si hay que guardar el resultado en la caché)."""
+    if cached == _NEGATIVE:
+        return None, False
+    if cached is not None:
+        eq = db.get(Equipo, int(cached))
+        # Entrada obsoleta (carrera con una invalidación): se descarta y se consulta
+        if eq is not None and _norm_lookup(getattr(eq, campo)) == valor:
+            return eq, False
+    return _query_equipo(db, campo, valor), True
+
+
+def _store_lookup(key: str, eq: Optional[Equipo]) -> None:
+    try:
+        if eq is None:
+            get_redis().setex(key, settings.EQUIPO_LOOKUP_NEGATIVE_TTL_SECONDS, _NEGATIVE)
+        else:
+            get_redis().setex(key, settings.EQUIPO_LOOKUP_TTL_SECONDS, eq.id)
+    except redis.RedisError:
+        pass
+
+
+def get_equipo_by_lookup(db: Session, campo: LookupField, valor: str) -> Optional[Equipo]:
+    """Busca un equipo por nfc_tag o identidad (case-insensitive) pasando por la caché."""
+    valor = _norm_lookup(valor)
+    if not valor:
+        return None
+    key = _lookup_key(campo, valor)
+
+    redis_ok, cached = _read_lookup(key)
+    if not redis_ok:
+        return _query_equipo(db, campo, valor)
+    eq, store = _resolve_lookup(db, campo, valor, cached)
+    if store:
+        _store_lookup(key, eq)
+    return eq
+
+
+async def get_equipo_by_lookup_async(db: AsyncSession, campo: LookupField, valor: str) -> Optional[Equipo]:
+    """
+    get_equipo_by_lookup para rutas async: la BD con db.run_sync() y Redis
+    (cliente síncrono) en el threadpool, nunca en el event loop.
+    """
+    valor = _norm_lookup(valor)
+    if not valor:
+        return None
+    key = _lookup_key(campo, valor)
+
+    redis_ok, cached = await run_in_threadpool(_read_lookup, key)
+    if not redis_ok:
+        return await db.run_sync(_query_equipo, campo, valor)
+    eq, store = await db.run_sync(_resolve_lookup, campo, valor, cached)
+    if store:
+        await run_in_threadpool(_store_lookup, key, eq)
+    return eq
 
-_pool = redis.ConnectionPool.from_url(settings.REDIS_URL, decode_responses=True)
 
-def get_redis() -> redis.Redis:
-    return redis.Redis(connection_pool=_pool)
+def invalidate_equipo_lookup(
+    nfc_tags: tuple[Optional[str], ...] = (),
+    identidades: tuple[Optional[str], ...] = (),
+) -> None:
+    """
+    Borra las entradas de los valores indicados (antiguos y nuevos).
+    Llamar tras el commit de cualquier cambio de nfc_tag/identidad o borrado.
+    """
+    keys = [_lookup_key("nfc_tag", _norm_lookup(v)) for v in nfc_tags if _norm_lookup(v)]
+    keys += [_lookup_key("identidad", _norm_lookup(v)) for v in identidades if _norm_lookup(v)]
+    if not keys:
+        return
+    try:
+        get_redis().delete(*keys)
+    except redis.RedisError as e:
+        log.warning("No se pudo invalidar la caché de equipos: %s", e)
@@ -0,0 +1,67 @@
+# app/core/client_ip.py
+import ipaddress
+import logging
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple, Union
+
+from starlette.types import Scope
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+# ---------------------------
+# IP real del cliente detrás de proxies
+# ---------------------------
+# X-Forwarded-For / X-Real-IP sólo cuentan si la conexión viene de un proxy de
+# TRUSTED_PROXIES; si no, cualquiera podría elegir su propia IP (y con ella su
+# clave de rate limit o de bloqueo de login).
+Red = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def header(scope: Scope, name: bytes) -> Optional[str]:
+    for k, v in scope.get("headers") or ():
+        if k == name:
+            return v.decode("latin-1")
+    return None
+
+
+@lru_cache(maxsize=8)
+def _parse(proxies: Tuple[str, ...]) -> Tuple[Red, ...]:
+    redes = []
+    for p in proxies:
+        try:
+            redes.append(ipaddress.ip_network(p, strict=False))
+        except ValueError:
+            log.warning("TRUSTED_PROXIES: entrada no válida ignorada: %r", p)
+    return tuple(redes)
+
+
+def trusted_networks(proxies: Optional[Sequence[str]] = None) -> Tuple[Red, ...]:
+    """Redes de los proxies indicados o, por defecto, de TRUSTED_PROXIES."""
+    return _parse(tuple(settings.trusted_proxies_list if proxies is None else proxies))
+
+
+def _en(ip: str, redes: Sequence[Red]) -> bool:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(addr in red for red in redes)
+
+
+def client_ip(scope: Scope, proxies: Optional[Sequence[Red]] = None) -> str:
+    """IP del cliente ('' si no se conoce); por defecto con TRUSTED_PROXIES."""
+    if proxies is None:
+        proxies = trusted_networks()
+    peer = scope["client"][0] if scope.get("client") else ""
+    if not peer or not _en(peer, proxies):
+        return peer
+    # Desde el final: la primera IP que no sea de un proxy propio es el cliente
+    saltos = [x.strip() for x in (header(scope, b"x-forwarded-for") or "").split(",") if x.strip()]
+    for ip in reversed(saltos):
+        if not _en(ip, proxies):
+            return ip
+    if saltos:
+        return saltos[0]
+    return (header(scope, b"x-real-ip") or "").strip() or peer
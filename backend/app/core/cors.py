@@ -7,7 +7,7 @@ def add_cors(app) -> None:
     """
     Monta CORSMiddleware usando los valores tipados de settings.
     - Soporta orígenes desde CSV/JSON vía CORS_ALLOWED_ORIGINS_RAW.
-    - Expone X-Total-Count y Location (usados por listados/creaciones).
+    - Expone X-Total-Count(-Estimated), X-Next-Cursor y Location (usados por listados/creaciones).
     """
     app.add_middleware(
         CORSMiddleware,
@@ -1,19 +1,22 @@
 # app/core/db.py
-from typing import Generator, Optional
+from typing import AsyncGenerator, Generator, Optional
 from contextlib import contextmanager
 
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.pool import StaticPool
 from app.core.config import settings
 
 
-def _build_engine():
+def _build_engine(url: Optional[str] = None):
     """
     Construye un motor SQLAlchemy/SQLModel con parámetros sacados de settings.
     - Postgres/MySQL: aplica pre_ping y pooling configurable.
     - SQLite: maneja connect_args y pool apropiado (especialmente en memoria).
+    'url' permite reutilizarlo para las réplicas de lectura (app/core/replicas.py).
     """
-    url: str = settings.DATABASE_URL
+    url = url or settings.DATABASE_URL
     echo: bool = bool(getattr(settings, "DB_ECHO", False))
 
     # SQLite (file o memoria)
@@ -51,6 +54,54 @@ def _build_engine():
 engine = _build_engine()
 
 
+def _build_async_engine(url: Optional[str] = None) -> AsyncEngine:
+    """
+    Motor asíncrono para las rutas 'async def' (listados, lecturas, NFC).
+    - Postgres: la misma URL postgresql+psycopg:// (psycopg 3 tiene driver async).
+    - SQLite: requiere aiosqlite (sqlite+aiosqlite://).
+    Tiene su propio pool (DB_ASYNC_POOL_SIZE): en las rutas async la concurrencia
+    ya no la limita el threadpool sino este pool.
+    """
+    url = url or settings.DATABASE_URL
+    echo: bool = bool(getattr(settings, "DB_ECHO", False))
+
+    if url.startswith("sqlite"):
+        url = url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+        kwargs = dict(echo=echo)
+        if ":memory:" in url:
+            kwargs["poolclass"] = StaticPool
+        return create_async_engine(url, **kwargs)
+
+    return create_async_engine(
+        url,
+        echo=echo,
+        pool_pre_ping=True,
+        pool_size=settings.DB_ASYNC_POOL_SIZE,
+        max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+        pool_recycle=getattr(settings, "DB_POOL_RECYCLE", 3600),
+        pool_timeout=getattr(settings, "DB_POOL_TIMEOUT", 30),
+    )
+
+
+# Motor async (perezoso: sólo se crea si alguna ruta async lo usa)
+_async_engine: Optional[AsyncEngine] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = _build_async_engine()
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    """Cierra el pool async (apagado de la app)."""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
 def init_db() -> None:
     """
     Inicializa el esquema en DEV si no usas Alembic.
@@ -77,6 +128,15 @@ def get_session() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependencia async (yield). expire_on_commit=False: tras commit los objetos
+    se serializan sin recargar atributos (en async no hay carga implícita).
+    """
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
 @contextmanager
 def session_scope() -> Generator[Session, None, None]:
     """
@@ -1,15 +1,20 @@
 # app/core/deps.py
-from typing import Generator, Any, Dict, Callable, Optional
+from contextlib import contextmanager
+from functools import partial
+from typing import AsyncGenerator, ContextManager, Generator, Any, Dict, Callable, Optional
 
 import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.db import get_session
+from app.core.db import get_async_session, get_session
+from app.core.replicas import get_async_read_session, get_read_session
 from app.models.usuario import Usuario
 from app.core.security import (
-    decode_token,
+    decode_token_cached,
+    is_epoch_revoked,
     is_revoked,
     validate_token_type,
 )
@@ -27,6 +32,16 @@ def get_db() -> Generator[Session, None, None]:
     yield from get_session()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sesión async para rutas 'async def'. Los helpers síncronos de BD (paginate,
+    ...) se reutilizan con db.run_sync(); los que además usan Redis tienen
+    variante async (get_equipo_by_lookup_async, set_total_count_async).
+    """
+    async for session in get_async_session():
+        yield session
+
+
 # ----- Dependencias de usuario actual (desde el token) -----
 def current_user(
     creds: HTTPAuthorizationCredentials = Depends(security),
@@ -38,7 +53,7 @@ def current_user(
     Requisitos:
     - JWT válido (firma/exp/nbf…)
     - type == "access"
-    - no revocado (Redis)
+    - no revocado (Redis): ni su jti ni por época (logout global)
     """
     if not creds or not creds.credentials:
         raise HTTPException(
@@ -51,7 +66,7 @@ def current_user(
     # ---------- DEBUG TEMPORAL (diagnóstico de por qué sale 401) ----------
     try:
         # Si sospechas de reloj/tiempos, puedes subir a 120
-        payload = decode_token(token, leeway_seconds=30)
+        payload = decode_token_cached(token, leeway_seconds=30)
         logger.debug(
             "JWT decodificado OK: sub=%s type=%s jti=%s iss=%s aud=%s",
             payload.get("sub"),
@@ -83,7 +98,7 @@ def current_user(
 
     # Revocación opcional (Redis)
     jti = payload.get("jti")
-    if is_revoked(jti):
+    if is_revoked(jti) or is_epoch_revoked(payload):
         logger.warning("Token revocado detectado: jti=%s", jti)  # <--- QUITAR luego
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -113,6 +128,33 @@ def current_user(
     return {"id": sub_cast, "role": role, "jti": jti}
 
 
+# ----- Sesión de sólo lectura (réplica si hay; ver app/core/replicas.py) -----
+# Dependen de current_user para aplicar read-your-writes por usuario; FastAPI
+# reutiliza su resultado si la ruta ya depende de current_user.
+def get_read_db(
+    user: Dict[str, Any] = Depends(current_user),
+) -> Generator[Session, None, None]:
+    yield from get_read_session(user["id"])
+
+
+async def get_async_read_db(
+    user: Dict[str, Any] = Depends(current_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    async for session in get_async_read_session(user["id"]):
+        yield session
+
+
+def get_stream_read_db(
+    user: Dict[str, Any] = Depends(current_user),
+) -> Callable[[], ContextManager[Session]]:
+    """
+    Para StreamingResponse (p.ej. /export): las dependencias con yield se
+    cierran antes de enviar el cuerpo, así que se entrega una factoría y es el
+    generador del cuerpo quien abre y cierra la sesión de lectura.
+    """
+    return partial(contextmanager(get_read_session), user["id"])
+
+
 def current_active_user_obj(
     db: Session = Depends(get_db),
     user: Dict[str, Any] = Depends(current_user),
@@ -0,0 +1,334 @@
+# app/core/equipo_import.py
+import argparse
+import csv
+import io
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, get_args
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.cache import invalidate_equipo_lookup
+from app.core.config import settings
+from app.models.equipo import EstadoEquipo, TIPOS_CANONICOS, TIPOS_VALIDOS
+
+# ---------------------------
+# Importación masiva de equipos (CSV / XLSX)
+# ---------------------------
+# El fichero se lee fila a fila (csv.reader / openpyxl en read_only) y se
+# procesa en lotes de IMPORT_BATCH_SIZE. Por lote:
+#   1) validación por fila (tipo, estado, longitudes, ids numéricos);
+#   2) duplicados de identidad/nfc_tag dentro del fichero (sin distinguir
+#      mayúsculas, contra todo lo leído antes);
+#   3) UNA consulta para duplicados en BD y una por FK (sección/ubicación);
+#   4) COPY de las filas válidas (los triggers de equipo_stats se disparan
+#      una vez por lote).
+# Las mismas reglas que POST /equipos: nfc_tag en minúsculas, tipo canónico.
+# No hace commit: lo decide quien llama (dry_run / todo_o_nada).
+COLUMNAS = ("identidad", "numero_serie", "tipo", "estado", "notas", "seccion_id", "ubicacion_id", "nfc_tag")
+_LONGITUDES = {"identidad": 100, "numero_serie": 150, "tipo": 100, "nfc_tag": 64}
+_ESTADOS = set(get_args(EstadoEquipo))
+MAX_ERRORES = 1000   # errores detallados en el informe (el total se cuenta siempre)
+
+
+class ImportFormatError(ValueError):
+    """Fichero ilegible o sin las columnas necesarias (se rechaza entero)."""
+
+
+@dataclass
+class ImportReport:
+    procesadas: int = 0
+    creadas: int = 0
+    errores_total: int = 0
+    errores: List[Dict[str, Any]] = field(default_factory=list)
+    # Valores insertados, para limpiar la caché de lookup tras el commit
+    identidades: List[str] = field(default_factory=list, repr=False)
+    nfc_tags: List[str] = field(default_factory=list, repr=False)
+
+    def error(self, fila: int, campo: Optional[str], msg: str) -> None:
+        self.errores_total += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({"fila": fila, "campo": campo, "msg": msg})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "procesadas": self.procesadas,
+            "creadas": self.creadas,
+            "errores_total": self.errores_total,
+            "errores": self.errores,
+        }
+
+
+# ---------- Lectura ----------
+def _cabecera(nombres: Iterable[Any]) -> List[Optional[str]]:
+    cab = [str(n).strip().lower() if n is not None else None for n in nombres]
+    if "tipo" not in cab:
+        raise ImportFormatError("Falta la columna obligatoria 'tipo'")
+    return [c if c in COLUMNAS else None for c in cab]
+
+
+def _filas_csv(fh: IO[bytes]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    texto = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    try:
+        muestra = texto.read(4096)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        texto.seek(0)
+        reader = csv.reader(texto, dialecto)
+        cab = _cabecera(next(reader, None) or [])
+        for n, valores in enumerate(reader, start=2):
+            if any(v.strip() for v in valores):
+                yield n, {c: v for c, v in zip(cab, valores) if c}
+    except UnicodeDecodeError:
+        raise ImportFormatError("El CSV debe estar en UTF-8")
+    finally:
+        texto.detach()
+
+
+def _filas_xlsx(fh: IO[bytes]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("Importar XLSX requiere openpyxl")
+    try:
+        wb = load_workbook(fh, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFormatError("XLSX ilegible")
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        cab = _cabecera(next(rows, None) or [])
+        for n, valores in enumerate(rows, start=2):
+            if any(v is not None and str(v).strip() for v in valores):
+                yield n, {c: v for c, v in zip(cab, valores) if c}
+    finally:
+        wb.close()
+
+
+def leer_filas(fh: IO[bytes], formato: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(nº de fila del fichero, {columna: valor}) para 'csv' o 'xlsx'."""
+    if formato == "csv":
+        return _filas_csv(fh)
+    if formato == "xlsx":
+        return _filas_xlsx(fh)
+    raise ImportFormatError("Formato no soportado (csv|xlsx)")
+
+
+# ---------- Validación ----------
+def _texto(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    # XLSX: números enteros llegan como float (1.0)
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    s = str(v).strip()
+    return s or None
+
+
+def _entero(v: Any) -> Optional[int]:
+    s = _texto(v)
+    if s is None:
+        return None
+    n = int(s)
+    if n <= 0:
+        raise ValueError
+    return n
+
+
+def _validar_fila(n: int, raw: Dict[str, Any], rep: ImportReport) -> Optional[Dict[str, Any]]:
+    """Fila normalizada o None (errores añadidos al informe)."""
+    fila = {c: _texto(raw.get(c)) for c in ("identidad", "numero_serie", "tipo", "estado", "notas", "nfc_tag")}
+    ok = True
+
+    tipo = fila["tipo"] or ""
+    if tipo.lower() not in TIPOS_CANONICOS:
+        rep.error(n, "tipo", f"Tipo inválido. Válidos: {', '.join(sorted(TIPOS_VALIDOS))}")
+        ok = False
+    else:
+        fila["tipo"] = TIPOS_CANONICOS[tipo.lower()]
+
+    estado = (fila["estado"] or "OPERATIVO").upper()
+    if estado not in _ESTADOS:
+        rep.error(n, "estado", f"Estado inválido. Válidos: {', '.join(sorted(_ESTADOS))}")
+        ok = False
+    fila["estado"] = estado
+
+    if fila["nfc_tag"]:
+        fila["nfc_tag"] = fila["nfc_tag"].lower()
+    for campo, maximo in _LONGITUDES.items():
+        if fila[campo] and len(fila[campo]) > maximo:
+            rep.error(n, campo, f"Máximo {maximo} caracteres")
+            ok = False
+
+    for campo in ("seccion_id", "ubicacion_id"):
+        try:
+            fila[campo] = _entero(raw.get(campo))
+        except (TypeError, ValueError):
+            rep.error(n, campo, "Debe ser un entero positivo")
+            ok = False
+    return fila if ok else None
+
+
+# ---------- Lotes ----------
+class _Importador:
+    def __init__(self, db: Session, rep: ImportReport, dry_run: bool) -> None:
+        self.db = db
+        self.rep = rep
+        self.dry_run = dry_run
+        self.identidades: Set[str] = set()   # vistas en el fichero (minúsculas)
+        self.nfc_tags: Set[str] = set()
+        self.secciones: Dict[int, bool] = {}
+        self.ubicaciones: Dict[int, Optional[int]] = {}   # id -> seccion_id (ausente = no existe)
+
+    def _cargar_fks(self, lote: List[Tuple[int, Dict[str, Any]]]) -> None:
+        secc = {f["seccion_id"] for _, f in lote if f["seccion_id"]} - set(self.secciones)
+        ubic = {f["ubicacion_id"] for _, f in lote if f["ubicacion_id"]} - set(self.ubicaciones)
+        if secc:
+            existentes = set(self.db.exec(
+                text("SELECT id FROM seccion WHERE id = ANY(:ids)"), params={"ids": list(secc)}
+            ).scalars())
+            self.secciones.update({s: s in existentes for s in secc})
+        if ubic:
+            rows = self.db.exec(
+                text("SELECT id, seccion_id FROM ubicacion WHERE id = ANY(:ids)"), params={"ids": list(ubic)}
+            ).all()
+            self.ubicaciones.update({u: s for u, s in rows})
+
+    def _duplicados_bd(self, lote: List[Tuple[int, Dict[str, Any]]]) -> Tuple[Set[str], Set[str]]:
+        ids = [f["identidad"].lower() for _, f in lote if f["identidad"]]
+        nfcs = [f["nfc_tag"] for _, f in lote if f["nfc_tag"]]
+        if not ids and not nfcs:
+            return set(), set()
+        # Join contra unnest (no '= ANY(...) OR ...'): índice lower() si existe
+        # y, si no, un hash join; nunca filas x lote comparaciones
+        rows = self.db.exec(
+            text(
+                "SELECT 'i', v.x FROM unnest(CAST(:ids AS text[])) AS v(x) "
+                "WHERE EXISTS (SELECT 1 FROM equipo e WHERE lower(e.identidad) = v.x) "
+                "UNION ALL "
+                "SELECT 'n', v.x FROM unnest(CAST(:nfcs AS text[])) AS v(x) "
+                "WHERE EXISTS (SELECT 1 FROM equipo e WHERE lower(e.nfc_tag) = v.x)"
+            ),
+            params={"ids": ids, "nfcs": nfcs},
+        ).all()
+        return {x for k, x in rows if k == "i"}, {x for k, x in rows if k == "n"}
+
+    def procesar(self, lote: List[Tuple[int, Dict[str, Any]]]) -> None:
+        self._cargar_fks(lote)
+        en_bd_ids, en_bd_nfcs = self._duplicados_bd(lote)
+        validas = []
+        for n, f in lote:
+            ok = True
+            if f["seccion_id"] and not self.secciones.get(f["seccion_id"]):
+                self.rep.error(n, "seccion_id", "Sección inexistente")
+                ok = False
+            if f["ubicacion_id"]:
+                if f["ubicacion_id"] not in self.ubicaciones:
+                    self.rep.error(n, "ubicacion_id", "Ubicación inexistente")
+                    ok = False
+                else:
+                    useccion = self.ubicaciones[f["ubicacion_id"]]
+                    if f["seccion_id"] and useccion and useccion != f["seccion_id"]:
+                        self.rep.error(n, "ubicacion_id", "La ubicación no pertenece a la sección indicada")
+                        ok = False
+            ident = f["identidad"].lower() if f["identidad"] else None
+            if ident and ident in en_bd_ids:
+                self.rep.error(n, "identidad", "identidad ya existe")
+                ok = False
+            elif ident and ident in self.identidades:
+                self.rep.error(n, "identidad", "identidad repetida en el fichero")
+                ok = False
+            nfc = f["nfc_tag"]
+            if nfc and nfc in en_bd_nfcs:
+                self.rep.error(n, "nfc_tag", "nfc_tag ya existe")
+                ok = False
+            elif nfc and nfc in self.nfc_tags:
+                self.rep.error(n, "nfc_tag", "nfc_tag repetido en el fichero")
+                ok = False
+            # Las vistas cuentan aunque la fila falle por otro motivo
+            if ident:
+                self.identidades.add(ident)
+            if nfc:
+                self.nfc_tags.add(nfc)
+            if ok:
+                validas.append(f)
+
+        if validas and not self.dry_run:
+            self._copy(validas)
+            self.rep.identidades.extend(f["identidad"] for f in validas if f["identidad"])
+            self.rep.nfc_tags.extend(f["nfc_tag"] for f in validas if f["nfc_tag"])
+        self.rep.creadas += len(validas)
+
+    def _copy(self, filas: List[Dict[str, Any]]) -> None:
+        cur = self.db.connection().connection.driver_connection.cursor()
+        with cur.copy(f"COPY equipo ({', '.join(COLUMNAS)}) FROM STDIN") as copy:
+            for f in filas:
+                copy.write_row(tuple(f[c] for c in COLUMNAS))
+
+
+def importar_equipos(
+    db: Session,
+    filas: Iterable[Tuple[int, Dict[str, Any]]],
+    dry_run: bool = False,
+) -> ImportReport:
+    """
+    Valida e inserta. Con dry_run sólo valida (las filas 'creadas' son las que
+    se crearían). Sin commit. Puede lanzar ImportFormatError al leer.
+    """
+    rep = ImportReport()
+    imp = _Importador(db, rep, dry_run)
+    # Importaciones concurrentes se serializan (la unicidad la comprueba la app)
+    db.exec(text("SELECT pg_advisory_xact_lock(hashtext('equipo_import'))"))
+    lote: List[Tuple[int, Dict[str, Any]]] = []
+    for n, raw in filas:
+        rep.procesadas += 1
+        fila = _validar_fila(n, raw, rep)
+        if fila is not None:
+            lote.append((n, fila))
+        if len(lote) >= settings.IMPORT_BATCH_SIZE:
+            imp.procesar(lote)
+            lote = []
+    if lote:
+        imp.procesar(lote)
+    return rep
+
+
+def invalidar_cache(rep: ImportReport) -> None:
+    """Tras el commit: borra entradas negativas de la caché de lookup (por trozos)."""
+    for i in range(0, max(len(rep.identidades), len(rep.nfc_tags)), 1000):
+        invalidate_equipo_lookup(
+            nfc_tags=tuple(rep.nfc_tags[i:i + 1000]), identidades=tuple(rep.identidades[i:i + 1000])
+        )
+
+
+def formato_de(nombre: Optional[str]) -> str:
+    return "xlsx" if (nombre or "").lower().endswith((".xlsx", ".xlsm")) else "csv"
+
+
+if __name__ == "__main__":
+    # Uso:  python -m app.core.equipo_import equipos.csv [--dry-run] [--todo-o-nada]
+    import json
+    import sys
+
+    from app.core.db import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.core.equipo_import")
+    parser.add_argument("fichero")
+    parser.add_argument("--dry-run", action="store_true", help="Sólo validar")
+    parser.add_argument("--todo-o-nada", action="store_true", help="No crear nada si alguna fila falla")
+    args = parser.parse_args()
+
+    with open(args.fichero, "rb") as fh, Session(engine) as s:
+        try:
+            informe = importar_equipos(s, leer_filas(fh, formato_de(args.fichero)), dry_run=args.dry_run)
+        except ImportFormatError as e:
+            sys.exit(str(e))
+        if args.dry_run or (args.todo_o_nada and informe.errores_total):
+            s.rollback()
+            if not args.dry_run:
+                informe.creadas = 0
+        else:
+            s.commit()
+            invalidar_cache(informe)
+    print(json.dumps(informe.as_dict(), ensure_ascii=False, indent=2))
@@ -0,0 +1,84 @@
+# app/core/expand.py
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session
+
+# ---------------------------
+# expand=rel1,rel2 (relaciones anidadas en la respuesta)
+# ---------------------------
+# Las relaciones pedidas se cargan con selectinload: una consulta extra por
+# relación (WHERE id IN (...)) sea cual sea el tamaño de la página, en vez de
+# una petición GET /ubicaciones/{id} por fila desde el cliente.
+# Las respuestas se construyen como dict (expandir) para no tocar nunca una
+# relación sin cargar: con AsyncSession eso sería un lazy load (MissingGreenlet).
+Expand = Tuple[str, ...]
+
+
+class UsuarioResumen(BaseModel):
+    """Usuario anidado en respuestas (sin hash de contraseña ni notas)."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    nombre: Optional[str] = None
+    apellidos: Optional[str] = None
+    role: str
+
+
+def expand_param(*permitidas: str):
+    """Dependencia que valida ?expand= contra las relaciones permitidas del endpoint."""
+    def _dep(
+        expand: Optional[str] = Query(None, description=f"Relaciones a incluir: {','.join(permitidas)}"),
+    ) -> Expand:
+        if not expand:
+            return ()
+        campos = tuple(dict.fromkeys(c.strip() for c in expand.split(",") if c.strip()))
+        invalidas = [c for c in campos if c not in permitidas]
+        if invalidas:
+            raise HTTPException(
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=[{
+                    "loc": ["query", "expand"],
+                    "msg": f"Relación no expandible: {', '.join(invalidas)}. Válidas: {', '.join(permitidas)}",
+                    "type": "value_error",
+                }],
+            )
+        return campos
+
+    return _dep
+
+
+def modelo_expandido(model: Any, relaciones: Dict[str, Any]) -> type[BaseModel]:
+    """
+    Esquema de respuesta: columnas de 'model' + relaciones anidadas opcionales
+    (ausentes de la respuesta si no se piden, con response_model_exclude_none).
+    """
+    campos: Dict[str, Any] = {n: (f.annotation, f) for n, f in model.model_fields.items()}
+    campos.update({rel: (Optional[esquema], None) for rel, esquema in relaciones.items()})
+    return create_model(
+        f"{model.__name__}Expandido",
+        __config__=ConfigDict(from_attributes=True),
+        **campos,
+    )
+
+
+def expand_options(model: Any, campos: Sequence[str]) -> List[Any]:
+    return [selectinload(getattr(model, c)) for c in campos]
+
+
+def cargar_relaciones(db: Session, obj: Any, campos: Sequence[str]) -> None:
+    """Objeto suelto ya cargado (p.ej. desde la caché): una consulta por relación (con run_sync)."""
+    if obj is not None:
+        for c in campos:
+            getattr(obj, c)
+
+
+def expandir(obj: Any, campos: Sequence[str]) -> Dict[str, Any]:
+    """Columnas del objeto + las relaciones pedidas (ya cargadas)."""
+    data = obj.model_dump()
+    for c in campos:
+        data[c] = getattr(obj, c)
+    return data
@@ -0,0 +1,120 @@
+# app/core/export.py
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, ContextManager, Iterator, Literal, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.pagination import SortKey, order_by_clauses
+
+log = logging.getLogger(__name__)
+
+# ---------------------------
+# Exportación en streaming (CSV / NDJSON)
+# ---------------------------
+# La consulta se lee con un cursor del servidor (yield_per => stream_results):
+# el proceso sólo tiene en memoria EXPORT_BATCH_SIZE filas cada vez, sea cual
+# sea el total, y no se calcula ningún COUNT(*).
+# Las dependencias con yield se cierran antes de enviar el cuerpo, así que la
+# sesión la abre (y la cierra al terminar o si el cliente corta) el propio
+# generador a partir de la factoría de deps.get_stream_read_db.
+ExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+SessionFactory = Callable[[], ContextManager[Session]]
+StmtBuilder = Callable[[Session], Any]
+
+
+def _valor(v: Any) -> Any:
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Enum):
+        return v.value
+    if isinstance(v, Decimal):
+        return str(v)
+    return v
+
+
+def _filas(session_factory: SessionFactory, build: StmtBuilder, keys: Sequence[SortKey]) -> Iterator[tuple]:
+    """Primera fila: nombres de columna; después, una tupla por fila."""
+    with session_factory() as db:
+        stmt = build(db)
+        # Columnas de la tabla (no objetos ORM): menos coste por fila
+        entity = stmt.column_descriptions[0]["entity"]
+        cols = list(entity.__table__.columns)
+        stmt = stmt.with_only_columns(*cols).order_by(*order_by_clauses(keys(db) if callable(keys) else keys))
+        result = db.execute(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        try:
+            yield tuple(c.name for c in cols)
+            for row in result:
+                yield tuple(row)
+        finally:
+            result.close()
+
+
+def _csv(filas: Iterator[tuple]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for i, fila in enumerate(filas):
+        writer.writerow(["" if v is None else _valor(v) for v in fila])
+        if i % settings.EXPORT_BATCH_SIZE == 0 or buf.tell() > 64 * 1024:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _ndjson(filas: Iterator[tuple]) -> Iterator[bytes]:
+    nombres = next(filas)
+    trozo = []
+    for fila in filas:
+        trozo.append(json.dumps(dict(zip(nombres, fila)), default=_valor, ensure_ascii=False))
+        if len(trozo) >= settings.EXPORT_BATCH_SIZE:
+            yield ("\n".join(trozo) + "\n").encode("utf-8")
+            trozo = []
+    if trozo:
+        yield ("\n".join(trozo) + "\n").encode("utf-8")
+
+
+def stream_export(
+    session_factory: SessionFactory,
+    build: StmtBuilder,
+    keys: Sequence[SortKey] | Callable[[Session], Sequence[SortKey]],
+    formato: ExportFormat,
+    nombre: str,
+) -> StreamingResponse:
+    """
+    StreamingResponse con el resultado de build(db) (un select(Modelo) con sus
+    filtros) ordenado por 'keys'. 'keys' puede ser una función de la sesión
+    (p.ej. relevance_keys, que depende del motor).
+    """
+    filas = _filas(session_factory, build, keys)
+
+    def cuerpo() -> Iterator[bytes]:
+        # Si el cliente corta, se cierra el cursor y se devuelve la conexión
+        try:
+            yield from (_csv(filas) if formato == "csv" else _ndjson(filas))
+        finally:
+            filas.close()
+
+    sello = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return StreamingResponse(
+        cuerpo(),
+        media_type=MEDIA_TYPES[formato],
+        headers={
+            "Content-Disposition": f'attachment; filename="{nombre}-{sello}.{formato}"',
+            "Cache-Control": "no-store",
+        },
+    )
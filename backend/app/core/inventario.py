@@ -0,0 +1,76 @@
+# app/core/inventario.py
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import case, exists, or_, true
+from sqlmodel import select
+
+from app.models.equipo import Equipo
+from app.models.movimiento import Movimiento
+
+# ---------------------------
+# Inventario a fecha T (¿dónde estaba cada equipo?)
+# ---------------------------
+# La ubicación de un equipo en T es:
+#   1) hacia_ubicacion_id de su último movimiento con fecha <= T;
+#   2) si no tiene ninguno, desde_ubicacion_id del primero posterior a T
+#      (de ahí salió, luego ahí estaba);
+#   3) si nunca se ha movido, su ubicacion_id actual.
+# En vez de un DISTINCT ON (equipo_id) sobre todos los movimientos <= T (que
+# lee el historial completo), cada equipo hace un LATERAL ... ORDER BY fecha
+# DESC LIMIT 1: un descenso por el índice (equipo_id, fecha) de las
+# particiones <= T. El coste crece con el nº de equipos, no de movimientos.
+# Los casos 2) y 3) van en ramas del CASE: sólo se evalúan si no hay 1).
+
+
+def inventario_stmt(
+    fecha: datetime,
+    seccion_id: Optional[int] = None,
+    ubicacion_id: Optional[int] = None,
+) -> Any:
+    """
+    Una fila por equipo existente en 'fecha': id, identidad, numero_serie,
+    tipo, ubicacion_id (en esa fecha), movimiento_id y desde (el movimiento
+    que lo dejó allí, si lo hay).
+    """
+    ultimo = (
+        select(Movimiento.id, Movimiento.fecha, Movimiento.hacia_ubicacion_id)
+        .where(Movimiento.equipo_id == Equipo.id, Movimiento.fecha <= fecha)
+        .order_by(Movimiento.fecha.desc(), Movimiento.id.desc())
+        .limit(1)
+        .lateral("ultimo_mov")
+    )
+    posteriores = Movimiento.equipo_id == Equipo.id, Movimiento.fecha > fecha
+    salida = (
+        select(Movimiento.desde_ubicacion_id)
+        .where(*posteriores)
+        .order_by(Movimiento.fecha.asc(), Movimiento.id.asc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    ubicacion = case(
+        (ultimo.c.id.is_not(None), ultimo.c.hacia_ubicacion_id),
+        (exists().where(*posteriores), salida),
+        else_=Equipo.ubicacion_id,
+    )
+
+    stmt = (
+        select(
+            Equipo.id,
+            Equipo.identidad,
+            Equipo.numero_serie,
+            Equipo.tipo,
+            ubicacion.label("ubicacion_id"),
+            ultimo.c.id.label("movimiento_id"),
+            ultimo.c.fecha.label("desde"),
+        )
+        .select_from(Equipo)
+        .outerjoin(ultimo, true())
+        # Equipos dados de alta después de T (salvo que ya se movieran antes)
+        .where(or_(Equipo.creado_en <= fecha, ultimo.c.id.is_not(None)))
+    )
+    if seccion_id is not None:
+        stmt = stmt.where(Equipo.seccion_id == seccion_id)
+    if ubicacion_id is not None:
+        stmt = stmt.where(ubicacion == ubicacion_id)
+    return stmt
@@ -0,0 +1,319 @@
+# app/core/pagination.py
+import base64
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+
+import redis
+from fastapi import HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Table, and_, or_, text, tuple_
+from sqlalchemy.orm import QueryableAttribute
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.redis_client import get_redis
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+# ---------------------------
+# Claves de ordenación
+# ---------------------------
+# Cada clave es (columna, "asc"|"desc", nulls_last). La última clave debe ser
+# siempre el id para que el orden sea total y el cursor no pierda filas.
+SortKey = Tuple[Any, str, bool]
+
+
+def asc(col: Any, nulls_last: bool = False) -> SortKey:
+    return (col, "asc", nulls_last)
+
+
+def desc(col: Any, nulls_last: bool = False) -> SortKey:
+    return (col, "desc", nulls_last)
+
+
+def order_by_clauses(keys: Sequence[SortKey]) -> List[Any]:
+    """Traduce las claves de ordenación a cláusulas ORDER BY."""
+    clauses = []
+    for col, direction, nulls_last in keys:
+        c = col.asc() if direction == "asc" else col.desc()
+        clauses.append(c.nulls_last() if nulls_last else c)
+    return clauses
+
+
+# ---------------------------
+# Cursor opaco (base64url de JSON)
+# ---------------------------
+def _dump_value(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    return v
+
+
+def _load_value(v: Any) -> Any:
+    if isinstance(v, dict) and "dt" in v:
+        return datetime.fromisoformat(v["dt"])
+    return v
+
+
+def encode_cursor(ordenar: str, row: Any, keys: Sequence[SortKey]) -> str:
+    """
+    Codifica el orden activo y los valores de la última fila de la página.
+    El cliente lo trata como opaco y lo devuelve en ?cursor=.
+    """
+    payload = {"o": ordenar, "k": [_dump_value(getattr(row, col.key)) for col, _, _ in keys]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, ordenar: str, keys: Sequence[SortKey]) -> List[Any]:
+    """
+    Decodifica un cursor y valida que corresponde al mismo 'ordenar'.
+    Lanza 422 si el cursor es inválido o de otro orden.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_load_value(v) for v in payload["k"]]
+        orden_cursor = payload["o"]
+    except (ValueError, KeyError, TypeError):
+        _raise_cursor_422("Cursor inválido")
+
+    if orden_cursor != ordenar:
+        _raise_cursor_422("El cursor no corresponde al orden solicitado")
+    if len(values) != len(keys):
+        _raise_cursor_422("Cursor inválido")
+    return values
+
+
+def _raise_cursor_422(msg: str) -> None:
+    raise HTTPException(
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=[{"loc": ["query", "cursor"], "msg": msg, "type": "value_error"}],
+    )
+
+
+# ---------------------------
+# Condición keyset
+# ---------------------------
+def _after(col: Any, direction: str, nulls_last: bool, value: Any) -> Any:
+    """Condición 'col va estrictamente después de value' según el orden."""
+    if value is None:
+        # Con NULLS LAST no hay nada después de un NULL en esta columna
+        return None
+    cond = col > value if direction == "asc" else col < value
+    if nulls_last:
+        cond = or_(cond, col.is_(None))
+    return cond
+
+
+def _equal(col: Any, value: Any) -> Any:
+    return col.is_(None) if value is None else col == value
+
+
+def keyset_condition(keys: Sequence[SortKey], values: Sequence[Any]) -> Any:
+    """
+    Condición WHERE que devuelve las filas posteriores a 'values'.
+    - Si todas las claves van en la misma dirección y no admiten NULL, usa
+      comparación de tuplas (row value), que Postgres resuelve con el índice
+      compuesto correspondiente (p.ej. ix_movimiento_equipo_fecha).
+    - Si no, expande a (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+    """
+    directions = {d for _, d, _ in keys}
+    simple = len(directions) == 1 and not any(nl for _, _, nl in keys) and None not in values
+    if simple:
+        cols = tuple_(*[c for c, _, _ in keys])
+        vals = tuple_(*values)
+        return cols > vals if directions == {"asc"} else cols < vals
+
+    ors = []
+    for i, (col, direction, nulls_last) in enumerate(keys):
+        after = _after(col, direction, nulls_last, values[i])
+        if after is None:
+            continue
+        prefix = [_equal(c, values[j]) for j, (c, _, _) in enumerate(keys[:i])]
+        ors.append(and_(*prefix, after) if prefix else after)
+    return or_(*ors)
+
+
+# ---------------------------
+# Paginación (offset o cursor)
+# ---------------------------
+def _supports_cursor(keys: Sequence[SortKey]) -> bool:
+    """El cursor sólo es posible si todas las claves son columnas del modelo."""
+    return all(isinstance(col, QueryableAttribute) for col, _, _ in keys)
+
+
+def paginate(
+    db: Session,
+    stmt: Any,
+    response: Response,
+    keys: Sequence[SortKey],
+    ordenar: str,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> List[Any]:
+    """
+    Aplica orden + paginación y ejecuta la consulta.
+    - Con 'cursor' se ignora 'offset' y se usa paginación keyset.
+    - Órdenes por expresiones calculadas (p.ej. relevancia) sólo admiten offset.
+    - Si la página está llena, devuelve cabecera X-Next-Cursor para la siguiente.
+    """
+    stmt = stmt.order_by(*order_by_clauses(keys))
+    keyset = _supports_cursor(keys)
+    if cursor:
+        if not keyset:
+            _raise_cursor_422("El orden solicitado no admite cursor; usa offset")
+        values = decode_cursor(cursor, ordenar, keys)
+        stmt = stmt.where(keyset_condition(keys, values))
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    rows = db.exec(stmt.limit(limit)).all()
+
+    if keyset and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(ordenar, rows[-1], keys)
+    return rows
+
+
+# ---------------------------
+# Total (X-Total-Count)
+# ---------------------------
+# - "exact":    COUNT(*) con los mismos filtros (cacheado en Redis unos segundos)
+# - "estimate": estadísticas del planner (pg_class.reltuples / EXPLAIN)
+# - "false":    no se calcula; no se envía X-Total-Count
+IncludeTotal = Literal["false", "exact", "estimate"]
+
+
+def _count_cache_key(db: Session, count_stmt: Any) -> str:
+    """Firma del COUNT: SQL compilado + parámetros."""
+    compiled = count_stmt.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True}
+    )
+    raw = str(compiled) + json.dumps(compiled.params, sort_keys=True, default=str)
+    return "count:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _read_count(key: str) -> Optional[int]:
+    """Total cacheado o None (también si Redis no está disponible)."""
+    try:
+        cached = get_redis().get(key)
+        return int(cached) if cached is not None else None
+    except redis.RedisError as e:
+        log.warning("Caché de conteo no disponible: %s", e)
+        return None
+
+
+def _store_count(key: str, ttl: int, total: int) -> None:
+    try:
+        get_redis().setex(key, ttl, total)
+    except redis.RedisError:
+        pass
+
+
+def _run_count(db: Session, count_stmt: Any) -> int:
+    return db.exec(count_stmt).one()
+
+
+def _exact_count(db: Session, count_stmt: Any) -> int:
+    """COUNT(*) exacto, con caché Redis por firma de filtros (fail-open)."""
+    ttl = settings.COUNT_CACHE_TTL_SECONDS
+    if ttl <= 0:
+        return _run_count(db, count_stmt)
+
+    key = _count_cache_key(db, count_stmt)
+    cached = _read_count(key)
+    if cached is not None:
+        return cached
+    total = _run_count(db, count_stmt)
+    _store_count(key, ttl, total)
+    return total
+
+
+def _estimate_count(db: Session, data_stmt: Any) -> Optional[int]:
+    """
+    Estimación del planner (sólo Postgres). None si no hay estadísticas.
+    - Sin filtros: reltuples de la tabla (tabla sin ANALYZE => -1).
+    - Con filtros: filas estimadas por EXPLAIN de la consulta sin paginar.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    conn = db.connection()
+
+    froms = data_stmt.get_final_froms()
+    if data_stmt.whereclause is None and len(froms) == 1 and isinstance(froms[0], Table):
+        n = conn.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+            {"t": froms[0].name},
+        ).scalar()
+        return int(n) if n is not None and n >= 0 else None
+
+    compiled = data_stmt.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _set_estimate(db: Session, response: Response, data_stmt: Any) -> bool:
+    """Pone la estimación en las cabeceras si es utilizable; si no, False."""
+    estimated = _estimate_count(db, data_stmt)
+    if estimated is None or estimated < settings.COUNT_ESTIMATE_MIN_ROWS:
+        return False
+    response.headers["X-Total-Count"] = str(estimated)
+    response.headers["X-Total-Count-Estimated"] = "true"
+    return True
+
+
+def set_total_count(
+    db: Session,
+    response: Response,
+    count_stmt: Any,
+    data_stmt: Any,
+    include_total: IncludeTotal = "exact",
+) -> None:
+    """
+    Rellena X-Total-Count según 'include_total'.
+    Con "estimate" añade X-Total-Count-Estimated: true. Si la estimación no está
+    disponible o es pequeña (< COUNT_ESTIMATE_MIN_ROWS) se cuenta de forma exacta.
+    """
+    if include_total == "false":
+        return
+
+    if include_total == "estimate" and _set_estimate(db, response, data_stmt):
+        return
+
+    response.headers["X-Total-Count"] = str(_exact_count(db, count_stmt))
+
+
+async def set_total_count_async(
+    db: AsyncSession,
+    response: Response,
+    count_stmt: Any,
+    data_stmt: Any,
+    include_total: IncludeTotal = "exact",
+) -> None:
+    """
+    set_total_count para rutas async: la BD con db.run_sync() y la caché de
+    conteo (Redis síncrono) en el threadpool, nunca en el event loop.
+    """
+    if include_total == "false":
+        return
+    if include_total == "estimate" and await db.run_sync(_set_estimate, response, data_stmt):
+        return
+
+    ttl = settings.COUNT_CACHE_TTL_SECONDS
+    if ttl <= 0:
+        total = await db.run_sync(_run_count, count_stmt)
+    else:
+        key = await db.run_sync(_count_cache_key, count_stmt)
+        total = await run_in_threadpool(_read_count, key)
+        if total is None:
+            total = await db.run_sync(_run_count, count_stmt)
+            await run_in_threadpool(_store_count, key, ttl, total)
+    response.headers["X-Total-Count"] = str(total)
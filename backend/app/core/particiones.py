@@ -0,0 +1,246 @@
+# app/core/particiones.py
+import argparse
+import gzip
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Particiones mensuales de 'movimiento'
+# ---------------------------
+# La tabla y la función movimiento_asegurar_particiones() se definen en
+# app/models/movimiento.py (y en la migración 'partition_movimiento').
+# Aquí: crear las de los próximos meses y archivar las antiguas
+# (DETACH -> COPY a CSV gzip -> DROP).
+_NOMBRE_RE = re.compile(r"^movimiento_p(\d{4})(\d{2})$")
+
+
+@dataclass
+class Particion:
+    nombre: str
+    mes: date
+    adjunta: bool
+
+
+def _primer_dia_mes(d: date, meses_atras: int = 0) -> date:
+    total = d.year * 12 + (d.month - 1) - meses_atras
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def asegurar_particiones(db: Session, meses: Optional[int] = None) -> int:
+    """Crea las particiones del mes actual y los 'meses' siguientes. No hace commit."""
+    if db.get_bind().dialect.name != "postgresql":
+        return 0
+    meses = settings.MOVIMIENTO_PARTITION_MONTHS_AHEAD if meses is None else meses
+    hoy = datetime.now(timezone.utc).date()
+    return db.exec(
+        text("SELECT movimiento_asegurar_particiones(:desde, :meses)"),
+        params={"desde": hoy, "meses": meses + 1},
+    ).scalar_one()
+
+
+def listar_particiones(db: Session) -> List[Particion]:
+    """Particiones mensuales (adjuntas o ya separadas pendientes de archivar), por mes."""
+    rows = db.exec(
+        text(
+            "SELECT c.relname, i.inhrelid IS NOT NULL FROM pg_class c "
+            "LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = 'movimiento'::regclass "
+            "WHERE c.relkind = 'r' AND c.relnamespace = current_schema()::regnamespace "
+            "AND c.relname ~ '^movimiento_p[0-9]{6}$'"
+        )
+    ).all()
+    out = []
+    for nombre, adjunta in rows:
+        m = _NOMBRE_RE.match(nombre)
+        out.append(Particion(nombre, date(int(m.group(1)), int(m.group(2)), 1), adjunta))
+    return sorted(out, key=lambda p: p.mes)
+
+
+def _exportar(nombre: str, destino: Path) -> int:
+    """COPY de la partición a destino (CSV con cabecera, gzip). Devuelve filas."""
+    tmp = destino.with_name(destino.name + ".tmp")
+    with engine.connect() as conn, open(tmp, "wb") as raw:
+        with conn.connection.driver_connection.cursor() as cur:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as fh:
+                with cur.copy(f'COPY "{nombre}" TO STDOUT (FORMAT csv, HEADER)') as copy:
+                    for chunk in copy:
+                        fh.write(chunk)
+            filas = cur.rowcount
+        raw.flush()
+        os.fsync(raw.fileno())
+    # Sólo con el fichero completo en disco se da por exportada (y se puede borrar)
+    os.replace(tmp, destino)
+    return filas
+
+
+def _rescatar_default(db: Session, limite: date) -> int:
+    """
+    Crea la partición mensual de las filas anteriores a 'limite' que siguen en
+    movimiento_default (insertadas cuando su mes no tenía partición, p. ej.
+    importaciones con fechas antiguas): movimiento_asegurar_particiones() las
+    mueve a ella y así se archivan con el resto. No hace commit.
+    """
+    meses = db.exec(
+        text(
+            "SELECT DISTINCT date_trunc('month', fecha AT TIME ZONE 'UTC')::date "
+            "FROM movimiento_default WHERE fecha < :limite"
+        ),
+        params={"limite": datetime(limite.year, limite.month, 1, tzinfo=timezone.utc)},
+    ).scalars().all()
+    for mes in meses:
+        db.exec(text("SELECT movimiento_asegurar_particiones(:mes, 1)"), params={"mes": mes})
+    return len(meses)
+
+
+def _destino_libre(directorio: Path, nombre: str) -> Path:
+    # Un mes ya archivado puede volver (filas rescatadas de movimiento_default):
+    # nunca se sobrescribe un archivo anterior
+    destino = directorio / f"{nombre}.csv.gz"
+    n = 1
+    while destino.exists():
+        destino = directorio / f"{nombre}-{n}.csv.gz"
+        n += 1
+    return destino
+
+
+def archivar_particiones(meses: int, directorio: Path, borrar: bool = True) -> List[Path]:
+    """
+    Archiva las particiones cuyo mes termina antes de hace 'meses' meses:
+    0) las filas de esos meses que estén en movimiento_default pasan antes a
+       su partición mensual (_rescatar_default);
+    1) DETACH (desde ese momento ya no se ven ni se escriben desde la app);
+    2) COPY a '<directorio>/<particion>.csv.gz';
+    3) DROP de la tabla separada (salvo borrar=False).
+    Si el proceso se corta tras el DETACH, la siguiente ejecución retoma la
+    tabla separada. Una tabla separada cuyo .csv.gz ya existe no se vuelve a
+    exportar: con borrar=False (--conservar) se queda como está y no se
+    devuelve; con borrar=True sólo falta el DROP. Los ficheros se cargan de
+    vuelta con COPY ... FROM.
+    """
+    if meses < 1:
+        raise ValueError("meses debe ser >= 1")
+    directorio.mkdir(parents=True, exist_ok=True)
+    limite = _primer_dia_mes(datetime.now(timezone.utc).date(), meses)
+
+    with Session(engine) as db:
+        if _rescatar_default(db, limite):
+            db.commit()
+        candidatas = [p for p in listar_particiones(db) if p.mes < limite]
+
+    archivos: List[Path] = []
+    for p in candidatas:
+        destino = directorio / f"{p.nombre}.csv.gz"
+        if p.adjunta:
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE movimiento DETACH PARTITION "{p.nombre}"'))
+            destino = _destino_libre(directorio, p.nombre)
+            filas = _exportar(p.nombre, destino)
+        elif destino.exists():
+            if not borrar:
+                continue  # ya archivada en una ejecución anterior
+            filas = None
+        else:
+            filas = _exportar(p.nombre, destino)
+        if borrar:
+            with engine.begin() as conn:
+                conn.execute(text(f'DROP TABLE "{p.nombre}"'))
+        if filas is None:
+            logger.info("Partición %s ya exportada en %s, sólo se borra", p.nombre, destino)
+        else:
+            logger.info("Partición %s archivada en %s (%s filas)", p.nombre, destino, filas)
+        archivos.append(destino)
+    return archivos
+
+
+class PartitionMaintainer:
+    """
+    Hilo que cada MOVIMIENTO_PARTITION_CHECK_SECONDS asegura las particiones
+    futuras (la primera vez, al arrancar). Idempotente y serializado en la BD
+    (advisory lock), así que puede correr en todos los workers.
+    """
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="movimiento-particiones", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> int:
+        with Session(engine) as db:
+            n = asegurar_particiones(db)
+            db.commit()
+        if n:
+            logger.info("Particiones de movimiento creadas: %s", n)
+        return n
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("No se pudieron crear particiones de movimiento: %s", e)
+            if self._stop.wait(self.interval):
+                return
+
+
+_maintainer: Optional[PartitionMaintainer] = None
+
+
+def start_partition_maintainer() -> Optional[PartitionMaintainer]:
+    """Se llama desde el lifespan; MOVIMIENTO_PARTITION_CHECK_SECONDS=0 lo desactiva."""
+    global _maintainer
+    if settings.MOVIMIENTO_PARTITION_CHECK_SECONDS > 0 and _maintainer is None:
+        _maintainer = PartitionMaintainer(settings.MOVIMIENTO_PARTITION_CHECK_SECONDS)
+        _maintainer.start()
+    return _maintainer
+
+
+def stop_partition_maintainer() -> None:
+    global _maintainer
+    if _maintainer is not None:
+        _maintainer.stop()
+        _maintainer = None
+
+
+if __name__ == "__main__":
+    # Ejecución manual / cron:
+    #   python -m app.core.particiones crear [--meses 3]
+    #   python -m app.core.particiones archivar --meses 24 --dir /var/backups/movimientos [--conservar]
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m app.core.particiones")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_crear = sub.add_parser("crear", help="Crear las particiones de los próximos meses")
+    p_crear.add_argument("--meses", type=int, default=None)
+    p_arch = sub.add_parser("archivar", help="Separar y exportar particiones antiguas")
+    p_arch.add_argument("--meses", type=int, required=True, help="Antigüedad mínima en meses")
+    p_arch.add_argument("--dir", type=Path, required=True, help="Directorio de destino")
+    p_arch.add_argument("--conservar", action="store_true", help="No borrar la tabla tras exportarla")
+    args = parser.parse_args()
+
+    if args.cmd == "crear":
+        with Session(engine) as s:
+            creadas = asegurar_particiones(s, args.meses)
+            s.commit()
+        print(f"Particiones creadas: {creadas}")
+    else:
+        for f in archivar_particiones(args.meses, args.dir, borrar=not args.conservar):
+            print(f)
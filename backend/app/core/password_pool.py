@@ -0,0 +1,168 @@
+# app/core/password_pool.py
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# ---------------------------
+# Pool acotado para Argon2 (hash / verificación de contraseñas)
+# ---------------------------
+# Cada operación Argon2id ocupa ~64 MiB y un tiempo apreciable de CPU. Si se
+# ejecutara en el threadpool de Starlette, una ráfaga de logins (cambio de turno)
+# lo acapararía y dejaría sin hilos al resto de endpoints.
+# - Como mucho PASSWORD_HASH_WORKERS operaciones a la vez (acota CPU y memoria).
+# - Como mucho PASSWORD_HASH_MAX_QUEUE esperando; si no cabe, 503 inmediato
+#   con Retry-After en vez de encolar indefinidamente.
+# Hilos y no procesos: argon2-cffi libera el GIL durante el hash.
+# Los endpoints usan run_async: esperan el resultado en el event loop, sin
+# ocupar un hilo del threadpool de AnyIO mientras la tarea está en cola.
+
+
+class PasswordPoolBusy(Exception):
+    """No hay hueco en el pool (cola llena o tiempo de espera agotado)."""
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_queue: int, timeout_seconds: float) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0       # aceptadas y sin terminar (ejecutando + en cola)
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """Reserva hueco y encola fn(*args). Lanza PasswordPoolBusy si no cabe."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordPoolBusy("Cola de hashing llena")
+
+        submitted = time.monotonic()
+
+        def task() -> T:
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        def done(fut: Future) -> None:
+            # El hueco se libera al terminar la tarea, aunque el llamador ya no espere
+            # (o al cancelarla si aún estaba en cola)
+            with self._lock:
+                self._pending -= 1
+                if not fut.cancelled():
+                    self._completed += 1
+            self._slots.release()
+
+        with self._lock:
+            self._pending += 1
+        try:
+            fut = self._executor.submit(task)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        fut.add_done_callback(done)
+        return fut
+
+    def _timeout(self) -> PasswordPoolBusy:
+        with self._lock:
+            self._timeouts += 1
+        return PasswordPoolBusy("Tiempo de espera de hashing agotado")
+
+    def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Ejecuta fn(*args) en el pool y espera el resultado. Lanza PasswordPoolBusy."""
+        fut = self._submit(fn, *args)
+        try:
+            return fut.result(timeout=self.timeout_seconds)
+        except FutureTimeout:
+            raise self._timeout()
+
+    async def run_async(self, fn: Callable[..., T], *args: Any) -> T:
+        """Como run, pero espera en el event loop. Al agotar el tiempo se cancela
+        la tarea si aún no ha empezado."""
+        fut = self._submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(fut), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise self._timeout()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self._completed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed_total": done,
+                "rejected_total": self._rejected,
+                "timeouts_total": self._timeouts,
+                "wait_avg_ms": round(self._wait_total / done * 1000, 2) if done else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 2),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ---------------------------
+# Instancia del proceso
+# ---------------------------
+_pool: Optional[PasswordPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_password_pool() -> PasswordPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordPool(
+                    settings.PASSWORD_HASH_WORKERS,
+                    settings.PASSWORD_HASH_MAX_QUEUE,
+                    settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+                )
+    return _pool
+
+
+def close_password_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+
+
+async def run_in_password_pool(fn: Callable[..., T], *args: Any) -> T:
+    """Como PasswordPool.run_async, pero traduce la saturación a 503 para los endpoints."""
+    try:
+        return await get_password_pool().run_async(fn, *args)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio saturado, reintente en unos segundos",
+            headers={"Retry-After": "1"},
+        )
@@ -1,20 +1,16 @@
 # app/core/rate_limit.py
+import math
+import re
+import threading
 import time
-import redis
+import uuid
+from collections import OrderedDict
 from typing import Tuple, Optional
-from app.core.config import settings
 
-# ---------------------------
-# Cliente Redis (lazy singleton)
-# ---------------------------
-_redis_client: Optional[redis.Redis] = None
+from app.core.config import settings
 
-def get_redis() -> redis.Redis:
-    global _redis_client
-    if _redis_client is None:
-        # decode_responses=True -> strings en vez de bytes
-        _redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-    return _redis_client
+# Cliente Redis compartido (pool único, ver app/core/redis_client.py)
+from app.core.redis_client import eval_script, get_redis
 
 
 # ===========================
@@ -35,82 +31,94 @@ def _key_ip_lock(ip: str) -> str:
     return f"rl:login:ip:{ip}:lock"
 
 
-# --- Utilidades TTL ---
-def _ttl_seconds(r: redis.Redis, key: str) -> int:
-    """
-    Devuelve segundos restantes de expiración para 'key'.
-    Si no existe o no tiene expiración, devuelve 0.
-    """
-    ttl = r.ttl(key)
-    if ttl is None or ttl < 0:
-        return 0
-    return int(ttl)
+# --- Scripts Lua (1 round trip y atómicos) ---
+# Cada intento de login se cuenta como fallo ANTES de verificar la contraseña
+# (reserva), y el login correcto lo borra todo (reset_login_counters_and_unlock).
+# Así, con N intentos en paralelo, como mucho LOGIN_MAX_FAILS_PER_USER llegan
+# a verificar la contraseña: el resto ve el contador lleno y recibe 429, sin
+# esperar a que los primeros terminen.
+# KEYS: user_fails, ip_fails, user_lock, ip_lock
+# ARGV: max_user, ttl_user, max_ip, ttl_ip
+# Devuelven {locked (0/1), ttl, motivo ('user'|'ip'|'')}.
+_CHECK_LOGIN_LUA = """
+for i, motivo in ipairs({'user', 'ip'}) do
+  local ttl = redis.call('TTL', KEYS[i + 2])
+  if ttl > 0 then return {1, ttl, motivo} end
+end
+for i, motivo in ipairs({'user', 'ip'}) do
+  if tonumber(redis.call('GET', KEYS[i]) or '0') >= tonumber(ARGV[2 * i - 1]) then
+    return {1, math.max(redis.call('TTL', KEYS[i]), 1), motivo}
+  end
+end
+for i = 1, 2 do
+  redis.call('INCR', KEYS[i])
+  redis.call('EXPIRE', KEYS[i], ARGV[2 * i])
+end
+return {0, 0, ''}
+"""
+
+# El fallo ya está contado por _CHECK_LOGIN_LUA: aquí sólo se aplica el lock
+# si el contador ha llegado al umbral (mismas KEYS/ARGV).
+_LOGIN_FAIL_LUA = """
+for i, motivo in ipairs({'user', 'ip'}) do
+  if tonumber(redis.call('GET', KEYS[i]) or '0') >= tonumber(ARGV[2 * i - 1]) then
+    redis.call('SET', KEYS[i + 2], '1', 'EX', ARGV[2 * i], 'NX')
+    return {1, redis.call('TTL', KEYS[i + 2]), motivo}
+  end
+end
+return {0, 0, ''}
+"""
+
+# Devuelve el intento contado por _CHECK_LOGIN_LUA cuando el login falla por
+# algo que no son las credenciales (pool de Argon2 saturado, error de BD...).
+_LOGIN_GIVE_BACK_LUA = """
+for i = 1, 2 do
+  local n = tonumber(redis.call('GET', KEYS[i]) or '0')
+  if n > 1 then
+    redis.call('DECR', KEYS[i])
+  elseif n == 1 then
+    redis.call('DEL', KEYS[i])
+  end
+end
+return {0, 0, ''}
+"""
+
+
+def _run_login_script(script: str, username: str, ip: str) -> Tuple[bool, int, str]:
+    keys = [_key_user_fails(username), _key_ip_fails(ip), _key_user_lock(username), _key_ip_lock(ip)]
+    args = [
+        settings.LOGIN_MAX_FAILS_PER_USER, settings.LOGIN_BLOCK_TTL_PER_USER_SECONDS,
+        settings.LOGIN_MAX_FAILS_PER_IP, settings.LOGIN_BLOCK_TTL_PER_IP_SECONDS,
+    ]
+    locked, ttl, motivo = eval_script(script, keys, args)
+    return bool(locked), int(ttl), str(motivo or "")
 
 
 # --- API login ---
-def is_locked(username: str, ip: str) -> Tuple[bool, int, str]:
+def check_login_attempt(username: str, ip: str) -> Tuple[bool, int, str]:
     """
-    True si hay lock activo por usuario o por IP.
+    Antes de verificar la contraseña: True si hay lock activo por usuario o
+    por IP, o si sus contadores ya están en el umbral. Si no, cuenta este
+    intento (como fallo hasta que un login correcto lo resetee).
     Devuelve (locked, ttl_restante, motivo: 'user'|'ip'|'').
     """
-    r = get_redis()
-    u_key = _key_user_lock(username)
-    i_key = _key_ip_lock(ip)
+    return _run_login_script(_CHECK_LOGIN_LUA, username, ip)
 
-    u_ttl = _ttl_seconds(r, u_key)
-    if u_ttl > 0:
-        return True, u_ttl, "user"
 
-    i_ttl = _ttl_seconds(r, i_key)
-    if i_ttl > 0:
-        return True, i_ttl, "ip"
-
-    return False, 0, ""
-
-
-def incr_login_fail(username: str, ip: str) -> Tuple[int, int]:
+def register_login_fail(username: str, ip: str) -> Tuple[bool, int, str]:
     """
-    Incrementa contadores de fallo y aplica TTL deslizante.
-    NO pone el lock (eso lo hace lock_if_needed()).
-    Devuelve (u_count, i_count).
+    Tras una contraseña incorrecta: crea el lock si el contador llegó al umbral.
+    Devuelve (locked, ttl, motivo).
     """
-    r = get_redis()
+    return _run_login_script(_LOGIN_FAIL_LUA, username, ip)
 
-    u_key = _key_user_fails(username)
-    i_key = _key_ip_fails(ip)
 
-    u_count = r.incr(u_key)
-    r.expire(u_key, settings.LOGIN_BLOCK_TTL_PER_USER_SECONDS)
-
-    i_count = r.incr(i_key)
-    r.expire(i_key, settings.LOGIN_BLOCK_TTL_PER_IP_SECONDS)
-
-    return int(u_count), int(i_count)
-
-
-def lock_if_needed(username: str, ip: str) -> Tuple[bool, int, str]:
+def give_back_login_attempt(username: str, ip: str) -> None:
     """
-    Si los contadores han alcanzado el umbral, crea el lock correspondiente.
-    Devuelve (locked, ttl, motivo).
+    El login no llegó a comprobar las credenciales (503, error de BD...):
+    descuenta el intento que sumó check_login_attempt, sin bajar de 0.
     """
-    r = get_redis()
-
-    u_count = int(r.get(_key_user_fails(username)) or 0)
-    i_count = int(r.get(_key_ip_fails(ip)) or 0)
-
-    if u_count >= settings.LOGIN_MAX_FAILS_PER_USER:
-        # Lock de usuario
-        r.set(_key_user_lock(username), "1", ex=settings.LOGIN_BLOCK_TTL_PER_USER_SECONDS, nx=True)
-        ttl = _ttl_seconds(r, _key_user_lock(username))
-        return True, ttl, "user"
-
-    if i_count >= settings.LOGIN_MAX_FAILS_PER_IP:
-        # Lock de IP
-        r.set(_key_ip_lock(ip), "1", ex=settings.LOGIN_BLOCK_TTL_PER_IP_SECONDS, nx=True)
-        ttl = _ttl_seconds(r, _key_ip_lock(ip))
-        return True, ttl, "ip"
-
-    return False, 0, ""
+    _run_login_script(_LOGIN_GIVE_BACK_LUA, username, ip)
 
 
 def reset_login_counters_and_unlock(username: str, ip: str) -> None:
@@ -136,10 +144,6 @@ class RateLimitExceeded(Exception):
         self.retry_after = max(1, int(retry_after))
 
 
-def _now() -> int:
-    return int(time.time())
-
-
 def allow_sliding_window(key: str, limit: int, window_sec: int) -> Tuple[bool, int]:
     """
     Rate limit con ventana deslizante usando Sorted Set en Redis.
@@ -150,14 +154,15 @@ def allow_sliding_window(key: str, limit: int, window_sec: int) -> Tuple[bool, i
     Devuelve (allowed, retry_after).
     """
     r = get_redis()
-    now = _now()
+    now = time.time()
     zkey = f"rl:sw:{key}"
 
     pipe = r.pipeline()
     # 1) Limpia eventos fuera de la ventana
     pipe.zremrangebyscore(zkey, 0, now - window_sec)
-    # 2) Añade evento actual (score=now)
-    pipe.zadd(zkey, {str(now): now})
+    # 2) Añade evento actual (score=now; miembro único: dos peticiones en el
+    #    mismo segundo son dos eventos)
+    pipe.zadd(zkey, {f"{now}:{uuid.uuid4().hex}": now})
     # 3) Cuenta
     pipe.zcard(zkey)
     # 4) TTL higiene
@@ -192,3 +197,84 @@ def register_idempotency(idem_key: str, ttl_sec: int) -> bool:
     key = f"idm:{idem_key}"
     ok = r.set(key, "1", ex=ttl_sec, nx=True)
     return bool(ok)
+
+
+# ===========================
+#   RATE LIMIT GLOBAL (GCRA)
+# ===========================
+# Generic Cell Rate Algorithm: por cliente se guarda una sola clave con el
+# "theoretical arrival time" (TAT, ms). Con L peticiones por periodo P, cada
+# petición adelanta el TAT en T = P/L y se admite si TAT - P <= ahora: ráfagas
+# de hasta L y luego una cada T. Memoria constante por cliente (frente a un
+# miembro por petición del sorted set de allow_sliding_window).
+# El reloj es el de Redis (TIME), común a todos los workers.
+# KEYS: clave; ARGV: T (ms), P (ms)
+# Devuelve {admitida (0/1), restantes, retry_after (ms), reset (ms)}.
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local T, P = tonumber(ARGV[1]), tonumber(ARGV[2])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or '0'), now)
+local nuevo = tat + T
+if nuevo - P > now then
+  return {0, 0, nuevo - P - now, tat - now}
+end
+redis.call('SET', KEYS[1], nuevo, 'PX', nuevo - now)
+return {1, math.floor((P - (nuevo - now)) / T), 0, nuevo - now}
+"""
+
+_RATE_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$", re.IGNORECASE)
+
+GcraResult = Tuple[bool, int, float, float]  # (admitida, restantes, retry_after s, reset s)
+
+
+def parse_rate(rate: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    "200/minute", "10/second", "1000/hour", "50/5minutes" -> (límite, periodo_s).
+    None si está desactivado ("", "0", "off") o no se reconoce.
+    """
+    if not rate or rate.strip().lower() in ("0", "off", "none"):
+        return None
+    m = _RATE_RE.match(rate)
+    if not m or int(m.group(1)) <= 0:
+        return None
+    return int(m.group(1)), int(m.group(2) or 1) * _RATE_UNITS[m.group(3).lower()]
+
+
+def _gcra_result(admitida, restantes, retry_ms, reset_ms) -> GcraResult:
+    return bool(admitida), int(restantes), float(retry_ms) / 1000, float(reset_ms) / 1000
+
+
+def gcra(key: str, limit: int, period_sec: int) -> GcraResult:
+    """GCRA en Redis (1 EVALSHA). Lanza si Redis no está disponible."""
+    T = max(1, (period_sec * 1000) // limit)
+    return _gcra_result(*eval_script(_GCRA_LUA, [f"rl:gcra:{key}"], [T, period_sec * 1000]))
+
+
+class LocalGCRA:
+    """
+    Mismo algoritmo en memoria del proceso, para cuando Redis no responde.
+    Cada worker limita por su cuenta (con N workers, hasta N veces el límite).
+    LRU acotada a max_keys clientes.
+    """
+
+    def __init__(self, max_keys: int = 10000) -> None:
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def __call__(self, key: str, limit: int, period_sec: int) -> GcraResult:
+        T = max(1, (period_sec * 1000) // limit)
+        P = period_sec * 1000
+        now = time.monotonic() * 1000
+        with self._lock:
+            tat = max(self._tat.get(key, 0.0), now)
+            nuevo = tat + T
+            if nuevo - P > now:
+                return _gcra_result(0, 0, nuevo - P - now, tat - now)
+            self._tat[key] = nuevo
+            self._tat.move_to_end(key)
+            while len(self._tat) > self._max_keys:
+                self._tat.popitem(last=False)
+        return _gcra_result(1, math.floor((P - (nuevo - now)) / T), 0, nuevo - now)
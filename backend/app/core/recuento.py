@@ -0,0 +1,96 @@
+# app/core/recuento.py
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+# ---------------------------
+# Recuento (stocktake) de una ubicación a partir de los tags NFC escaneados
+# ---------------------------
+# Una sola consulta: los tags escaneados (unnest del array, en minúsculas)
+# se cruzan con equipo por lower(nfc_tag) (índice funcional único) y con los
+# equipos registrados en la ubicación. Categorías:
+#   presente        escaneado y registrado aquí
+#   otra_ubicacion  escaneado aquí pero registrado en otra (o en ninguna)
+#   desconocido     tag que no corresponde a ningún equipo
+#   faltante        registrado aquí y no escaneado (incluye los que no tienen tag)
+_CONCILIAR_SQL = text("""
+WITH esc AS (
+    SELECT DISTINCT lower(btrim(t)) AS tag
+    FROM unnest(CAST(:tags AS text[])) AS t
+    WHERE btrim(t) <> ''
+), enc AS (
+    SELECT esc.tag, e.id, e.identidad, e.ubicacion_id, e.estado
+    FROM esc LEFT JOIN equipo e ON lower(e.nfc_tag) = esc.tag
+)
+SELECT CASE
+           WHEN id IS NULL THEN 'desconocido'
+           WHEN ubicacion_id IS NOT DISTINCT FROM :u THEN 'presente'
+           ELSE 'otra_ubicacion'
+       END AS categoria,
+       id AS equipo_id, identidad, tag AS nfc_tag, ubicacion_id, estado
+FROM enc
+UNION ALL
+SELECT 'faltante', e.id, e.identidad, lower(e.nfc_tag), e.ubicacion_id, e.estado
+FROM equipo e
+WHERE e.ubicacion_id = :u
+  AND (e.nfc_tag IS NULL OR NOT EXISTS (SELECT 1 FROM esc WHERE esc.tag = lower(e.nfc_tag)))
+ORDER BY 1, 2, 4
+""")
+
+# Corrección en bloque: bloquea (en orden de id, como mover_lote), mueve los
+# equipos y crea sus Movimiento en una única sentencia. Sólo equipos que
+# pueden moverse (mismo criterio que Equipo.puede_moverse) y que siguen
+# fuera de la ubicación al bloquearlos.
+_CORREGIR_SQL = text("""
+WITH prev AS (
+    SELECT id, ubicacion_id FROM equipo
+    WHERE id = ANY(CAST(:ids AS integer[]))
+      AND ubicacion_id IS DISTINCT FROM :u
+      AND estado IN ('OPERATIVO', 'RESERVA')
+    ORDER BY id
+    FOR UPDATE
+), upd AS (
+    UPDATE equipo e SET ubicacion_id = :u, actualizado_en = now()
+    FROM prev WHERE e.id = prev.id
+    RETURNING e.id, prev.ubicacion_id AS desde
+)
+INSERT INTO movimiento (equipo_id, fecha, desde_ubicacion_id, hacia_ubicacion_id, comentario, usuario_id)
+SELECT id, now(), desde, :u, :comentario, :usuario_id FROM upd
+RETURNING equipo_id, id
+""")
+
+
+def conciliar(db: Session, ubicacion_id: int, tags: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Filas por categoría (ver arriba); 'presente' sólo se usa para contar."""
+    res: Dict[str, List[Dict[str, Any]]] = {
+        "presente": [], "otra_ubicacion": [], "desconocido": [], "faltante": [],
+    }
+    rows = db.exec(_CONCILIAR_SQL, params={"tags": list(tags), "u": ubicacion_id}).mappings()
+    for r in rows:
+        res[r["categoria"]].append({k: v for k, v in r.items() if k != "categoria"})
+    return res
+
+
+def corregir(
+    db: Session,
+    ubicacion_id: int,
+    equipo_ids: Sequence[int],
+    comentario: Optional[str] = None,
+    usuario_id: Optional[int] = None,
+) -> Dict[int, int]:
+    """Mueve los equipos a la ubicación; {equipo_id: movimiento_id} de los movidos. No confirma."""
+    if not equipo_ids:
+        return {}
+    rows = db.exec(
+        _CORREGIR_SQL,
+        params={
+            "ids": sorted(set(equipo_ids)),
+            "u": ubicacion_id,
+            "comentario": comentario,
+            "usuario_id": usuario_id,
+        },
+    ).all()
+    # UPDATE fuera del ORM: lo que hubiera cargado en la sesión está obsoleto
+    db.expire_all()
+    return {eq_id: mov_id for eq_id, mov_id in rows}
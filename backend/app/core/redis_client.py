@@ -1,9 +1,101 @@
+# app/core/redis_client.py
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
 import redis
-from functools import lru_cache
+from redis.exceptions import NoScriptError
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
 from app.core.config import settings
 
-@lru_cache(maxsize=1)
+# ---------------------------
+# Cliente Redis único (pool compartido por proceso)
+# ---------------------------
+# Todos los módulos (security, rate_limit, cache, /health...) usan este cliente.
+# - BlockingConnectionPool: como mucho REDIS_MAX_CONNECTIONS sockets por worker;
+#   si se agotan se espera REDIS_POOL_TIMEOUT_SECONDS y después error.
+# - Timeouts de conexión/lectura: un Redis colgado no bloquea los hilos.
+# - Reintentos con backoff exponencial ante timeouts/errores de conexión.
+_pool: Optional[redis.BlockingConnectionPool] = None
+_client: Optional[redis.Redis] = None
+_lock = threading.Lock()
+
+
+def _build_pool() -> redis.BlockingConnectionPool:
+    return redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+        retry_on_timeout=settings.REDIS_RETRY_ON_TIMEOUT,
+        retry=Retry(ExponentialBackoff(cap=0.5, base=0.05), settings.REDIS_RETRIES),
+    )
+
+
 def get_redis() -> redis.Redis:
-    # Conexión síncrona (encaja con tu código actual)
-    # Decodifica automáticamente a str
-    return redis.from_url(settings.REDIS_URL, decode_responses=True)
+    """Cliente compartido (lazy). Decodifica automáticamente a str."""
+    global _pool, _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _pool = _build_pool()
+                _client = redis.Redis(connection_pool=_pool)
+    return _client
+
+
+# ---------------------------
+# Scripts Lua
+# ---------------------------
+# Cada script se envía con EVAL la primera vez en el proceso (queda en la caché
+# de scripts de Redis) y después por EVALSHA; si Redis lo ha olvidado
+# (reinicio, SCRIPT FLUSH) se vuelve a EVAL. El texto del script es la clave.
+_scripts_cargados: Dict[str, str] = {}  # script -> sha
+
+
+def eval_script(
+    script: str,
+    keys: Sequence[str],
+    args: Sequence[Any],
+    client: Optional[redis.Redis] = None,
+) -> Any:
+    r = client or get_redis()
+    sha = _scripts_cargados.get(script)
+    if sha is not None:
+        try:
+            return r.evalsha(sha, len(keys), *keys, *args)
+        except NoScriptError:
+            pass
+    res = r.eval(script, len(keys), *keys, *args)
+    _scripts_cargados[script] = hashlib.sha1(script.encode("utf-8")).hexdigest()
+    return res
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Estado del pool del proceso actual (para /_meta/redis)."""
+    pool = _pool
+    if pool is None:
+        return {"initialized": False, "max_connections": settings.REDIS_MAX_CONNECTIONS}
+    # BlockingConnectionPool guarda las conexiones libres en una cola (None = hueco sin crear)
+    created = len(pool._connections)
+    available = sum(1 for c in list(pool.pool.queue) if c is not None)
+    return {
+        "initialized": True,
+        "max_connections": pool.max_connections,
+        "created": created,
+        "in_use": created - available,
+        "available": available,
+    }
+
+
+def close_redis() -> None:
+    """Cierra el pool (apagado de la app)."""
+    global _pool, _client
+    with _lock:
+        if _pool is not None:
+            _pool.disconnect()
+        _pool, _client = None, None
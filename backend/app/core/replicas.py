@@ -0,0 +1,193 @@
+# app/core/replicas.py
+import itertools
+import logging
+import threading
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional
+
+import redis
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import _build_async_engine, _build_engine, engine, get_async_engine
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Réplicas de lectura
+# ---------------------------
+# Con DATABASE_REPLICA_URLS las dependencias de sólo lectura (get_read_db /
+# get_async_read_db) van a una réplica por round-robin; el resto sigue en el
+# primario. Un hilo comprueba cada REPLICA_HEALTH_CHECK_SECONDS que cada réplica
+# responde y que su retraso de replicación no supera REPLICA_MAX_LAG_SECONDS;
+# las que fallan salen de la rotación hasta la siguiente comprobación buena.
+# Sin réplicas sanas se lee del primario.
+#
+# Read-your-writes: tras una escritura correcta de un usuario se marca
+# 'db:rw:{user_id}' en Redis durante REPLICA_STICKY_SECONDS; mientras exista,
+# sus lecturas van al primario (ver app/middleware/read_your_writes.py).
+
+# Retraso en segundos; 0 si la réplica ya aplicó todo lo recibido y NULL en un primario
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+STICKY_KEY_PREFIX = "db:rw:"
+
+
+class Replica:
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.engine: Engine = _build_engine(url)
+        self._async_engine: Optional[AsyncEngine] = None
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        if self._async_engine is None:
+            self._async_engine = _build_async_engine(self.url)
+        return self._async_engine
+
+    def check(self) -> None:
+        try:
+            with self.engine.connect() as conn:
+                lag = conn.execute(_LAG_SQL).scalar()
+            self.lag_seconds = float(lag) if lag is not None else None
+            self.healthy = lag is None or float(lag) <= settings.REPLICA_MAX_LAG_SECONDS
+            self.error = None if self.healthy else "retraso de replicación"
+        except Exception as e:
+            self.healthy = False
+            self.error = str(e).splitlines()[0] if str(e) else type(e).__name__
+        if not self.healthy:
+            logger.warning("Réplica fuera de rotación (%s): %s", self.engine.url.host, self.error)
+
+
+class ReplicaRouter:
+    def __init__(self, urls: List[str]) -> None:
+        self.replicas = [Replica(u) for u in urls]
+        self._rr = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def pick(self) -> Optional[Replica]:
+        """Siguiente réplica sana (round-robin) o None si no hay ninguna."""
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._rr) % len(healthy)]
+
+    def check_all(self) -> None:
+        for r in self.replicas:
+            r.check()
+
+    def start(self) -> None:
+        # Primera comprobación síncrona: sin ella ninguna réplica entra en rotación
+        self.check_all()
+        self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for r in self.replicas:
+            r.engine.dispose()
+
+    async def dispose_async(self) -> None:
+        for r in self.replicas:
+            if r._async_engine is not None:
+                await r._async_engine.dispose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "host": r.engine.url.host,
+                "port": r.engine.url.port,
+                "healthy": r.healthy,
+                "lag_seconds": r.lag_seconds,
+                "error": r.error,
+            }
+            for r in self.replicas
+        ]
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.REPLICA_HEALTH_CHECK_SECONDS):
+            self.check_all()
+
+
+# ---------------------------
+# Read-your-writes (Redis, fail-open hacia el primario)
+# ---------------------------
+def mark_recent_write(user_id: Any) -> None:
+    if settings.REPLICA_STICKY_SECONDS <= 0 or user_id is None:
+        return
+    try:
+        get_redis().setex(f"{STICKY_KEY_PREFIX}{user_id}", settings.REPLICA_STICKY_SECONDS, 1)
+    except redis.RedisError as e:
+        logger.warning("No se pudo marcar escritura reciente: %s", e)
+
+
+def has_recent_write(user_id: Any) -> bool:
+    """True si el usuario escribió hace poco (o si Redis no responde: mejor el primario)."""
+    if user_id is None:
+        return False
+    try:
+        return bool(get_redis().exists(f"{STICKY_KEY_PREFIX}{user_id}"))
+    except redis.RedisError:
+        return True
+
+
+# ---------------------------
+# Instancia del proceso y sesiones de lectura
+# ---------------------------
+_router: Optional[ReplicaRouter] = None
+
+
+def get_replica_router() -> Optional[ReplicaRouter]:
+    return _router
+
+
+def start_replicas() -> Optional[ReplicaRouter]:
+    """Arranca el enrutado si hay DATABASE_REPLICA_URLS. Se llama desde el lifespan."""
+    global _router
+    urls = settings.database_replica_urls_list
+    if urls and _router is None:
+        _router = ReplicaRouter(urls)
+        _router.start()
+    return _router
+
+
+async def close_replicas() -> None:
+    """Para la comprobación de salud y cierra los pools (apagado de la app)."""
+    global _router
+    if _router is not None:
+        _router.stop()
+        await _router.dispose_async()
+        _router = None
+
+
+def _pick_for(user_id: Any) -> Optional[Replica]:
+    router = _router
+    if router is None or has_recent_write(user_id):
+        return None
+    return router.pick()
+
+
+def get_read_session(user_id: Any = None) -> Generator[Session, None, None]:
+    replica = _pick_for(user_id)
+    with Session(replica.engine if replica else engine) as session:
+        yield session
+
+
+async def get_async_read_session(user_id: Any = None) -> AsyncGenerator[AsyncSession, None]:
+    # has_recent_write es una consulta Redis síncrona: fuera del event loop
+    replica = await run_in_threadpool(_pick_for, user_id) if _router is not None else None
+    bind = replica.async_engine if replica else get_async_engine()
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,191 @@
+# app/core/revocation_cache.py
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Caché local de revocaciones (primer nivel de is_revoked)
+# ---------------------------
+# Cada proceso mantiene en memoria el conjunto de JTIs revocados:
+#   1) Al arrancar se suscribe al canal REVOCATION_CHANNEL y, una vez confirmada
+#      la suscripción, carga las claves 'jwt:revoked:*' existentes (snapshot).
+#   2) revoke_token() publica cada revocación y la añade localmente al momento.
+# Mientras la suscripción está sana, un JTI ausente del conjunto no está
+# revocado y no hace falta ir a Redis. Si la suscripción cae (o aún no está
+# lista), lookup() devuelve None y se consulta Redis como antes.
+# Sólo se cachean JTIs de access: los refresh revocados se guardan en Redis
+# con valor REFRESH_REVOKED_VALUE, no se publican y el snapshot los salta
+# (/auth/refresh consulta siempre Redis). No es un bloom filter: cada JTI
+# caduca con su access (ACCESS_TOKEN_EXPIRE_MINUTES), así que el conjunto
+# exacto es pequeño y no da falsos positivos.
+# Por el mismo canal viajan las épocas de token por usuario ('jwt:epoch:<id>',
+# mensajes "epoch:<id>:<n>"): sólo existen para usuarios con algún logout
+# global, así que también caben en memoria; un usuario ausente tiene época 0.
+REVOCATION_CHANNEL = "jwt:revocations"
+REVOKED_KEY_PREFIX = "jwt:revoked:"
+REFRESH_REVOKED_VALUE = "refresh"
+EPOCH_KEY_PREFIX = "jwt:epoch:"
+EPOCH_MESSAGE_PREFIX = "epoch:"
+
+_POLL_SECONDS = 0.25        # espera máx. de get_message (y de la parada)
+_RECONNECT_SECONDS = 1.0
+_PURGE_EVERY_SECONDS = 30.0
+
+
+class RevocationCache:
+    def __init__(self) -> None:
+        self._revoked: Dict[str, float] = {}   # jti -> expiración (monotonic)
+        self._epochs: Dict[str, int] = {}      # user_id -> época de token
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- API ---
+    def add(self, jti: str, ttl_seconds: int) -> None:
+        with self._lock:
+            self._revoked[jti] = time.monotonic() + max(1, int(ttl_seconds))
+
+    def lookup(self, jti: str) -> Optional[bool]:
+        """True/False si la caché lo sabe; None si hay que preguntar a Redis."""
+        with self._lock:
+            exp = self._revoked.get(jti)
+        if exp is not None and exp > time.monotonic():
+            return True
+        return False if self._ready.is_set() else None
+
+    def set_epoch(self, user_id: str, epoch: int) -> None:
+        # Sólo crece: dos avisos pueden llegar desordenados
+        with self._lock:
+            if epoch > self._epochs.get(user_id, 0):
+                self._epochs[user_id] = epoch
+
+    def epoch(self, user_id: str) -> Optional[int]:
+        """Época actual del usuario si la caché está sincronizada; None si no."""
+        if not self._ready.is_set():
+            return None
+        with self._lock:
+            return self._epochs.get(user_id, 0)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="revocation-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        # Sin join: el hilo termina solo en <= _POLL_SECONDS
+        self._stop.set()
+        self._ready.clear()
+
+    # --- Suscripción ---
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub()
+                pubsub.subscribe(REVOCATION_CHANNEL)
+                self._wait_subscribed(pubsub)
+                self._load_snapshot()
+                self._ready.set()
+                last_purge = time.monotonic()
+                while not self._stop.is_set():
+                    msg = pubsub.get_message(timeout=_POLL_SECONDS)
+                    if msg and msg["type"] == "message":
+                        self._on_message(msg["data"])
+                    if time.monotonic() - last_purge > _PURGE_EVERY_SECONDS:
+                        self._purge()
+                        last_purge = time.monotonic()
+            except Exception as e:
+                self._ready.clear()
+                if not self._stop.is_set():
+                    logger.warning("Caché de revocaciones sin suscripción (se usa Redis): %s", e)
+                    self._stop.wait(_RECONNECT_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _wait_subscribed(self, pubsub) -> None:
+        # El snapshot debe hacerse después de que la suscripción esté activa,
+        # para no perder revocaciones publicadas entre medias
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not self._stop.is_set():
+            msg = pubsub.get_message(timeout=_POLL_SECONDS)
+            if msg and msg["type"] == "subscribe":
+                return
+            if msg and msg["type"] == "message":
+                self._on_message(msg["data"])
+        raise TimeoutError("Sin confirmación de SUBSCRIBE")
+
+    def _load_snapshot(self) -> None:
+        r = get_redis()
+        keys = list(r.scan_iter(match=f"{REVOKED_KEY_PREFIX}*", count=1000))
+        if keys:
+            pipe = r.pipeline(transaction=False)
+            for k in keys:
+                pipe.get(k)
+                pipe.ttl(k)
+            res = pipe.execute()
+            for k, valor, ttl in zip(keys, res[::2], res[1::2]):
+                if valor != REFRESH_REVOKED_VALUE and ttl and ttl > 0:
+                    self.add(k[len(REVOKED_KEY_PREFIX):], ttl)
+        keys = list(r.scan_iter(match=f"{EPOCH_KEY_PREFIX}*", count=1000))
+        if keys:
+            for k, n in zip(keys, r.mget(keys)):
+                if n is not None:
+                    self.set_epoch(k[len(EPOCH_KEY_PREFIX):], int(n))
+
+    def _on_message(self, data: str) -> None:
+        data = str(data)
+        if data.startswith(EPOCH_MESSAGE_PREFIX):
+            # Formato "epoch:user_id:n"
+            user_id, _, n = data[len(EPOCH_MESSAGE_PREFIX):].rpartition(":")
+            if user_id and n.isdigit():
+                self.set_epoch(user_id, int(n))
+            return
+        # Formato "jti:ttl"
+        jti, _, ttl = data.rpartition(":")
+        if jti:
+            self.add(jti, int(ttl) if ttl.isdigit() else 86400)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for jti in [j for j, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[jti]
+
+
+# ---------------------------
+# Instancia del proceso
+# ---------------------------
+_cache: Optional[RevocationCache] = None
+
+
+def get_revocation_cache() -> Optional[RevocationCache]:
+    return _cache
+
+
+def start_revocation_cache() -> RevocationCache:
+    """Arranca (o reinicia) la caché local. Se llama desde el lifespan de la app."""
+    global _cache
+    stop_revocation_cache()
+    _cache = RevocationCache()
+    _cache.start()
+    return _cache
+
+
+def stop_revocation_cache() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.stop()
+        _cache = None
@@ -0,0 +1,53 @@
+# app/core/search.py
+from typing import Any, List, Sequence
+
+from sqlalchemy import Text, cast, func, literal, or_
+from sqlalchemy.dialects.postgresql import CITEXT
+from sqlmodel import Session
+
+from app.core.pagination import SortKey, desc
+
+# ---------------------------
+# Búsqueda de texto (q=)
+# ---------------------------
+# En PostgreSQL se apoya en pg_trgm: los índices GIN gin_trgm_ops (migración
+# 'add_trgm_search_indexes') sirven tanto para ILIKE '%term%' como para el
+# operador de similitud por palabra '<%', que tolera erratas aunque el término
+# sea sólo una parte del campo. En otros motores (SQLite) se queda en el ILIKE.
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _as_text(col: Any) -> Any:
+    """Los índices trigram de columnas CITEXT se crean sobre (col::text)."""
+    return cast(col, Text) if isinstance(col.type, CITEXT) else col
+
+
+def search_condition(db: Session, cols: Sequence[Any], q: str) -> Any:
+    """
+    Condición WHERE para el filtro 'q' sobre varias columnas:
+    coincidencia parcial (ILIKE) o, en PostgreSQL, similitud trigram.
+    """
+    term = q.strip()
+    like = f"%{term}%"
+    conds: List[Any] = [_as_text(c).ilike(like) for c in cols]
+    if _is_postgres(db):
+        conds.extend(literal(term).op("<%")(_as_text(c)) for c in cols)
+    return or_(*conds)
+
+
+def relevance_keys(db: Session, cols: Sequence[Any], q: str, id_col: Any) -> List[SortKey]:
+    """
+    Claves de ordenación para ordenar=relevancia: mayor similitud primero y
+    el id como desempate (sólo paginación por offset). Sin pg_trgm se ordena sólo por id descendente.
+    """
+    if not _is_postgres(db):
+        return [desc(id_col)]
+    term = q.strip()
+    # Primero cuánto se parece el término a alguna parte del campo; a igualdad,
+    # el campo completo más parecido (p.ej. coincidencia exacta antes que prefijo)
+    word_score = func.greatest(*[func.word_similarity(term, _as_text(c)) for c in cols])
+    full_score = func.greatest(*[func.similarity(_as_text(c), term) for c in cols])
+    return [desc(word_score), desc(full_score), desc(id_col)]
@@ -1,6 +1,10 @@
 # app/core/security.py
+import hashlib
 import logging
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple, Dict, Any, Union
 
@@ -8,6 +12,16 @@ from jose import jwt, JWTError
 from passlib.hash import argon2
 
 from app.core.config import settings
+from app.core.password_pool import run_in_password_pool
+from app.core.redis_client import eval_script, get_redis
+from app.core.revocation_cache import (
+    EPOCH_KEY_PREFIX,
+    EPOCH_MESSAGE_PREFIX,
+    REFRESH_REVOKED_VALUE,
+    REVOCATION_CHANNEL,
+    REVOKED_KEY_PREFIX,
+    get_revocation_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +42,14 @@ def verify_password(plain: str, hashed: str) -> bool:
         logger.warning("Error verificando password hash: %s", e)
         return False
 
+async def hash_password_pooled(plain: str) -> str:
+    """hash_password en el pool acotado de Argon2 (503 si está saturado)."""
+    return await run_in_password_pool(hash_password, plain)
+
+async def verify_password_pooled(plain: str, hashed: str) -> bool:
+    """verify_password en el pool acotado de Argon2 (503 si está saturado)."""
+    return await run_in_password_pool(verify_password, plain, hashed)
+
 
 # ---------------------------
 # Utilidades comunes
@@ -55,6 +77,7 @@ def _base_claims(
     token_type: str,              # "access" | "refresh"
     exp_delta: timedelta,
     jti: Optional[str] = None,
+    epoch: Optional[int] = None,
 ) -> Dict[str, Any]:
     iat = _now()
     claims: Dict[str, Any] = {
@@ -65,6 +88,8 @@ def _base_claims(
         "nbf": int(iat.timestamp()),
         "exp": int((iat + exp_delta).timestamp()),
         "jti": jti or _gen_jti(),
+        # Época de token del usuario (ver revoke_all_user_tokens)
+        "token_epoch": get_token_epoch(sub) if epoch is None else int(epoch),
     }
     if settings.ISSUER:
         claims["iss"] = settings.ISSUER
@@ -75,26 +100,31 @@ def _base_claims(
 def _encode(claims: Dict[str, Any]) -> str:
     return jwt.encode(claims, _get_secret_key(), algorithm=_get_algorithm())
 
-def issue_access_token(sub: Union[str, int], role: str, jti: Optional[str] = None) -> Tuple[str, str]:
+def issue_access_token(
+    sub: Union[str, int], role: str, jti: Optional[str] = None, epoch: Optional[int] = None
+) -> Tuple[str, str]:
     """Emite un token de acceso y devuelve (token, jti)."""
     minutes = int(getattr(settings, "ACCESS_TOKEN_EXPIRE_MINUTES", 15))
-    claims = _base_claims(sub, role, "access", timedelta(minutes=minutes), jti=jti)
+    claims = _base_claims(sub, role, "access", timedelta(minutes=minutes), jti=jti, epoch=epoch)
     token = _encode(claims)
     logger.debug("Access token emitido para sub=%s", sub)
     return token, claims["jti"]
 
-def issue_refresh_token(sub: Union[str, int], role: str, jti: Optional[str] = None) -> Tuple[str, str]:
+def issue_refresh_token(
+    sub: Union[str, int], role: str, jti: Optional[str] = None, epoch: Optional[int] = None
+) -> Tuple[str, str]:
     """Emite un token de refresh y devuelve (token, jti)."""
     days = int(getattr(settings, "REFRESH_TOKEN_EXPIRE_DAYS", 7))
-    claims = _base_claims(sub, role, "refresh", timedelta(days=days), jti=jti)
+    claims = _base_claims(sub, role, "refresh", timedelta(days=days), jti=jti, epoch=epoch)
     token = _encode(claims)
     logger.debug("Refresh token emitido para sub=%s", sub)
     return token, claims["jti"]
 
 def issue_token_pair(sub: Union[str, int], role: str) -> Tuple[str, str, str, str]:
     """Devuelve (access_token, refresh_token, access_jti, refresh_jti)."""
-    access_token, jti_access = issue_access_token(sub, role)
-    refresh_token, jti_refresh = issue_refresh_token(sub, role)
+    epoch = get_token_epoch(sub)
+    access_token, jti_access = issue_access_token(sub, role, epoch=epoch)
+    refresh_token, jti_refresh = issue_refresh_token(sub, role, epoch=epoch)
     return access_token, refresh_token, jti_access, jti_refresh
 
 
@@ -135,6 +165,52 @@ def decode_token(token: str, leeway_seconds: int = 10) -> Dict[str, Any]:
         logger.warning("Error decodificando token: %s", e)
         raise
 
+# ---------------------------
+# Caché LRU de tokens ya verificados
+# ---------------------------
+# sha256(token) -> (payload, exp). Un token sólo entra tras pasar decode_token
+# (firma, iss/aud, exp, nbf), y vale hasta exp + leeway de la llamada, igual
+# que si se volviera a verificar. La revocación se sigue comprobando aparte
+# (deps.current_user -> is_revoked) en cada petición.
+_decoded_cache: "OrderedDict[bytes, Tuple[Dict[str, Any], int]]" = OrderedDict()
+_decoded_lock = threading.Lock()
+
+
+def decode_token_cached(token: str, leeway_seconds: int = 10) -> Dict[str, Any]:
+    """
+    Igual que decode_token pero reutiliza payloads ya verificados
+    (JWT_DECODE_CACHE_SIZE entradas como máximo; 0 = sin caché).
+    Devuelve una copia: el llamador puede modificarla.
+    """
+    size = settings.JWT_DECODE_CACHE_SIZE
+    if size <= 0:
+        return decode_token(token, leeway_seconds)
+
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    now = time.time()
+    with _decoded_lock:
+        hit = _decoded_cache.get(key)
+        if hit is not None:
+            if now < hit[1] + leeway_seconds:
+                _decoded_cache.move_to_end(key)
+                return dict(hit[0])
+            del _decoded_cache[key]
+
+    payload = decode_token(token, leeway_seconds)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        with _decoded_lock:
+            _decoded_cache[key] = (dict(payload), int(exp))
+            _decoded_cache.move_to_end(key)
+            while len(_decoded_cache) > size:
+                _decoded_cache.popitem(last=False)
+    return payload
+
+
+def clear_decoded_token_cache() -> None:
+    with _decoded_lock:
+        _decoded_cache.clear()
+
 def try_decode_token(token: str, leeway_seconds: int = 10) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """Devuelve (payload, error_message) sin lanzar excepción."""
     try:
@@ -146,25 +222,21 @@ def try_decode_token(token: str, leeway_seconds: int = 10) -> Tuple[Optional[Dic
 # ---------------------------
 # Revocación de tokens (Redis)
 # ---------------------------
-_redis_client = None  # lazy singleton
-
 def _get_redis():
-    global _redis_client
-    if _redis_client is not None:
-        return _redis_client
+    """Cliente compartido (app/core/redis_client.py); None si no se puede crear."""
     try:
-        import redis  # type: ignore
-        _redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-        logger.info("Cliente Redis inicializado para revocación de tokens")
+        return get_redis()
     except Exception as e:
-        logger.warning("Redis no disponible para revocación de tokens: %s", e)
-        _redis_client = None
-    return _redis_client
+        logger.warning("Redis no disponible: %s", e)
+        return None
 
-def revoke_token(jti: str, ttl_seconds: Optional[int] = None) -> bool:
+def revoke_token(jti: str, ttl_seconds: Optional[int] = None, token_type: str = "access") -> bool:
     """
     Marca un token como revocado. Si no se especifica TTL, se usa 24h como fallback.
     Preferible usar 'revoke_token_by_payload' cuando se disponga de 'exp'.
+    Los refresh sólo se guardan en Redis (su rotación consulta siempre Redis):
+    ni se publican ni entran en las cachés locales, que así sólo contienen
+    JTIs de access de vida corta.
     """
     if not jti:
         logger.warning("Intento de revocar token sin JTI")
@@ -173,8 +245,19 @@ def revoke_token(jti: str, ttl_seconds: Optional[int] = None) -> bool:
     if not r:
         logger.warning("Redis no disponible, no se puede revocar token")
         return False
+    ttl = ttl_seconds if (ttl_seconds and ttl_seconds > 0) else 86400
     try:
-        r.setex(f"jwt:revoked:{jti}", ttl_seconds if (ttl_seconds and ttl_seconds > 0) else 86400, "1")
+        if token_type == "refresh":
+            r.setex(f"{REVOKED_KEY_PREFIX}{jti}", ttl, REFRESH_REVOKED_VALUE)
+        else:
+            # SETEX + aviso a las cachés locales del resto de procesos (1 round trip)
+            pipe = r.pipeline()
+            pipe.setex(f"{REVOKED_KEY_PREFIX}{jti}", ttl, "1")
+            pipe.publish(REVOCATION_CHANNEL, f"{jti}:{ttl}")
+            pipe.execute()
+            cache = get_revocation_cache()
+            if cache is not None:
+                cache.add(jti, ttl)
         logger.info("Token revocado: %s (ttl=%s)", jti, ttl_seconds)
         return True
     except Exception as e:
@@ -197,30 +280,103 @@ def revoke_token_by_payload(payload: Dict[str, Any]) -> bool:
         if remaining > 0:
             ttl_seconds = remaining + 60  # margen de seguridad
 
-    return revoke_token(jti, ttl_seconds)
+    token_type = payload.get("type") or payload.get("typ") or "access"
+    return revoke_token(jti, ttl_seconds, token_type=token_type)
 
-def is_revoked(jti: Optional[str]) -> bool:
+def is_revoked(jti: Optional[str], strict: bool = False) -> bool:
     """
     True si el token está revocado. Si Redis no está disponible, devuelve False.
+    Primero consulta la caché local del proceso (app/core/revocation_cache.py);
+    sólo va a Redis si la caché no está sincronizada. Con strict=True (refresh)
+    se consulta siempre Redis.
     """
     if not jti:
         return False
+    cache = get_revocation_cache()
+    if cache is not None and not strict:
+        local = cache.lookup(jti)
+        if local is not None:
+            return local
     r = _get_redis()
     if not r:
         return False
     try:
-        return r.exists(f"jwt:revoked:{jti}") == 1
+        return r.exists(f"{REVOKED_KEY_PREFIX}{jti}") == 1
     except Exception as e:
         logger.error("Error consultando revocación de %s: %s", jti, e)
         return False
 
+# ---------------------------
+# Época de token por usuario (logout global en O(1))
+# ---------------------------
+# Cada token lleva el claim 'token_epoch' con la época del usuario al emitirlo.
+# Incrementar la época ('jwt:epoch:<id>' en Redis, INCR) invalida de golpe
+# todos sus tokens anteriores, sin llevar la lista de JTIs por usuario.
+# La comprobación usa la caché local de revocation_cache (avisada por pub/sub)
+# y sólo va a Redis si no está sincronizada o con strict=True (refresh).
+# Tokens emitidos antes de existir el claim cuentan como época 0.
+def get_token_epoch(user_id: Union[str, int], strict: bool = False) -> int:
+    """Época actual del usuario (0 si nunca se ha incrementado o sin Redis)."""
+    uid = str(user_id)
+    cache = get_revocation_cache()
+    if cache is not None and not strict:
+        local = cache.epoch(uid)
+        if local is not None:
+            return local
+    r = _get_redis()
+    if not r:
+        return 0
+    try:
+        return int(r.get(f"{EPOCH_KEY_PREFIX}{uid}") or 0)
+    except Exception as e:
+        logger.error("Error consultando época de token de user_id=%s: %s", uid, e)
+        return 0
+
+def is_epoch_revoked(payload: Dict[str, Any], strict: bool = False) -> bool:
+    """True si el token es de una época anterior a la actual de su usuario."""
+    sub = payload.get("sub")
+    if sub is None:
+        return False
+    try:
+        epoch = int(payload.get("token_epoch") or 0)
+    except (TypeError, ValueError):
+        return True
+    return epoch < get_token_epoch(sub, strict=strict)
+
+# INCR + PUBLISH en un solo script: o se revoca y se avisa a los workers, o
+# nada (con MULTI/EXEC el aviso no podría llevar la época que devuelve INCR)
+_REVOKE_EPOCH_LUA = """
+local epoch = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', ARGV[1], ARGV[2] .. epoch)
+return epoch
+"""
+
 def revoke_all_user_tokens(user_id: Union[str, int]) -> int:
     """
-    Logout global del usuario. (Stub: requiere llevar tracking de JTI por usuario).
-    Devuelve el número de tokens revocados (0 en esta implementación).
+    Logout global del usuario: incrementa su época de token, con lo que todos
+    los tokens emitidos hasta ahora dejan de valer. Coste constante.
+    Devuelve la nueva época (0 si Redis no está disponible y no se revocó nada).
     """
-    logger.info("Logout global solicitado para user_id=%s (stub)", user_id)
-    return 0
+    uid = str(user_id)
+    r = _get_redis()
+    if not r:
+        logger.warning("Redis no disponible, no se puede revocar los tokens de user_id=%s", uid)
+        return 0
+    try:
+        epoch = int(eval_script(
+            _REVOKE_EPOCH_LUA,
+            [f"{EPOCH_KEY_PREFIX}{uid}"],
+            [REVOCATION_CHANNEL, f"{EPOCH_MESSAGE_PREFIX}{uid}:"],
+            client=r,
+        ))
+    except Exception as e:
+        logger.error("Error revocando los tokens de user_id=%s: %s", uid, e)
+        return 0
+    cache = get_revocation_cache()
+    if cache is not None:
+        cache.set_epoch(uid, epoch)
+    logger.info("Tokens de user_id=%s revocados (época %s)", uid, epoch)
+    return epoch
 
 
 # ---------------------------
@@ -251,6 +407,17 @@ def get_token_remaining_ttl(payload: Dict[str, Any]) -> int:
 
 from fastapi import Request, HTTPException, status
 
+# request.state: la petición ya la cubre IdempotencyMiddleware (respuesta
+# guardada); estos helpers no deben devolver 409 a sus reintentos
+IDEMPOTENCIA_GESTIONADA = "idempotencia_gestionada"
+
+
+def _idem_key(request: Request) -> Optional[str]:
+    if getattr(request.state, IDEMPOTENCIA_GESTIONADA, False):
+        return None
+    return request.headers.get("X-Idempotency-Key") or request.headers.get("Idempotency-Key")
+
+
 def assert_idempotent(request: Request, ttl_sec: int = 30) -> None:
     """
     Verifica idempotencia basada en Idempotency-Key.
@@ -258,9 +425,9 @@ def assert_idempotent(request: Request, ttl_sec: int = 30) -> None:
     Si Redis falla, no bloquea la solicitud.
     """
     try:
-        idem_key = request.headers.get("X-Idempotency-Key") or request.headers.get("Idempotency-Key")
+        idem_key = _idem_key(request)
         if not idem_key:
-            return  # sin header => no aplicamos
+            return  # sin header (o ya gestionada por el middleware) => no aplicamos
 
         r = _get_redis()
         if not r:
@@ -334,6 +501,71 @@ def check_rate_limit_nfc(user_id: str, nfc_tag: str, limit: int = 5, window_sec:
         return
 
 
+# ---------------------------
+# Guard NFC combinado (1 round trip)
+# ---------------------------
+# Idempotencia + debounce + rate limit en un único script Lua atómico.
+# Sólo si pasan las tres comprobaciones se registran las marcas, así una
+# petición rechazada (p.ej. 429) no "consume" su Idempotency-Key.
+# Devuelve 0 = ok, 1 = idempotency repetida, 2 = debounce, 3 = rate limit.
+_NFC_GUARD_LUA = """
+local idem, debounce, rate = KEYS[1], KEYS[2], KEYS[3]
+if idem ~= '' and redis.call('EXISTS', idem) == 1 then return 1 end
+if redis.call('EXISTS', debounce) == 1 then return 2 end
+if tonumber(redis.call('GET', rate) or '0') >= tonumber(ARGV[3]) then return 3 end
+if idem ~= '' then redis.call('SET', idem, '1', 'EX', ARGV[1]) end
+redis.call('SET', debounce, '1', 'EX', ARGV[2])
+redis.call('INCR', rate)
+redis.call('EXPIRE', rate, ARGV[4])
+return 0
+"""
+
+_NFC_GUARD_ERRORS = {
+    1: (status.HTTP_409_CONFLICT, "Solicitud duplicada (Idempotency-Key ya usado dentro del TTL)"),
+    2: (status.HTTP_429_TOO_MANY_REQUESTS, "Demasiadas solicitudes en poco tiempo"),
+    3: (status.HTTP_429_TOO_MANY_REQUESTS, "Límite de operaciones NFC excedido"),
+}
+
+
+def assert_nfc_guard(
+    request: Request,
+    user_id: Union[str, int],
+    nfc_tag: str,
+    accion: str,
+    idem_ttl_sec: int = 30,
+    debounce_ttl_sec: int = 3,
+    limit: int = 5,
+    window_sec: int = 10,
+) -> None:
+    """
+    Equivalente atómico de assert_idempotent + assert_debounce +
+    check_rate_limit_nfc (mismas claves y respuestas) en un solo EVALSHA.
+    Si Redis no está disponible o falla, no interrumpe la solicitud.
+    """
+    r = _get_redis()
+    if not r:
+        return
+
+    tag = (nfc_tag or "").strip().lower()
+    idem_key = _idem_key(request)
+    keys = [
+        f"idempotency:{idem_key}" if idem_key else "",
+        f"debounce:nfc:{user_id}:{tag}:{accion}",
+        f"rate_limit:nfc:{user_id}:{tag}",
+    ]
+    try:
+        verdict = int(eval_script(
+            _NFC_GUARD_LUA, keys, [idem_ttl_sec, debounce_ttl_sec, limit, window_sec], client=r
+        ))
+    except Exception as e:
+        logger.warning("Guard NFC no disponible (Redis): %s", e)
+        return
+
+    if verdict in _NFC_GUARD_ERRORS:
+        code, detail = _NFC_GUARD_ERRORS[verdict]
+        raise HTTPException(status_code=code, detail=detail)
+
+
 # ---------------------------
 # Exports
 # ---------------------------
@@ -341,6 +573,8 @@ __all__ = [
     # Password hashing
     "hash_password",
     "verify_password",
+    "hash_password_pooled",
+    "verify_password_pooled",
 
     # Token issuance
     "issue_access_token",
@@ -349,12 +583,16 @@ __all__ = [
 
     # Token decoding
     "decode_token",
+    "decode_token_cached",
+    "clear_decoded_token_cache",
     "try_decode_token",
 
     # Token revocation
     "revoke_token",
     "revoke_token_by_payload",
     "is_revoked",
+    "get_token_epoch",
+    "is_epoch_revoked",
     "revoke_all_user_tokens",
 
     # Utilities
@@ -365,5 +603,5 @@ __all__ = [
     "assert_idempotent",
     "assert_debounce", 
     "check_rate_limit_nfc",
-
+    "assert_nfc_guard",
 ]
@@ -0,0 +1,208 @@
+# app/core/stats.py
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import redis
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.redis_client import get_redis
+from app.models.equipo import Equipo
+from app.models.stats import STATS_SPECS, EquipoStats, UbicacionStats, apply_deltas_sql, deltas_sql
+from app.models.ubicacion import Ubicacion
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Resúmenes de /estadisticas/resumen
+# ---------------------------
+# En PostgreSQL se leen de equipo_stats / ubicacion_stats (triggers de
+# app/models/stats.py): una lectura de pocas filas en vez de GROUP BY sobre
+# toda la tabla. En otros motores no hay triggers y se agrega al vuelo.
+TOP_TIPOS = 10
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def resumen_equipos(db: Session) -> Dict[str, Any]:
+    if not _is_postgres(db):
+        return _resumen_equipos_agregado(db)
+
+    rows = db.exec(
+        select(EquipoStats.dimension, EquipoStats.clave, EquipoStats.total).where(EquipoStats.total > 0)
+    ).all()
+    total = sin_ubicacion = 0
+    por_estado: Dict[str, int] = {}
+    tipos: Dict[str, int] = {}
+    for dimension, clave, n in rows:
+        if dimension == "total":
+            total = n
+        elif dimension == "sin_ubicacion":
+            sin_ubicacion = n
+        elif dimension == "estado" and clave:
+            por_estado[clave] = n
+        elif dimension == "tipo" and clave:
+            tipos[clave] = n
+
+    top = sorted(tipos.items(), key=lambda kv: (-kv[1], kv[0]))[:TOP_TIPOS]
+    return {
+        "total_equipos": total,
+        "por_estado": por_estado,
+        "tipos_mas_comunes": dict(top),
+        "sin_ubicacion": sin_ubicacion,
+        "con_ubicacion": total - sin_ubicacion,
+    }
+
+
+def resumen_ubicaciones(db: Session) -> Dict[str, Any]:
+    if not _is_postgres(db):
+        return _resumen_ubicaciones_agregado(db)
+
+    rows = db.exec(
+        select(UbicacionStats.dimension, UbicacionStats.clave, UbicacionStats.total)
+        .where(UbicacionStats.total > 0)
+    ).all()
+    total = 0
+    por_seccion: Dict[str, int] = {}
+    for dimension, clave, n in rows:
+        if dimension == "total":
+            total = n
+        elif dimension == "seccion" and clave:
+            por_seccion[clave] = n
+    return {
+        "total_ubicaciones": total,
+        "por_seccion": dict(sorted(por_seccion.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def _resumen_equipos_agregado(db: Session) -> Dict[str, Any]:
+    total = db.exec(select(func.count(Equipo.id))).one()
+
+    por_estado_rows = db.exec(
+        select(Equipo.estado, func.count(Equipo.id)).group_by(Equipo.estado)
+    ).all()
+    por_estado = {k: v for k, v in por_estado_rows if k is not None}
+
+    por_tipo_rows = db.exec(
+        select(Equipo.tipo, func.count(Equipo.id))
+        .group_by(Equipo.tipo)
+        .order_by(func.count(Equipo.id).desc())
+        .limit(TOP_TIPOS)
+    ).all()
+    por_tipo = {k: v for k, v in por_tipo_rows if k is not None}
+
+    sin_ubicacion = db.exec(
+        select(func.count(Equipo.id)).where(Equipo.ubicacion_id.is_(None))
+    ).one()
+
+    return {
+        "total_equipos": total,
+        "por_estado": por_estado,
+        "tipos_mas_comunes": por_tipo,
+        "sin_ubicacion": sin_ubicacion,
+        "con_ubicacion": total - sin_ubicacion,
+    }
+
+
+def _resumen_ubicaciones_agregado(db: Session) -> Dict[str, Any]:
+    total = db.exec(select(func.count(Ubicacion.id))).one()
+    por_seccion_rows = db.exec(
+        select(Ubicacion.seccion_id, func.count(Ubicacion.id))
+        .group_by(Ubicacion.seccion_id)
+        .order_by(func.count(Ubicacion.id).desc())
+    ).all()
+    por_seccion = {str(k): v for k, v in por_seccion_rows if k is not None}
+    return {"total_ubicaciones": total, "por_seccion": por_seccion}
+
+
+# ---------------------------
+# Reconciliación
+# ---------------------------
+def reconciliar_stats(db: Session) -> int:
+    """
+    Corrige la deriva de los contadores (p.ej. cargas con triggers desactivados).
+    Una sentencia por tabla: suma (esperado - actual) calculado sobre la misma
+    instantánea, así las escrituras concurrentes no se pierden. No hace commit.
+    Devuelve cuántas claves se han corregido.
+    """
+    if not _is_postgres(db):
+        return 0
+    corregidas = 0
+    for spec in STATS_SPECS:
+        table, stats_table, _ = spec
+        deltas = f"{deltas_sql(spec, table)} UNION ALL SELECT dimension, clave, -total FROM {stats_table}"
+        corregidas += len(db.exec(text(apply_deltas_sql(spec, deltas) + " RETURNING 1")).all())
+    return corregidas
+
+
+class StatsReconciler:
+    """
+    Hilo que reconcilia cada STATS_RECONCILE_INTERVAL_SECONDS. Con varios
+    workers sólo uno lo hace por intervalo (lock en Redis; sin Redis, todos).
+    """
+
+    LOCK_KEY = "stats:reconcile:lock"
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stats-reconcile", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> Optional[int]:
+        try:
+            if not get_redis().set(self.LOCK_KEY, 1, nx=True, ex=max(1, int(self.interval * 0.9))):
+                return None
+        except redis.RedisError:
+            pass
+        with Session(engine) as db:
+            n = reconciliar_stats(db)
+            db.commit()
+        if n:
+            logger.warning("Estadísticas con deriva: %s claves corregidas", n)
+        return n
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Reconciliación de estadísticas fallida: %s", e)
+
+
+_reconciler: Optional[StatsReconciler] = None
+
+
+def start_stats_reconciler() -> Optional[StatsReconciler]:
+    """Se llama desde el lifespan; STATS_RECONCILE_INTERVAL_SECONDS=0 lo desactiva."""
+    global _reconciler
+    if settings.STATS_RECONCILE_INTERVAL_SECONDS > 0 and _reconciler is None:
+        _reconciler = StatsReconciler(settings.STATS_RECONCILE_INTERVAL_SECONDS)
+        _reconciler.start()
+    return _reconciler
+
+
+def stop_stats_reconciler() -> None:
+    global _reconciler
+    if _reconciler is not None:
+        _reconciler.stop()
+        _reconciler = None
+
+
+if __name__ == "__main__":
+    # Ejecución manual / cron:  python -m app.core.stats
+    with Session(engine) as s:
+        corregidas = reconciliar_stats(s)
+        s.commit()
+    print(f"Claves corregidas: {corregidas}")
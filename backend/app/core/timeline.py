@@ -0,0 +1,120 @@
+# app/core/timeline.py
+from typing import Any, List, Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy import Integer, String, and_, cast, column, literal, null, or_, union_all
+from sqlmodel import Session, select
+
+from app.core.pagination import SortKey, decode_cursor, desc, encode_cursor
+from app.models.equipo_adjunto import EquipoAdjunto
+from app.models.incidencia import Incidencia
+from app.models.movimiento import Movimiento
+from app.models.reparacion import Reparacion
+
+# ---------------------------
+# Historial unificado de un equipo (/equipos/{id}/timeline)
+# ---------------------------
+# Un único UNION ALL de movimientos, incidencias, reparaciones y adjuntos,
+# ordenado por (fecha, tipo, id) descendente y paginado por cursor.
+# Cada rama lleva su propio WHERE equipo_id / keyset + ORDER BY + LIMIT, así
+# Postgres recorre hacia atrás su índice (equipo_id, fecha) y se queda en las
+# 'limit' primeras filas de cada tabla, sin leer el historial completo.
+ORDEN = "timeline"
+KEYS: List[SortKey] = [desc(column("fecha")), desc(column("tipo")), desc(column("id"))]
+
+
+def _rama(tipo: str, model: Any, fecha: Any, **extra: Any) -> dict:
+    campos = {
+        "titulo": None,
+        "estado": None,
+        "usuario_id": None,
+        "incidencia_id": None,
+        "desde_ubicacion_id": None,
+        "hacia_ubicacion_id": None,
+        **extra,
+    }
+    return {"tipo": tipo, "model": model, "fecha": fecha, "campos": campos}
+
+
+RAMAS = [
+    _rama(
+        "movimiento", Movimiento, Movimiento.fecha,
+        titulo=Movimiento.comentario,
+        usuario_id=Movimiento.usuario_id,
+        desde_ubicacion_id=Movimiento.desde_ubicacion_id,
+        hacia_ubicacion_id=Movimiento.hacia_ubicacion_id,
+    ),
+    _rama(
+        "incidencia", Incidencia, Incidencia.fecha,
+        titulo=Incidencia.titulo, estado=Incidencia.estado, usuario_id=Incidencia.usuario_id,
+    ),
+    _rama(
+        "reparacion", Reparacion, Reparacion.fecha_inicio,
+        titulo=Reparacion.titulo, estado=Reparacion.estado,
+        usuario_id=Reparacion.usuario_id, incidencia_id=Reparacion.incidencia_id,
+    ),
+    _rama(
+        "adjunto", EquipoAdjunto, EquipoAdjunto.subido_en,
+        titulo=EquipoAdjunto.nombre_archivo, usuario_id=EquipoAdjunto.subido_por_id,
+    ),
+]
+
+# Tipo de las columnas que una rama no tiene (NULL tipado para el UNION)
+_TIPOS_SQL = {
+    "titulo": String, "estado": String, "usuario_id": Integer,
+    "incidencia_id": Integer, "desde_ubicacion_id": Integer, "hacia_ubicacion_id": Integer,
+}
+
+
+def _despues(tipo: str, fecha: Any, id_col: Any, cursor: Sequence[Any]) -> Any:
+    """
+    (fecha, tipo, id) < cursor con 'tipo' constante en la rama: se resuelve
+    aquí y la condición queda sólo sobre (fecha, id), que cubre el índice.
+    """
+    c_fecha, c_tipo, c_id = cursor
+    if tipo < c_tipo:
+        return fecha <= c_fecha
+    if tipo > c_tipo:
+        return fecha < c_fecha
+    # 'fecha <= c' redundante: acota el recorrido del índice (el OR no lo hace)
+    return and_(fecha <= c_fecha, or_(fecha < c_fecha, and_(fecha == c_fecha, id_col < c_id)))
+
+
+def timeline_stmt(equipo_id: int, limit: int, cursor: Optional[Sequence[Any]] = None) -> Any:
+    ramas = []
+    for r in RAMAS:
+        model, fecha = r["model"], r["fecha"]
+        cols = [
+            literal(r["tipo"], String).label("tipo"),
+            model.id.label("id"),
+            fecha.label("fecha"),
+        ] + [
+            (v if v is not None else cast(null(), _TIPOS_SQL[k])).label(k)
+            for k, v in r["campos"].items()
+        ]
+        stmt = select(*cols).where(model.equipo_id == equipo_id)
+        if cursor is not None:
+            stmt = stmt.where(_despues(r["tipo"], fecha, model.id, cursor))
+        ramas.append(stmt.order_by(fecha.desc(), model.id.desc()).limit(limit))
+
+    u = union_all(*ramas).subquery("timeline")
+    return (
+        select(u)
+        .order_by(u.c.fecha.desc(), u.c.tipo.desc(), u.c.id.desc())
+        .limit(limit)
+    )
+
+
+def timeline_equipo(
+    db: Session,
+    response: Response,
+    equipo_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> List[dict]:
+    """Una página del historial; X-Next-Cursor si la página está llena."""
+    valores = decode_cursor(cursor, ORDEN, KEYS) if cursor else None
+    rows = db.execute(timeline_stmt(equipo_id, limit, valores)).all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(ORDEN, rows[-1], KEYS)
+    return [dict(r._mapping) for r in rows]
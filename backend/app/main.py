@@ -1,6 +1,5 @@
 # app/main.py
 import time
-import redis
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from typing import Final, Dict, Any
@@ -15,8 +14,17 @@ from sqlmodel import Session, select
 
 from app.core.logging import setup_logging, get_logger
 from app.core.cors import add_cors
-from app.core.db import init_db, get_session, engine
+from app.core.db import dispose_async_engine, init_db, get_session, engine
 from app.core.config import settings
+from app.core.password_pool import close_password_pool, get_password_pool
+from app.core.redis_client import close_redis, get_redis, pool_stats
+from app.core.replicas import close_replicas, get_replica_router, start_replicas
+from app.core.stats import start_stats_reconciler, stop_stats_reconciler
+from app.core.particiones import start_partition_maintainer, stop_partition_maintainer
+from app.core.revocation_cache import start_revocation_cache, stop_revocation_cache
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
 from app.middleware.security_headers import SecurityHeadersMiddleware
 
 # --- Inicialización de logging ---
@@ -38,9 +46,21 @@ OPENAPI_TAGS: Final = [
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    if settings.REVOCATION_LOCAL_CACHE:
+        start_revocation_cache()
+    start_replicas()
+    start_stats_reconciler()
+    start_partition_maintainer()
     logger.info("Aplicación iniciada correctamente")
     yield
     logger.info("Aplicación deteniéndose")
+    stop_revocation_cache()
+    stop_stats_reconciler()
+    stop_partition_maintainer()
+    close_password_pool()
+    close_redis()
+    await close_replicas()
+    await dispose_async_engine()
 
 # Config de documentación (permite desactivarla por entorno)
 docs_url = "/docs" if settings.DOCS_ENABLED else None
@@ -61,6 +81,9 @@ app = FastAPI(
 )
 
 # --- Middlewares ---
+# Idempotency-Key: reintentos reciben la respuesta guardada (el más interno:
+# guarda la respuesta de la app tal cual, sin comprimir)
+app.add_middleware(IdempotencyMiddleware)
 # Security headers (en prod pon HSTS a True si sirves HTTPS)
 app.add_middleware(SecurityHeadersMiddleware, hsts=settings.HSTS_ENABLED)
 # GZip (mejora rendimiento en listados)
@@ -68,6 +91,11 @@ app.add_middleware(GZipMiddleware, minimum_size=1024)
 # Trusted hosts (recomendado en prod)
 if settings.trusted_hosts_list:
     app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.trusted_hosts_list)
+# Read-your-writes con réplicas de lectura (no hace nada sin DATABASE_REPLICA_URLS)
+app.add_middleware(ReadYourWritesMiddleware)
+# Rate limit global por usuario/IP (RATE_LIMIT_GLOBAL, GCRA); dentro de CORS
+# para que los 429 lleven sus cabeceras
+app.add_middleware(RateLimitMiddleware)
 # CORS (expone X-Total-Count y Location desde core/cors.py)
 add_cors(app)
 
@@ -135,13 +163,11 @@ def health_check():
 
     # 2. Chequeo Redis
     try:
-        # Timeout corto (1s) para no bloquear la petición si Redis murió
-        r = redis.from_url(settings.REDIS_URL, socket_timeout=1)
-        if r.ping():
+        # Cliente compartido: ya tiene timeouts cortos de conexión/lectura
+        if get_redis().ping():
             redis_status = "healthy"
         else:
             redis_status = "unhealthy"
-        r.close()
     except Exception as e:
         logger.error(f"Health Redis Error: {e}")
         redis_status = "unhealthy"
@@ -175,10 +201,10 @@ def version():
 @app.get("/_meta/redis", tags=["_meta"])
 def redis_health() -> Dict[str, Any]:
     """
-    Chequeo básico de Redis (PING) y versión del servidor.
+    Chequeo básico de Redis (PING), versión del servidor y estado del pool.
     """
     try:
-        r = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        r = get_redis()
         pong = r.ping()
         info = r.info(section="server")
         return {
@@ -186,10 +212,26 @@ def redis_health() -> Dict[str, Any]:
             "redis_version": info.get("redis_version"),
             "mode": info.get("redis_mode"),
             "uptime_in_seconds": info.get("uptime_in_seconds"),
+            "pool": pool_stats(),
         }
     except Exception as e:
         logger.error(f"Redis health failed: {e}")
-        return {"ok": False, "error": str(e)}
+        return {"ok": False, "error": str(e), "pool": pool_stats()}
+
+@app.get("/_meta/replicas", tags=["_meta"])
+def replicas_stats() -> Dict[str, Any]:
+    """
+    Réplicas de lectura configuradas: sanas o no, retraso y último error.
+    """
+    router = get_replica_router()
+    return {"enabled": router is not None, "replicas": router.stats() if router else []}
+
+@app.get("/_meta/password-pool", tags=["_meta"])
+def password_pool_stats() -> Dict[str, Any]:
+    """
+    Estado del pool de Argon2: en ejecución, en cola, rechazadas y espera media.
+    """
+    return get_password_pool().stats()
 
 # ---------- Manejadores globales de errores ----------
 @app.exception_handler(IntegrityError)
@@ -208,7 +250,8 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         logger.info(f"404 Not Found: {request.method} {request.url.path}")
         return JSONResponse(status_code=404, content={"detail": "Recurso no encontrado"})
     logger.warning(f"HTTP {exc.status_code}: {exc.detail}")
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    # Conserva cabeceras como WWW-Authenticate o Retry-After
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,217 @@
+# app/middleware/idempotency.py
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.core.security import IDEMPOTENCIA_GESTIONADA, decode_token_cached
+
+log = logging.getLogger(__name__)
+
+# ---------------------------
+# Idempotencia con respuesta guardada (Idempotency-Key / X-Idempotency-Key)
+# ---------------------------
+# La primera petición con una clave deja una marca "en curso" (SET NX) y, al
+# terminar, guarda estado + cabeceras + cuerpo durante IDEMPOTENCY_TTL_SECONDS.
+# - Un reintento recibe exactamente esa respuesta (más Idempotency-Replayed).
+# - Un duplicado concurrente espera a que la primera termine (hasta
+#   IDEMPOTENCY_WAIT_SECONDS; después 409 con Retry-After).
+# - Las respuestas 5xx/429 no se guardan: se libera la clave y el reintento
+#   se ejecuta de nuevo.
+# La clave se asocia al usuario, método y ruta: la misma Idempotency-Key de
+# otro usuario u otra ruta es otra operación. Con la marca y la respuesta se
+# guarda la huella (sha256) del cuerpo de la petición: reutilizar la clave con
+# otro cuerpo es un error del cliente (422), no un reintento. Para calcularla
+# se lee el cuerpo entero antes de pasarlo a la app.
+# Redis (cliente síncrono) se usa siempre desde el threadpool.
+# Sin Redis la petición pasa sin más (fail-open, como el resto de helpers).
+_EN_CURSO = "inflight"
+_OTRO_CUERPO = "Idempotency-Key ya usada con otro cuerpo de petición"
+_POLL_SECONDS = 0.05
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for k, v in scope.get("headers") or ():
+        if k == name:
+            return v.decode("latin-1")
+    return None
+
+
+def _usuario(scope: Scope) -> str:
+    scheme, _, token = (_header(scope, b"authorization") or "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return str(decode_token_cached(token.strip()).get("sub"))
+        except Exception:
+            pass
+    return "-"
+
+
+def _clave(scope: Scope, idem_key: str) -> str:
+    raw = "\x1f".join((_usuario(scope), scope["method"], scope["path"], idem_key))
+    return "idempotency:resp:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _guardable(status: int) -> bool:
+    return status < 500 and status != 429
+
+
+async def _leer_cuerpo(receive: Receive) -> Tuple[List[Message], str]:
+    """Mensajes del cuerpo (para reenviarlos a la app) y su huella sha256."""
+    mensajes: List[Message] = []
+    huella = hashlib.sha256()
+    while True:
+        message = await receive()
+        mensajes.append(message)
+        if message["type"] != "http.request":
+            break  # desconexión: la app la verá igual
+        huella.update(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return mensajes, huella.hexdigest()
+
+
+def _reenviar(mensajes: List[Message], receive: Receive) -> Receive:
+    pendientes = list(mensajes)
+
+    async def recibir() -> Message:
+        if pendientes:
+            return pendientes.pop(0)
+        return await receive()
+
+    return recibir
+
+
+def _tomar_o_leer(clave: str, marca: str) -> Tuple[bool, Optional[str]]:
+    """SET NX de la marca "en curso"; si ya existía, su valor actual."""
+    r = get_redis()
+    if r.set(clave, marca, nx=True, ex=settings.IDEMPOTENCY_LOCK_SECONDS):
+        return True, None
+    return False, r.get(clave)
+
+
+def _liberar(clave: str) -> None:
+    try:
+        get_redis().delete(clave)
+    except Exception:
+        pass
+
+
+class IdempotencyMiddleware:
+    """ASGI puro: captura la respuesta tal cual sale de la app (también en streaming)."""
+
+    def __init__(self, app: ASGIApp, *, paths: str = settings.IDEMPOTENCY_PATHS) -> None:
+        self.app = app
+        self.paths = re.compile(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not self.paths.search(scope["path"]):
+            return await self.app(scope, receive, send)
+        idem_key = _header(scope, b"idempotency-key") or _header(scope, b"x-idempotency-key")
+        if not idem_key:
+            return await self.app(scope, receive, send)
+
+        mensajes, huella = await _leer_cuerpo(receive)
+        receive = _reenviar(mensajes, receive)
+        clave = _clave(scope, idem_key)
+        limite = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            try:
+                tomada, valor = await run_in_threadpool(_tomar_o_leer, clave, f"{_EN_CURSO}:{huella}")
+            except Exception as e:
+                log.warning("Idempotencia no disponible (Redis): %s", e)
+                return await self.app(scope, receive, send)
+
+            if tomada:
+                break
+            if valor is None:
+                continue  # la primera falló y liberó la clave: ésta pasa a ser la primera
+            if valor.startswith(_EN_CURSO):
+                otra = valor[len(_EN_CURSO) + 1:]
+                if otra and otra != huella:
+                    return await _responder(send, 422, _OTRO_CUERPO, retry_after=False)
+                if time.monotonic() >= limite:
+                    return await _responder(send, 409, "Solicitud con esta Idempotency-Key en curso")
+                await asyncio.sleep(_POLL_SECONDS)
+                continue
+            guardada = json.loads(valor)
+            if guardada.get("q", huella) != huella:
+                return await _responder(send, 422, _OTRO_CUERPO, retry_after=False)
+            return await _reproducir(send, guardada)
+
+        scope.setdefault("state", {})[IDEMPOTENCIA_GESTIONADA] = True
+        await self._primera(clave, huella, scope, receive, send)
+
+    async def _primera(self, clave: str, huella: str, scope: Scope, receive: Receive, send: Send) -> None:
+        inicio: Dict[str, Any] = {}
+        cuerpo: List[bytes] = []
+        tamano = 0
+        guardada = False
+
+        async def capturar(message: Message) -> None:
+            nonlocal tamano, guardada
+            if message["type"] == "http.response.start":
+                inicio.update(status=message["status"], headers=list(message.get("headers") or []))
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                tamano += len(chunk)
+                if tamano <= settings.IDEMPOTENCY_MAX_BODY_BYTES:
+                    cuerpo.append(chunk)
+                if not message.get("more_body", False):
+                    guardada = await run_in_threadpool(self._guardar, clave, huella, inicio, cuerpo, tamano)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capturar)
+        finally:
+            if not guardada:
+                # Error, 5xx/429 o respuesta demasiado grande: el reintento se ejecuta otra vez
+                await run_in_threadpool(_liberar, clave)
+
+    @staticmethod
+    def _guardar(clave: str, huella: str, inicio: Dict[str, Any], cuerpo: List[bytes], tamano: int) -> bool:
+        if not inicio or not _guardable(inicio["status"]) or tamano > settings.IDEMPOTENCY_MAX_BODY_BYTES:
+            return False
+        valor = json.dumps({
+            "s": inicio["status"],
+            "h": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in inicio["headers"]],
+            "b": base64.b64encode(b"".join(cuerpo)).decode("ascii"),
+            "q": huella,
+        })
+        try:
+            get_redis().set(clave, valor, ex=settings.IDEMPOTENCY_TTL_SECONDS)
+            return True
+        except Exception as e:
+            log.warning("No se pudo guardar la respuesta idempotente: %s", e)
+            return False
+
+
+async def _reproducir(send: Send, guardada: Dict[str, Any]) -> None:
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in guardada["h"]]
+    await send({
+        "type": "http.response.start",
+        "status": guardada["s"],
+        "headers": headers + [(b"idempotency-replayed", b"true")],
+    })
+    await send({"type": "http.response.body", "body": base64.b64decode(guardada["b"])})
+
+
+async def _responder(send: Send, status: int, detail: str, retry_after: bool = True) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if retry_after:
+        headers.append((b"retry-after", b"1"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,122 @@
+# app/middleware/rate_limit.py
+import json
+import logging
+import math
+import re
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.client_ip import Red, client_ip, header, trusted_networks
+from app.core.config import settings
+from app.core.rate_limit import GcraResult, LocalGCRA, gcra, parse_rate
+from app.core.security import decode_token_cached
+
+log = logging.getLogger(__name__)
+
+# ---------------------------
+# Rate limit global (RATE_LIMIT_GLOBAL) con GCRA
+# ---------------------------
+# Cliente = usuario del token (Bearer válido) o, si no hay, IP de origen.
+# Cada ruta usa el límite de la primera regex de RATE_LIMIT_OVERRIDES que
+# encaje (en su propio contador) o el global; "off" la deja sin límite.
+# Respuestas con RateLimit-Limit / -Remaining / -Reset; las rechazadas,
+# 429 con Retry-After. El script GCRA (Redis síncrono) va al threadpool; si
+# Redis falla se limita en memoria del proceso y no se vuelve a intentar hasta
+# pasados RATE_LIMIT_REDIS_RETRY_SECONDS (circuit breaker).
+# La IP sale de app.core.client_ip (XFF sólo desde TRUSTED_PROXIES).
+Limite = Tuple[str, int, int]  # (contador, límite, periodo_s)
+
+
+def _cliente(scope: Scope, proxies: Sequence[Red]) -> str:
+    scheme, _, token = (header(scope, b"authorization") or "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            sub = decode_token_cached(token.strip()).get("sub")
+            if sub is not None:
+                return f"u:{sub}"
+        except Exception:
+            pass
+    return f"ip:{client_ip(scope, proxies) or 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """ASGI puro: no envuelve la respuesta más que para añadir cabeceras."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        rate: str = settings.RATE_LIMIT_GLOBAL,
+        overrides: Optional[Dict[str, str]] = None,
+        trusted_proxies: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.app = app
+        self.global_ = parse_rate(rate)
+        self.overrides: List[Tuple[re.Pattern, Optional[Tuple[int, int]]]] = [
+            (re.compile(patron), parse_rate(r))
+            for patron, r in (settings.RATE_LIMIT_OVERRIDES if overrides is None else overrides).items()
+        ]
+        self.proxies = trusted_networks(trusted_proxies)
+        self.local = LocalGCRA(settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+        self._redis_off_until = 0.0  # monotonic; 0 = Redis en uso
+
+    def _limite(self, path: str) -> Optional[Limite]:
+        for i, (patron, r) in enumerate(self.overrides):
+            if patron.search(path):
+                return (f"r{i}", *r) if r else None
+        return ("g", *self.global_) if self.global_ else None
+
+    async def _consumir(self, key: str, limit: int, period: int) -> GcraResult:
+        if self._redis_off_until and time.monotonic() < self._redis_off_until:
+            return self.local(key, limit, period)
+        try:
+            res = await run_in_threadpool(gcra, key, limit, period)
+        except Exception as e:
+            if not self._redis_off_until:
+                log.warning("Rate limit global sin Redis, se limita en local: %s", e)
+            self._redis_off_until = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+            return self.local(key, limit, period)
+        if self._redis_off_until:
+            log.info("Rate limit global: Redis disponible de nuevo")
+            self._redis_off_until = 0.0
+        return res
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        limite = self._limite(scope["path"])
+        if limite is None:
+            return await self.app(scope, receive, send)
+
+        contador, limit, period = limite
+        admitida, restantes, retry_after, reset = await self._consumir(
+            f"{contador}:{_cliente(scope, self.proxies)}", limit, period
+        )
+        headers = [
+            (b"ratelimit-limit", str(limit).encode()),
+            (b"ratelimit-remaining", str(restantes).encode()),
+            (b"ratelimit-reset", str(math.ceil(reset)).encode()),
+        ]
+        if not admitida:
+            body = json.dumps({"detail": "Demasiadas solicitudes"}, ensure_ascii=False).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": headers + [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def con_cabeceras(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers") or []) + headers
+            await send(message)
+
+        await self.app(scope, receive, con_cabeceras)
@@ -0,0 +1,55 @@
+# app/middleware/read_your_writes.py
+from typing import Any, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.replicas import get_replica_router, mark_recent_write
+from app.core.security import decode_token_cached
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadYourWritesMiddleware:
+    """
+    Tras una escritura correcta (POST/PUT/PATCH/DELETE < 400) de un usuario
+    autenticado, marca sus próximas lecturas para el primario durante
+    REPLICA_STICKY_SECONDS. Sin réplicas configuradas no hace nada.
+    ASGI puro: la marca (Redis síncrono) se hace en el threadpool justo antes
+    de enviar la respuesta, sin envolver el cuerpo.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_marcando(message: Message) -> None:
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and get_replica_router() is not None
+            ):
+                user_id = _user_id(scope)
+                if user_id is not None:
+                    await run_in_threadpool(mark_recent_write, user_id)
+            await send(message)
+
+        await self.app(scope, receive, send_marcando)
+
+
+def _user_id(scope: Scope) -> Optional[Any]:
+    authorization = ""
+    for k, v in scope.get("headers") or ():
+        if k == b"authorization":
+            authorization = v.decode("latin-1")
+            break
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_token_cached(token.strip()).get("sub")
+    except Exception:
+        return None
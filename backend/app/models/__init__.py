@@ -18,6 +18,9 @@ from .incidencia_adjunto import IncidenciaAdjunto # Nuevo
 from .equipo_adjunto import EquipoAdjunto # Nuevo
 from .usuario_adjunto import UsuarioAdjunto  # Nuevo
 
+# Contadores para /estadisticas/resumen (con triggers en PostgreSQL)
+from .stats import EquipoStats, UbicacionStats
+
 __all__ = [
     "SQLModel",
     "metadata",
@@ -32,4 +35,6 @@ __all__ = [
     "IncidenciaAdjunto",
     "EquipoAdjunto",
     "UsuarioAdjunto",
+    "EquipoStats",
+    "UbicacionStats",
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 # backend/app/models/equipo.py
-from typing import Optional, TYPE_CHECKING
+from typing import Literal, Optional, TYPE_CHECKING
 from datetime import datetime, timezone
 from sqlmodel import SQLModel, Field, Relationship
 from sqlalchemy import (
@@ -12,6 +12,7 @@ from sqlalchemy import (
     Index,
     func,
     Text, # <--- AÑADIDO
+    text,
 )
 from pydantic import ConfigDict, field_validator
 
@@ -23,6 +24,37 @@ if TYPE_CHECKING:
     from .reparacion import Reparacion
 
 
+# Valores admitidos (API e importación masiva)
+EstadoEquipo = Literal["OPERATIVO", "MANTENIMIENTO", "BAJA", "CALIBRACION", "RESERVA"]
+TIPOS_VALIDOS = {
+    "Masas",
+    "Fuerza",
+    "Dimensional",
+    "3D",
+    "Par",
+    "Verificación Dimensional",
+    "Temperatura",
+    "Electricidad",
+    "Químico",
+    "Limpieza",
+    "Acelerómetros",
+    "Acústica",
+    "Caudal",
+    "Presión",
+    "Densidad y Volumen",
+    "Óptica y radiometría",
+    "Ultrasonidos",
+    "Calibrador",
+    "Multímetro",
+    "Generador",
+    "Osciloscopio",
+    "Fuente",
+    "Analizador",
+    "Otro",
+}
+TIPOS_CANONICOS = {t.lower(): t for t in TIPOS_VALIDOS}
+
+
 class Equipo(SQLModel, table=True):
     """
     Equipo de calibración / instrumento gestionado.
@@ -48,6 +80,22 @@ class Equipo(SQLModel, table=True):
         Index("ix_equipo_estado_tipo", "estado", "tipo"),
         Index("ix_equipo_seccion_id", "seccion_id"),
         Index("ix_equipo_ubicacion_id", "ubicacion_id"),
+        # Lookup NFC/identidad por lower(col) (fallos de caché, app/core/cache.py)
+        Index("ix_equipo_nfc_tag_lower", text("lower(nfc_tag)")),
+        Index("ix_equipo_identidad_lower", text("lower(identidad)")),
+        # Búsqueda q= (ILIKE '%...%') con pg_trgm
+        Index(
+            "ix_equipo_identidad_trgm", "identidad",
+            postgresql_using="gin", postgresql_ops={"identidad": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_equipo_numero_serie_trgm", "numero_serie",
+            postgresql_using="gin", postgresql_ops={"numero_serie": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_equipo_tipo_trgm", "tipo",
+            postgresql_using="gin", postgresql_ops={"tipo": "gin_trgm_ops"},
+        ),
     )
 
     # --- PK ---
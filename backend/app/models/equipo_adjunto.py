@@ -2,10 +2,14 @@
 from typing import Optional
 from datetime import datetime, timezone
 from sqlmodel import SQLModel, Field
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, func
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Index, func
 
 class EquipoAdjunto(SQLModel, table=True):
     __tablename__ = "equipo_adjunto"
+    __table_args__ = (
+        # Adjuntos de un equipo por fecha (listado y /equipos/{id}/timeline)
+        Index("ix_equipo_adjunto_equipo_subido", "equipo_id", "subido_en"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     
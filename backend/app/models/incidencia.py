@@ -40,6 +40,15 @@ class Incidencia(SQLModel, table=True):
         Index("ix_incidencia_equipo_fecha", "equipo_id", "fecha"),
         Index("ix_incidencia_estado_fecha", "estado", "fecha"),
         Index("ix_incidencia_equipo_estado_fecha", "equipo_id", "estado", "fecha"),
+        # Búsqueda q= (ILIKE '%...%') con pg_trgm
+        Index(
+            "ix_incidencia_titulo_trgm", "titulo",
+            postgresql_using="gin", postgresql_ops={"titulo": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_incidencia_descripcion_trgm", "descripcion",
+            postgresql_using="gin", postgresql_ops={"descripcion": "gin_trgm_ops"},
+        ),
     )
 
     # --- Clave primaria ---
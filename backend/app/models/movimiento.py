@@ -1,7 +1,8 @@
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime, timezone
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Integer, ForeignKey, Column, DateTime, Index, func
+from sqlalchemy import DDL, Integer, ForeignKey, Column, DateTime, Index, event, func
+from sqlalchemy.orm import declared_attr
 from pydantic import ConfigDict
 
 if TYPE_CHECKING:
@@ -16,6 +17,9 @@ class Movimiento(SQLModel, table=True):
     - Timestamps en UTC con server_default (resiliencia si falla el default en app).
     - Índices para consultas frecuentes.
     - Auditoría opcional (usuario_id).
+    - En PostgreSQL, particionada por mes sobre 'fecha' (ver PARTICIONES_DDL):
+      la PK de la tabla es (id, fecha), pero para el ORM la identidad es 'id'
+      (único por la secuencia), así que db.get(Movimiento, id) sigue valiendo.
     """
     model_config = ConfigDict(from_attributes=True)
 
@@ -24,9 +28,14 @@ class Movimiento(SQLModel, table=True):
         Index("ix_movimiento_fecha", "fecha"),
         Index("ix_movimiento_desde_ubicacion_id", "desde_ubicacion_id"),
         Index("ix_movimiento_hacia_ubicacion_id", "hacia_ubicacion_id"),
+        {"postgresql_partition_by": "RANGE (fecha)"},
     )
 
-    id: Optional[int] = Field(default=None, primary_key=True)
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"primary_key": [cls.__table__.c.id]}
+
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": True})
 
     equipo_id: int = Field(
         sa_column=Column(
@@ -37,10 +46,10 @@ class Movimiento(SQLModel, table=True):
         description="Equipo movido",
     )
 
-    # Fecha del movimiento (UTC)
+    # Fecha del movimiento (UTC). Clave de partición: forma parte de la PK
     fecha: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
-        sa_column=Column(DateTime(timezone=True), server_default=func.now()),
+        sa_column=Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now()),
         description="Fecha del movimiento (UTC)",
     )
 
@@ -147,3 +156,56 @@ class Movimiento(SQLModel, table=True):
             "es_reciente": self.es_reciente,
             "tiene_comentario": self.tiene_comentario,
         }
+
+
+# ---------------------------
+# Particionado mensual (PostgreSQL)
+# ---------------------------
+# movimiento_pYYYYMM cubre [día 1 del mes, día 1 del mes siguiente) en UTC.
+# movimiento_default recoge lo que no tenga partición (fechas muy antiguas o
+# futuras) para que un INSERT nunca falle; movimiento_asegurar_particiones()
+# mueve esas filas a su partición al crearla. La crea con antelación el hilo
+# de app/core/particiones.py, que también archiva las antiguas.
+PARTICIONES_DDL = [
+    "CREATE TABLE IF NOT EXISTS movimiento_default PARTITION OF movimiento DEFAULT",
+    """CREATE OR REPLACE FUNCTION movimiento_asegurar_particiones(desde date, meses integer)
+RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    mes date := date_trunc('month', desde)::date;
+    ini timestamptz;
+    fin timestamptz;
+    nombre text;
+    creadas integer := 0;
+BEGIN
+    -- Serializa workers/cron concurrentes
+    PERFORM pg_advisory_xact_lock(hashtext('movimiento_particiones'));
+    FOR i IN 1..meses LOOP
+        ini := mes::timestamp AT TIME ZONE 'UTC';
+        fin := (mes + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+        nombre := 'movimiento_p' || to_char(mes, 'YYYYMM');
+        IF to_regclass(nombre) IS NULL THEN
+            IF EXISTS (SELECT 1 FROM movimiento_default WHERE fecha >= ini AND fecha < fin) THEN
+                EXECUTE format('CREATE TABLE %I (LIKE movimiento INCLUDING DEFAULTS)', nombre);
+                EXECUTE format(
+                    'WITH m AS (DELETE FROM movimiento_default WHERE fecha >= %L AND fecha < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM m', ini, fin, nombre);
+                EXECUTE format('ALTER TABLE movimiento ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                               nombre, ini, fin);
+            ELSE
+                EXECUTE format('CREATE TABLE %I PARTITION OF movimiento FOR VALUES FROM (%L) TO (%L)',
+                               nombre, ini, fin);
+            END IF;
+            creadas := creadas + 1;
+        END IF;
+        mes := (mes + interval '1 month')::date;
+    END LOOP;
+    RETURN creadas;
+END $$""",
+    "SELECT movimiento_asegurar_particiones((now() AT TIME ZONE 'UTC')::date, 4)",
+]
+
+# create_all (dev/tests) deja la tabla igual que la migración 'partition_movimiento'
+for _stmt in PARTICIONES_DDL:
+    event.listen(
+        Movimiento.__table__, "after_create", DDL(_stmt.replace("%", "%%")).execute_if(dialect="postgresql")
+    )
@@ -0,0 +1,129 @@
+# app/models/stats.py
+from typing import List, Tuple
+
+from sqlalchemy import DDL, Column, BigInteger, String, event
+from sqlmodel import SQLModel, Field
+
+from .equipo import Equipo
+from .ubicacion import Ubicacion
+
+
+class EquipoStats(SQLModel, table=True):
+    """
+    Contadores de equipos mantenidos por triggers (ver STATS_SPECS).
+    dimension: 'total' | 'estado' | 'tipo' | 'sin_ubicacion'; clave '' si no aplica.
+    """
+    __tablename__ = "equipo_stats"
+
+    dimension: str = Field(sa_column=Column(String(20), primary_key=True))
+    clave: str = Field(sa_column=Column(String(100), primary_key=True))
+    total: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+
+
+class UbicacionStats(SQLModel, table=True):
+    """
+    Contadores de ubicaciones mantenidos por triggers.
+    dimension: 'total' | 'seccion' (clave = seccion_id, '' sin sección).
+    """
+    __tablename__ = "ubicacion_stats"
+
+    dimension: str = Field(sa_column=Column(String(20), primary_key=True))
+    clave: str = Field(sa_column=Column(String(100), primary_key=True))
+    total: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+
+
+# ---------------------------
+# Triggers de mantenimiento
+# ---------------------------
+# Cada fila de la tabla origen aporta +1 (alta) / -1 (baja) a varias
+# (dimension, clave). Triggers por sentencia con tablas de transición: los
+# deltas de toda la sentencia se agregan y sólo se tocan las claves cuyo neto
+# no es 0. Un movimiento entre dos ubicaciones no cambia ningún contador y, por
+# tanto, no bloquea ninguna fila de estadísticas.
+# La misma expresión sirve para recalcular desde cero (app/core/stats.py).
+#
+# (tabla_origen, tabla_stats, [(dimension, clave, delta)]) con {r} = alias de fila
+StatsSpec = Tuple[str, str, List[Tuple[str, str, str]]]
+
+STATS_SPECS: List[StatsSpec] = [
+    ("equipo", "equipo_stats", [
+        ("total", "''", "1"),
+        ("estado", "coalesce({r}.estado, '')", "1"),
+        ("tipo", "coalesce({r}.tipo, '')", "1"),
+        ("sin_ubicacion", "''", "CASE WHEN {r}.ubicacion_id IS NULL THEN 1 ELSE 0 END"),
+    ]),
+    ("ubicacion", "ubicacion_stats", [
+        ("total", "''", "1"),
+        ("seccion", "coalesce({r}.seccion_id::text, '')", "1"),
+    ]),
+]
+
+
+def _signed(expr: str, sign: str) -> str:
+    return expr if sign == "1" else f"({expr}) * {sign}"
+
+
+def deltas_sql(spec: StatsSpec, source: str, sign: str = "1") -> str:
+    """SELECT dimension, clave, delta por cada fila de 'source' (multiplicado por 'sign')."""
+    _, _, dims = spec
+    values = ", ".join(
+        f"('{d}', {clave.format(r='r')}, {_signed(delta.format(r='r'), sign)})" for d, clave, delta in dims
+    )
+    return (
+        f"SELECT v.dimension, v.clave, v.delta FROM {source} r "
+        f"CROSS JOIN LATERAL (VALUES {values}) AS v(dimension, clave, delta)"
+    )
+
+
+def apply_deltas_sql(spec: StatsSpec, deltas: str) -> str:
+    """Suma los deltas agregados a la tabla de stats (orden fijo: sin interbloqueos)."""
+    _, stats_table, _ = spec
+    return (
+        f"INSERT INTO {stats_table} (dimension, clave, total) "
+        f"SELECT dimension, clave, sum(delta) FROM ({deltas}) d "
+        f"GROUP BY dimension, clave HAVING sum(delta) <> 0 ORDER BY dimension, clave "
+        f"ON CONFLICT (dimension, clave) DO UPDATE SET total = {stats_table}.total + EXCLUDED.total"
+    )
+
+
+def trigger_ddl(spec: StatsSpec) -> List[str]:
+    """Función + 3 triggers (INSERT/UPDATE/DELETE) por sentencia para una tabla origen."""
+    table, stats_table, _ = spec
+    fn = f"{stats_table}_aplicar"
+    on_insert = apply_deltas_sql(spec, deltas_sql(spec, "new_rows"))
+    on_delete = apply_deltas_sql(spec, deltas_sql(spec, "old_rows", "-1"))
+    on_update = apply_deltas_sql(
+        spec, f"{deltas_sql(spec, 'new_rows')} UNION ALL {deltas_sql(spec, 'old_rows', '-1')}"
+    )
+    stmts = [
+        f"""CREATE OR REPLACE FUNCTION {fn}() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {on_insert};
+    ELSIF TG_OP = 'UPDATE' THEN
+        {on_update};
+    ELSE
+        {on_delete};
+    END IF;
+    RETURN NULL;
+END $$""",
+    ]
+    for op, refs in (
+        ("INSERT", "NEW TABLE AS new_rows"),
+        ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ("DELETE", "OLD TABLE AS old_rows"),
+    ):
+        name = f"trg_{stats_table}_{op.lower()}"
+        stmts.append(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        stmts.append(
+            f"CREATE TRIGGER {name} AFTER {op} ON {table} "
+            f"REFERENCING {refs} FOR EACH STATEMENT EXECUTE FUNCTION {fn}()"
+        )
+    return stmts
+
+
+# create_all (dev/tests) instala los mismos triggers que la migración
+# 'add_equipo_ubicacion_stats'. Sólo PostgreSQL.
+for _spec, _table in zip(STATS_SPECS, (Equipo.__table__, Ubicacion.__table__)):
+    for _stmt in trigger_ddl(_spec):
+        event.listen(_table, "after_create", DDL(_stmt.replace("%", "%%")).execute_if(dialect="postgresql"))
@@ -37,6 +37,11 @@ class Ubicacion(SQLModel, table=True):
         UniqueConstraint("seccion_id", "nombre", name="uq_ubicacion_seccion_nombre"),
         Index("ix_ubicacion_nombre", "nombre"),
         Index("ix_ubicacion_seccion", "seccion_id"),
+        # Búsqueda q= (ILIKE '%...%') con pg_trgm
+        Index(
+            "ix_ubicacion_nombre_trgm", "nombre",
+            postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"},
+        ),
         CheckConstraint(
             "tipo in ('ALMACEN','LABORATORIO','TECNICO','OTRO')",
             name="ck_ubicacion_tipo",
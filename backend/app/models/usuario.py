@@ -12,6 +12,8 @@ from sqlalchemy import (
     CheckConstraint,
     Index,
     func,
+    cast,
+    column,
     Text,
 )
 from sqlalchemy.dialects.postgresql import CITEXT  # requiere extensión citext
@@ -46,6 +48,24 @@ class Usuario(SQLModel, table=True):
         Index("ix_usuario_role_active", "role", "active"),
         Index("ix_usuario_created_at", "created_at"),
         Index("ix_usuario_last_login_at", "last_login_at"),
+        # Búsqueda q= (ILIKE '%...%') con pg_trgm; CITEXT no tiene opclass
+        # trigram, así que username/email se indexan como ::text
+        Index(
+            "ix_usuario_username_trgm", cast(column("username"), Text).label("username_text"),
+            postgresql_using="gin", postgresql_ops={"username_text": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_usuario_email_trgm", cast(column("email"), Text).label("email_text"),
+            postgresql_using="gin", postgresql_ops={"email_text": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_usuario_nombre_trgm", "nombre",
+            postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_usuario_apellidos_trgm", "apellidos",
+            postgresql_using="gin", postgresql_ops={"apellidos": "gin_trgm_ops"},
+        ),
     )
 
     # --- Identidad ---
@@ -0,0 +1,50 @@
+# backend/bench/bench_current_user.py
+"""
+Micro-benchmark: throughput de deps.current_user con y sin la caché de JWT
+decodificados (JWT_DECODE_CACHE_SIZE).
+
+La comprobación de revocación se sustituye por un no-op para medir sólo el
+coste de verificar el token (firma HMAC + JSON + iss/aud/exp).
+
+Uso (desde backend/):
+    python -m bench.bench_current_user [-n 20000]
+"""
+import argparse
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+import app.core.deps as deps
+import app.core.security as security
+from app.core.config import settings
+
+
+def _run(n: int, creds: HTTPAuthorizationCredentials) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        deps.current_user(creds)
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000, help="llamadas por variante")
+    args = parser.parse_args()
+
+    deps.is_revoked = lambda jti, strict=False: False
+    token, _ = security.issue_access_token(1, "ADMIN")
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    size = settings.JWT_DECODE_CACHE_SIZE
+    settings.JWT_DECODE_CACHE_SIZE = 0
+    sin_cache = _run(args.n, creds)
+    settings.JWT_DECODE_CACHE_SIZE = size or 4096
+    security.clear_decoded_token_cache()
+    con_cache = _run(args.n, creds)
+
+    print(f"sin caché  {sin_cache:10.0f} llamadas/s")
+    print(f"con caché  {con_cache:10.0f} llamadas/s  (x{con_cache / sin_cache:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# backend/bench/bench_import.py
+"""
+Benchmark de la importación masiva de equipos (app/core/equipo_import.py):
+genera un CSV de N filas (con un 1% de filas erróneas) y mide lectura +
+validación + COPY. Por defecto hace rollback al terminar.
+
+Uso (desde backend/, contra una BD de pruebas):
+    python -m bench.bench_import [-n 100000] [--commit]
+"""
+import argparse
+import csv
+import random
+import tempfile
+import time
+import uuid
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.core.equipo_import import importar_equipos, leer_filas
+from app.models.equipo import TIPOS_VALIDOS
+
+
+def _generar(n: int, fh) -> None:
+    tipos = sorted(TIPOS_VALIDOS)
+    estados = ["OPERATIVO", "MANTENIMIENTO", "BAJA", "CALIBRACION", "RESERVA"]
+    lote = uuid.uuid4().hex[:6]
+    w = csv.writer(fh)
+    w.writerow(["identidad", "numero_serie", "tipo", "estado", "notas", "nfc_tag"])
+    for i in range(n):
+        tipo = "Inventado" if i % 100 == 99 else random.choice(tipos)
+        w.writerow([f"B{lote}-{i:07d}", f"SN-{i}", tipo, random.choice(estados), "", f"nfc-{lote}-{i:07d}"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100_000)
+    parser.add_argument("--commit", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile("w+b") as tmp:
+        with open(tmp.fileno(), "w", encoding="utf-8", newline="", closefd=False) as txt:
+            _generar(args.n, txt)
+        tmp.seek(0)
+
+        t0 = time.perf_counter()
+        with Session(engine) as s:
+            rep = importar_equipos(s, leer_filas(tmp, "csv"))
+            s.commit() if args.commit else s.rollback()
+        dt = time.perf_counter() - t0
+
+    print(f"{rep.procesadas} filas, {rep.creadas} creadas, {rep.errores_total} errores en {dt:.2f}s "
+          f"({rep.procesadas / dt:,.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
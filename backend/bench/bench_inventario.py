@@ -0,0 +1,86 @@
+# backend/bench/bench_inventario.py
+"""
+Benchmark del inventario a fecha (app/core/inventario.py).
+
+--seed crea (en una BD vacía de pruebas, con create_all) E equipos, U
+ubicaciones y M movimientos repartidos en los últimos 24 meses.
+Después mide GET /equipos/inventario: una página de 200 equipos y "qué
+había en la ubicación X" (todos los equipos evaluados) a varias fechas.
+
+Uso (desde backend/):
+    python -m bench.bench_inventario --seed [-e 5000] [-m 2000000]
+    python -m bench.bench_inventario
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel
+
+import app.models  # noqa: F401  (registra los modelos)
+from app.core.db import engine
+from app.core.inventario import inventario_stmt
+from app.core.pagination import keyset_condition
+from app.models.equipo import Equipo
+
+
+def _seed(equipos: int, ubicaciones: int, movimientos: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as s:
+        s.exec(text("SELECT movimiento_asegurar_particiones((now() - interval '24 months')::date, 26)"))
+        s.exec(text(
+            "INSERT INTO ubicacion (nombre, tipo) "
+            "SELECT 'U' || g, 'ALMACEN' FROM generate_series(1, :n) g"
+        ), params={"n": ubicaciones})
+        s.exec(text(
+            "INSERT INTO equipo (identidad, tipo, estado, ubicacion_id, creado_en) "
+            "SELECT 'b' || g, 'Otro', 'OPERATIVO', (SELECT min(id) FROM ubicacion), now() - interval '25 months' "
+            "FROM generate_series(1, :n) g"
+        ), params={"n": equipos})
+        # Movimientos con fecha creciente por equipo; hacia aleatoria
+        s.exec(text(
+            "INSERT INTO movimiento (equipo_id, fecha, hacia_ubicacion_id) "
+            "SELECT e.id, now() - interval '24 months' + (g * interval '24 months' / :k) + e.id * interval '1 second', "
+            "       u.min + (random() * (:u - 1))::int "
+            "FROM equipo e CROSS JOIN generate_series(1, :k - 1) g, "
+            "     (SELECT min(id) AS min FROM ubicacion) u"
+        ), params={"k": max(2, movimientos // equipos), "u": ubicaciones})
+        s.exec(text("ANALYZE"))
+        s.commit()
+
+
+def _medir(s: Session, etiqueta: str, stmt) -> None:
+    t0 = time.perf_counter()
+    n = len(s.exec(stmt).all())
+    print(f"{etiqueta:<45} {n:>6} filas  {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("-e", type=int, default=5000)
+    parser.add_argument("-u", type=int, default=50)
+    parser.add_argument("-m", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    if args.seed:
+        t0 = time.perf_counter()
+        _seed(args.e, args.u, args.m)
+        print(f"seed: {time.perf_counter() - t0:.1f}s")
+
+    with Session(engine) as s:
+        total = s.exec(text("SELECT count(*) FROM movimiento")).scalar_one()
+        ubi = s.exec(text("SELECT min(id) + 3 FROM ubicacion")).scalar_one()
+        last = s.exec(text("SELECT max(id) - 200 FROM equipo")).scalar_one()
+        print(f"{total:,} movimientos")
+        ahora = datetime.now(timezone.utc)
+        for dias in (1, 180, 500):
+            t = ahora - timedelta(days=dias)
+            pagina = inventario_stmt(t).order_by(Equipo.id).where(keyset_condition([(Equipo.id, "asc", False)], [last]))
+            _medir(s, f"página de 200 equipos, hace {dias} días", pagina.limit(200))
+            _medir(s, f"equipos en la ubicación {ubi}, hace {dias} días", inventario_stmt(t, ubicacion_id=ubi))
+
+
+if __name__ == "__main__":
+    main()
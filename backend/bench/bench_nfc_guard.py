@@ -0,0 +1,68 @@
+# backend/bench/bench_nfc_guard.py
+"""
+Micro-benchmark: latencia por escaneo NFC de las comprobaciones en Redis.
+
+  legacy -> assert_idempotent + assert_debounce + check_rate_limit_nfc (hasta 6 round trips)
+  guard  -> assert_nfc_guard (1 EVALSHA)
+
+Uso (desde backend/, contra un Redis real para que cuenten los round trips):
+    REDIS_URL=redis://localhost:6379/15 python -m bench.bench_nfc_guard [-n 2000]
+¡Hace FLUSHDB de esa base al terminar!
+"""
+import argparse
+import statistics
+import time
+
+import redis
+from starlette.requests import Request
+
+import app.core.redis_client as redis_client
+import app.core.security as security
+from app.core.config import settings
+
+
+def _request(i: int) -> Request:
+    headers = [(b"x-idempotency-key", f"bench-{i}".encode())]
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers})
+
+
+def _legacy(i: int) -> None:
+    tag = f"tag-{i}"
+    security.assert_idempotent(_request(i), ttl_sec=30)
+    security.assert_debounce(f"nfc:1:{tag}:retirar", ttl_sec=3)
+    security.check_rate_limit_nfc("1", tag, limit=5, window_sec=10)
+
+
+def _guard(i: int) -> None:
+    security.assert_nfc_guard(_request(i), 1, f"tag-{i}", "retirar")
+
+
+def _run(fn, n: int, offset: int) -> list[float]:
+    samples = []
+    for i in range(offset, offset + n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000, help="escaneos por variante")
+    args = parser.parse_args()
+
+    r = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    redis_client._client = r
+    try:
+        _run(_guard, 100, 10**7)  # calentamiento (carga del script)
+        for name, fn, offset in (("legacy", _legacy, 0), ("guard", _guard, 10**6)):
+            s = sorted(_run(fn, args.n, offset))
+            p50 = statistics.median(s)
+            p99 = s[int(len(s) * 0.99) - 1]
+            print(f"{name:7s} n={args.n}  p50={p50:8.1f} us  p99={p99:8.1f} us")
+    finally:
+        r.flushdb()
+
+
+if __name__ == "__main__":
+    main()
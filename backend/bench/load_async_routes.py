@@ -0,0 +1,90 @@
+# backend/bench/load_async_routes.py
+"""
+Prueba de carga: N clientes concurrentes contra una instancia en marcha.
+
+Mide throughput y latencias (p50/p95/p99) de las rutas de lectura calientes
+(obtener/listar/buscar por NFC). Sirve para comparar la versión síncrona
+(threadpool + Session) con la async (AsyncSession) arrancando cada una con
+el mismo uvicorn y la misma base de datos.
+
+Uso (desde backend/, con la API en marcha y el seed de desarrollo cargado):
+    uvicorn app.main:app --port 8000 --workers 1 &
+    python -m bench.load_async_routes --url http://localhost:8000 -c 200 -d 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+PATHS = [
+    "/api/v1/equipos?limit=20&include_total=false",
+    "/api/v1/equipos/{equipo_id}",
+    "/api/v1/equipos/buscar/nfc/{nfc_tag}",
+    "/api/v1/ubicaciones?limit=20",
+    "/api/v1/movimientos/equipo/{equipo_id}?limit=20&include_total=false",
+]
+
+
+async def _login(client: httpx.AsyncClient, username: str, password: str) -> Dict[str, str]:
+    r = await client.post("/api/auth/login", json={"username_or_email": username, "password": password})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _worker(client, headers, paths, deadline, lat: List[float], errors: Dict[int, int], i: int) -> None:
+    n = i
+    while time.perf_counter() < deadline:
+        path = paths[n % len(paths)]
+        n += 1
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(path, headers=headers)
+            code = r.status_code
+        except httpx.HTTPError:
+            code = 0
+        lat.append(time.perf_counter() - t0)
+        if code != 200:
+            errors[code] = errors.get(code, 0) + 1
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("-c", "--concurrency", type=int, default=200)
+    parser.add_argument("-d", "--duration", type=float, default=20.0, help="segundos")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        headers = await _login(client, args.user, args.password)
+        eq = (await client.get("/api/v1/equipos?limit=1&include_total=false", headers=headers)).json()[0]
+        paths = [
+            p.format(equipo_id=eq["id"], nfc_tag=eq.get("nfc_tag") or "sin-tag")
+            for p in PATHS
+            if eq.get("nfc_tag") or "{nfc_tag}" not in p
+        ]
+
+        lat: List[float] = []
+        errors: Dict[int, int] = {}
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*[
+            _worker(client, headers, paths, deadline, lat, errors, i) for i in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    lat.sort()
+    q = statistics.quantiles(lat, n=100)
+    print(f"clientes={args.concurrency} duración={elapsed:.1f}s peticiones={len(lat)}")
+    print(f"throughput {len(lat) / elapsed:8.1f} req/s")
+    print(f"latencia   p50={q[49] * 1000:.1f}ms p95={q[94] * 1000:.1f}ms p99={q[98] * 1000:.1f}ms max={lat[-1] * 1000:.1f}ms")
+    print(f"errores    {errors or 0}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
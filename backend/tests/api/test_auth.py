@@ -94,6 +94,26 @@ def test_rate_limit_brute_force(client, session, redis_client):
     # Adapta esta cadena a tu mensaje real de error
     assert "demasiados intentos" in data["detail"].lower() or "too many" in data["detail"].lower()
 
+def test_login_ignora_x_forwarded_for_sin_proxy_de_confianza(client, session, redis_client, monkeypatch):
+    """Un XFF inventado no da un contador de IP nuevo; desde un proxy propio sí cuenta."""
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+
+    user = create_user(session)
+    malo = {"username_or_email": user.username, "password": "BAD_PASSWORD"}
+
+    for i in range(3):
+        client.post("/api/auth/login", json=malo, headers={"X-Forwarded-For": f"10.66.0.{i}"})
+    assert redis_client.get("rl:login:ip:testclient:fails") == "3"
+    assert not redis_client.keys("rl:login:ip:10.66.*")
+
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", "172.16.0.0/12")
+    via_proxy = TestClient(app, client=("172.16.0.5", 50000))
+    via_proxy.post("/api/auth/login", json=malo, headers={"X-Forwarded-For": "10.66.1.1"})
+    assert redis_client.get("rl:login:ip:10.66.1.1:fails") == "1"
+
+
 # -------------------------------------------------------------------------
 # 4. RBAC (Control de Roles)
 # -------------------------------------------------------------------------
@@ -129,3 +149,72 @@ def test_rbac_admin_can_access_protected(client, session):
     
     assert response.status_code == 200
     assert response.json()["username"] == target.username
+
+
+# -------------------------------------------------------------------------
+# 5. LOGOUT / ROTACIÓN (revocación con caché local)
+# -------------------------------------------------------------------------
+
+def test_logout_revoca_access_token(client, session):
+    """Tras logout el mismo access token se rechaza (la caché local ya lo conoce)."""
+    user = create_user(session, role="OPERARIO")
+    headers = get_auth_headers(client, user.username)
+    assert client.get("/api/v1/equipos", headers=headers).status_code == 200
+
+    r = client.post("/api/auth/logout", headers=headers)
+    assert r.status_code == 200
+
+    r = client.get("/api/v1/equipos", headers=headers)
+    assert r.status_code == 401
+
+
+def test_refresh_rotacion_no_reutilizable(client, session):
+    user = create_user(session, role="OPERARIO")
+    login = client.post("/api/auth/login", json={
+        "username_or_email": user.username,
+        "password": TEST_PASSWORD,
+    }).json()
+
+    refresh_headers = {"Authorization": f"Bearer {login['refresh_token']}"}
+
+    r1 = client.post("/api/auth/refresh", headers=refresh_headers)
+    assert r1.status_code == 200, r1.text
+    r2 = client.post("/api/auth/refresh", headers=refresh_headers)
+    assert r2.status_code == 401
+
+
+def test_logout_all_revoca_todas_las_sesiones(client, session):
+    user = create_user(session, role="OPERARIO")
+    movil, web = (client.post("/api/auth/login", json={
+        "username_or_email": user.username,
+        "password": TEST_PASSWORD,
+    }).json() for _ in range(2))
+    movil_h = {"Authorization": f"Bearer {movil['access_token']}"}
+    web_h = {"Authorization": f"Bearer {web['access_token']}"}
+    assert client.get("/api/v1/equipos", headers=web_h).status_code == 200
+
+    r = client.post("/api/auth/logout-all", headers=movil_h)
+    assert r.status_code == 200, r.text
+
+    for h in (movil_h, web_h):
+        assert client.get("/api/v1/equipos", headers=h).status_code == 401
+    r = client.post("/api/auth/refresh", headers={"Authorization": f"Bearer {web['refresh_token']}"})
+    assert r.status_code == 401
+    # Un login posterior lleva la época nueva
+    nuevo = get_auth_headers(client, user.username)
+    assert client.get("/api/v1/equipos", headers=nuevo).status_code == 200
+
+
+def test_reset_password_y_desactivar_revocan_tokens(client, session):
+    admin_h = get_auth_headers(client, create_user(session, role="ADMIN").username)
+    user = create_user(session, role="OPERARIO")
+
+    headers = get_auth_headers(client, user.username)
+    r = client.post(f"/api/v1/usuarios/{user.id}/password", json={"password": "Otra-Clave-123"}, headers=admin_h)
+    assert r.status_code == 204
+    assert client.get("/api/v1/equipos", headers=headers).status_code == 401
+
+    headers = get_auth_headers(client, user.username, password="Otra-Clave-123")
+    assert client.get("/api/v1/equipos", headers=headers).status_code == 200
+    assert client.patch(f"/api/v1/usuarios/{user.id}", json={"active": False}, headers=admin_h).status_code == 200
+    assert client.get("/api/v1/equipos", headers=headers).status_code == 401
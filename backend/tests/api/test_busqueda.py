@@ -0,0 +1,78 @@
+# backend/tests/api/test_busqueda.py
+from app.models.equipo import Equipo
+from tests.utils import create_user, get_auth_headers, random_string
+
+# -------------------------------------------------------------------------
+# BÚSQUEDA q= (pg_trgm) Y ORDEN POR RELEVANCIA
+# -------------------------------------------------------------------------
+
+
+def _crear_equipo(session, identidad: str) -> Equipo:
+    eq = Equipo(identidad=identidad, numero_serie=f"SN-{random_string(6)}", tipo="GENÉRICO", estado="OPERATIVO")
+    session.add(eq)
+    session.commit()
+    session.refresh(eq)
+    return eq
+
+
+def test_busqueda_tolera_erratas(client, session):
+    """Un término con una errata encuentra el equipo por similitud trigram."""
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    eq = _crear_equipo(session, f"termometro-{random_string(4).lower()}")
+
+    r = client.get("/api/v1/equipos", headers=headers, params={"q": "termomtro", "limit": 200})
+    assert r.status_code == 200, r.text
+    assert eq.id in [e["id"] for e in r.json()]
+
+
+def test_busqueda_parcial_sigue_funcionando(client, session):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    sufijo = random_string(6).lower()
+    eq = _crear_equipo(session, f"eq-{sufijo}")
+
+    r = client.get("/api/v1/equipos", headers=headers, params={"q": sufijo})
+    assert r.status_code == 200
+    assert [e["id"] for e in r.json()] == [eq.id]
+
+
+def test_ordenar_relevancia(client, session):
+    """La coincidencia más parecida al término aparece primero; sin cursor."""
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    exacto = _crear_equipo(session, "calibrador-xz")
+    _crear_equipo(session, "calibrador-xz-auxiliar-de-repuesto")
+
+    r = client.get(
+        "/api/v1/equipos",
+        headers=headers,
+        params={"q": "calibrador-xz", "ordenar": "relevancia", "limit": 1},
+    )
+    assert r.status_code == 200, r.text
+    assert r.json()[0]["id"] == exacto.id
+    assert "X-Next-Cursor" not in r.headers
+
+
+def test_ordenar_relevancia_sin_q_422(client, session):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+
+    for url in ("/api/v1/equipos", "/api/v1/usuarios"):
+        r = client.get(url, headers=headers, params={"ordenar": "relevancia"})
+        assert r.status_code == 422, url
+
+
+def test_busqueda_usuarios_citext(client, session):
+    """La búsqueda en username/email (CITEXT) no distingue mayúsculas."""
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    user = create_user(session, role="OPERARIO")
+
+    r = client.get(
+        "/api/v1/usuarios",
+        headers=headers,
+        params={"q": user.username.upper(), "ordenar": "relevancia"},
+    )
+    assert r.status_code == 200, r.text
+    assert r.json()[0]["id"] == user.id
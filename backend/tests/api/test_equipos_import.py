@@ -0,0 +1,101 @@
+# backend/tests/api/test_equipos_import.py
+import io
+
+import pytest
+from sqlmodel import select
+
+from app.models.equipo import Equipo
+from app.models.ubicacion import Ubicacion
+from tests.utils import create_random_equipo, create_user, get_auth_headers
+
+URL = "/api/v1/equipos/import"
+
+
+def _headers(client, session, role="ADMIN"):
+    user = create_user(session, role=role)
+    return get_auth_headers(client, user.username)
+
+
+def _subir(client, headers, contenido: bytes, nombre="equipos.csv", **params):
+    return client.post(URL, headers=headers, params=params, files={"file": (nombre, contenido)})
+
+
+def test_import_csv_informe_por_fila(client, session):
+    headers = _headers(client, session)
+    existente = create_random_equipo(session)
+    existente.nfc_tag = "nfc-existente"
+    session.add(existente)
+    session.commit()
+    ubic = session.exec(select(Ubicacion).limit(1)).first()
+
+    csv_data = (
+        "identidad;tipo;estado;ubicacion_id;nfc_tag;columna_ignorada\n"
+        f"IMP-1;calibrador;operativo;{ubic.id};NFC-IMP-1;x\n"   # 2 ok (tipo/estado normalizados)
+        "IMP-2;Inventado;OPERATIVO;;;\n"                         # 3 tipo
+        "IMP-3;Fuerza;ROTO;;;\n"                                 # 4 estado
+        "imp-1;Fuerza;;;;\n"                                     # 5 identidad repetida en el fichero
+        "IMP-5;Fuerza;;;NFC-EXISTENTE;\n"                        # 6 nfc_tag ya existe en BD
+        "IMP-6;Fuerza;;999999;;\n"                               # 7 ubicación inexistente
+        ";;;;;\n"                                                # vacía: se ignora
+        f"{existente.identidad.upper()};Par;;;;\n"               # 9 identidad ya existe en BD
+        "IMP-8;Par;RESERVA;;;\n"                                 # 10 ok
+    ).encode()
+
+    r = _subir(client, headers, csv_data)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["procesadas"] == 8
+    assert body["creadas"] == 2
+    assert body["errores_total"] == 6
+    assert {(e["fila"], e["campo"]) for e in body["errores"]} == {
+        (3, "tipo"), (4, "estado"), (5, "identidad"), (6, "nfc_tag"), (7, "ubicacion_id"), (9, "identidad"),
+    }
+
+    creados = session.exec(select(Equipo).where(Equipo.identidad.in_(["IMP-1", "IMP-8"]))).all()
+    por_identidad = {e.identidad: e for e in creados}
+    assert por_identidad["IMP-1"].tipo == "Calibrador"
+    assert por_identidad["IMP-1"].estado == "OPERATIVO"
+    assert por_identidad["IMP-1"].nfc_tag == "nfc-imp-1"
+    assert por_identidad["IMP-1"].ubicacion_id == ubic.id
+    assert por_identidad["IMP-8"].estado == "RESERVA"
+
+
+def test_import_dry_run_y_todo_o_nada_no_crean(client, session):
+    headers = _headers(client, session)
+    csv_data = b"identidad,tipo\nDRY-1,Fuerza\nDRY-2,Nada\n"
+
+    r = _subir(client, headers, csv_data, dry_run="true")
+    assert r.json()["dry_run"] is True
+    assert r.json()["creadas"] == 1
+
+    r = _subir(client, headers, csv_data, todo_o_nada="true")
+    assert r.json()["creadas"] == 0 and r.json()["errores_total"] == 1
+
+    assert not session.exec(select(Equipo).where(Equipo.identidad == "DRY-1")).first()
+
+
+def test_import_xlsx(client, session):
+    openpyxl = pytest.importorskip("openpyxl")
+    headers = _headers(client, session)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Identidad", "Tipo", "Numero_serie"])
+    ws.append(["XLS-1", "Multímetro", 12345])
+    ws.append(["XLS-2", "Otro", None])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    r = _subir(client, headers, buf.getvalue(), nombre="equipos.xlsx")
+    assert r.status_code == 200, r.text
+    assert r.json()["creadas"] == 2
+    eq = session.exec(select(Equipo).where(Equipo.identidad == "XLS-1")).one()
+    assert eq.numero_serie == "12345"
+
+
+def test_import_rechaza_fichero_y_roles(client, session):
+    headers = _headers(client, session)
+    r = _subir(client, headers, b"identidad,estado\nA,OPERATIVO\n")
+    assert r.status_code == 422
+    assert "tipo" in r.json()["detail"][0]["msg"]
+
+    assert _subir(client, _headers(client, session, role="OPERARIO"), b"tipo\nFuerza\n").status_code == 403
@@ -0,0 +1,63 @@
+# backend/tests/api/test_equipos_lookup.py
+from tests.utils import create_user, get_auth_headers, create_random_equipo, random_string
+
+# -------------------------------------------------------------------------
+# CACHÉ DE LOOKUP POR NFC / IDENTIDAD (read-through + invalidación)
+# -------------------------------------------------------------------------
+
+
+def test_nfc_cache_negativa_se_invalida_al_asignar(client, session, redis_client):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    eq = create_random_equipo(session)
+    tag = f"tag-{random_string(6).lower()}"
+
+    # Miss -> queda cacheado como inexistente
+    r = client.get(f"/api/v1/equipos/buscar/nfc/{tag}", headers=headers)
+    assert r.status_code == 404
+    assert redis_client.get(f"equipo:lookup:nfc_tag:{tag}") == "-"
+
+    r = client.post(f"/api/v1/equipos/{eq.id}/nfc/assign", json={"nfc_tag": tag.upper()}, headers=headers)
+    assert r.status_code == 200, r.text
+
+    r = client.get(f"/api/v1/equipos/buscar/nfc/{tag.upper()}", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["id"] == eq.id
+    assert redis_client.get(f"equipo:lookup:nfc_tag:{tag}") == str(eq.id)
+
+    # Desasignar invalida la entrada positiva
+    r = client.delete(f"/api/v1/equipos/{eq.id}/nfc", headers=headers)
+    assert r.status_code == 204
+    r = client.get(f"/api/v1/equipos/buscar/nfc/{tag}", headers=headers)
+    assert r.status_code == 404
+
+
+def test_identidad_cache_tras_actualizar(client, session):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    eq = create_random_equipo(session)
+    anterior = eq.identidad
+
+    r = client.get(f"/api/v1/equipos/buscar/identidad/{anterior}", headers=headers)
+    assert r.status_code == 200
+
+    nueva = f"EQ-{random_string(6)}"
+    r = client.patch(f"/api/v1/equipos/{eq.id}", json={"identidad": nueva}, headers=headers)
+    assert r.status_code == 200, r.text
+
+    assert client.get(f"/api/v1/equipos/buscar/identidad/{anterior}", headers=headers).status_code == 404
+    r = client.get(f"/api/v1/equipos/buscar/identidad/{nueva}", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["id"] == eq.id
+
+
+def test_cache_obsoleta_se_descarta(client, session, redis_client):
+    """Una entrada que apunta a un equipo con otro tag no se devuelve."""
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    eq = create_random_equipo(session)
+    tag = f"tag-{random_string(6).lower()}"
+    redis_client.set(f"equipo:lookup:nfc_tag:{tag}", eq.id)
+
+    r = client.get(f"/api/v1/equipos/buscar/nfc/{tag}", headers=headers)
+    assert r.status_code == 404
@@ -0,0 +1,96 @@
+# backend/tests/api/test_estadisticas.py
+from sqlalchemy import text
+from sqlmodel import select
+
+from app.core.stats import (
+    _resumen_equipos_agregado,
+    _resumen_ubicaciones_agregado,
+    reconciliar_stats,
+    resumen_equipos,
+    resumen_ubicaciones,
+)
+from app.models.equipo import Equipo
+from app.models.ubicacion import Ubicacion
+from tests.utils import create_user, get_auth_headers
+
+
+def _ubicaciones(session, n=2):
+    return session.exec(select(Ubicacion).order_by(Ubicacion.id).limit(n)).all()
+
+
+def _assert_cuadra(session):
+    assert resumen_equipos(session) == _resumen_equipos_agregado(session)
+    assert resumen_ubicaciones(session)["total_ubicaciones"] == _resumen_ubicaciones_agregado(session)["total_ubicaciones"]
+    assert resumen_ubicaciones(session)["por_seccion"] == _resumen_ubicaciones_agregado(session)["por_seccion"]
+
+
+def test_triggers_mantienen_contadores(session):
+    u1, _ = _ubicaciones(session)
+    eqs = [
+        Equipo(identidad=f"stats-{i}", tipo="Termómetro", estado="OPERATIVO", ubicacion_id=u1.id if i % 2 else None)
+        for i in range(5)
+    ]
+    session.add_all(eqs)
+    session.commit()
+    _assert_cuadra(session)
+
+    eqs[0].estado = "BAJA"
+    eqs[1].tipo = "Balanza"
+    eqs[2].ubicacion_id = u1.id
+    session.commit()
+    _assert_cuadra(session)
+
+    session.delete(eqs[3])
+    session.commit()
+    _assert_cuadra(session)
+
+    # Varias filas en una sola sentencia (trigger por sentencia)
+    session.exec(text("UPDATE equipo SET estado = 'CALIBRACION' WHERE identidad LIKE 'stats-%'"))
+    session.exec(text("DELETE FROM equipo WHERE identidad LIKE 'stats-%' AND ubicacion_id IS NULL"))
+    session.commit()
+    _assert_cuadra(session)
+
+
+def test_mover_equipo_no_toca_contadores(session):
+    u1, u2 = _ubicaciones(session)
+    eq = Equipo(identidad="stats-mov", tipo="Pinza", estado="OPERATIVO", ubicacion_id=u1.id)
+    session.add(eq)
+    session.commit()
+
+    xmins = session.exec(text("SELECT dimension, clave, xmin::text FROM equipo_stats ORDER BY 1, 2")).all()
+    eq.ubicacion_id = u2.id
+    session.commit()
+    assert session.exec(text("SELECT dimension, clave, xmin::text FROM equipo_stats ORDER BY 1, 2")).all() == xmins
+
+
+def test_reconciliacion_corrige_deriva(session):
+    assert reconciliar_stats(session) == 0
+    session.exec(text("UPDATE equipo_stats SET total = total + 5 WHERE dimension = 'total'"))
+    session.exec(text("DELETE FROM equipo_stats WHERE dimension = 'estado'"))
+    session.exec(text("UPDATE ubicacion_stats SET total = 0"))
+
+    assert reconciliar_stats(session) > 0
+    _assert_cuadra(session)
+    assert reconciliar_stats(session) == 0
+
+
+def test_endpoint_resumen(client, session):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    antes = client.get("/api/v1/equipos/estadisticas/resumen", headers=headers).json()
+
+    r = client.post(
+        "/api/v1/equipos",
+        json={"identidad": "stats-api", "numero_serie": "SN-STATS", "tipo": "Osciloscopio", "estado": "OPERATIVO"},
+        headers=headers,
+    )
+    assert r.status_code == 201
+
+    despues = client.get("/api/v1/equipos/estadisticas/resumen", headers=headers).json()
+    assert despues["total_equipos"] == antes["total_equipos"] + 1
+    assert despues["por_estado"]["OPERATIVO"] == antes["por_estado"].get("OPERATIVO", 0) + 1
+    assert despues == _resumen_equipos_agregado(session)
+
+    r = client.get("/api/v1/ubicaciones/estadisticas/resumen", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["total_ubicaciones"] == _resumen_ubicaciones_agregado(session)["total_ubicaciones"]
@@ -0,0 +1,88 @@
+# backend/tests/api/test_expand.py
+from app.models.movimiento import Movimiento
+from app.models.seccion import Seccion
+from app.models.ubicacion import Ubicacion
+from tests.utils import create_random_equipo, create_user, get_auth_headers, random_string
+
+
+def _equipos_ubicados(session, n):
+    sec = Seccion(nombre=f"Sec-{random_string(6)}")
+    session.add(sec)
+    session.commit()
+    ids = []
+    for i in range(n):
+        ubi = Ubicacion(nombre=f"Ubi-{random_string(6)}", tipo="ALMACEN", seccion_id=sec.id)
+        session.add(ubi)
+        session.commit()
+        eq = create_random_equipo(session, estado="RESERVA")
+        eq.ubicacion_id, eq.seccion_id = ubi.id, sec.id
+        session.add(eq)
+        session.commit()
+        ids.append(eq.id)
+    session.expunge_all()
+    return sec, ids
+
+
+def test_listado_equipos_expand_consultas_constantes(client, session, assert_queries_constant):
+    headers = get_auth_headers(client, create_user(session, role="ADMIN").username)
+    sec, ids = _equipos_ubicados(session, 5)
+    params = {"estado": "RESERVA", "seccion_id": sec.id, "expand": "ubicacion,seccion", "include_total": "false"}
+
+    r = client.get("/api/v1/equipos", params=params, headers=headers)
+    assert r.status_code == 200
+    data = r.json()
+    assert sorted(e["id"] for e in data) == sorted(ids)
+    for e in data:
+        assert e["ubicacion"]["id"] == e["ubicacion_id"]
+        assert e["seccion"]["nombre"] == sec.nombre
+
+    # Misma cantidad de consultas para 1 o 5 filas (sin N+1)
+    assert_queries_constant(lambda limit: client.get("/api/v1/equipos", params={**params, "limit": limit}, headers=headers))
+
+    # Sin expand: sin objetos anidados
+    r = client.get("/api/v1/equipos", params={"seccion_id": sec.id}, headers=headers)
+    assert all("ubicacion" not in e and "seccion" not in e for e in r.json())
+
+
+def test_detalle_y_lookup_equipo_expand(client, session):
+    headers = get_auth_headers(client, create_user(session, role="ADMIN").username)
+    _, (eq_id,) = _equipos_ubicados(session, 1)
+
+    r = client.get(f"/api/v1/equipos/{eq_id}", params={"expand": "ubicacion"}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["ubicacion"]["id"] == r.json()["ubicacion_id"]
+    assert "seccion" not in r.json()
+
+    identidad = r.json()["identidad"]
+    r = client.get(f"/api/v1/equipos/buscar/identidad/{identidad}", params={"expand": "seccion"}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["seccion"]["id"] == r.json()["seccion_id"]
+
+
+def test_movimientos_expand_usuario_sin_datos_sensibles(client, session):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    _, (eq_id,) = _equipos_ubicados(session, 1)
+    session.add(Movimiento(equipo_id=eq_id, usuario_id=admin.id, comentario="expand"))
+    session.commit()
+
+    r = client.get(
+        "/api/v1/movimientos",
+        params={"equipo_id": eq_id, "expand": "equipo,usuario,hacia_ubicacion"},
+        headers=headers,
+    )
+    assert r.status_code == 200
+    (mov,) = r.json()
+    assert mov["equipo"]["id"] == eq_id
+    assert mov["usuario"] == {"id": admin.id, "username": admin.username, "role": "ADMIN"} | {
+        k: v for k, v in (("nombre", admin.nombre), ("apellidos", admin.apellidos)) if v is not None
+    }
+    assert "hacia_ubicacion" not in mov  # sin destino: se omite
+
+
+def test_expand_invalido_422(client, session):
+    headers = get_auth_headers(client, create_user(session, role="ADMIN").username)
+    r = client.get("/api/v1/equipos", params={"expand": "ubicacion,password_hash"}, headers=headers)
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"] == ["query", "expand"]
+    assert client.get("/api/v1/movimientos", params={"expand": "seccion"}, headers=headers).status_code == 422
@@ -0,0 +1,106 @@
+# backend/tests/api/test_export.py
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.incidencia import Incidencia
+from app.models.movimiento import Movimiento
+from app.models.reparacion import Reparacion
+from tests.utils import create_random_equipo, create_user, get_auth_headers
+
+
+def _admin_headers(client, session):
+    admin = create_user(session, role="ADMIN")
+    return get_auth_headers(client, admin.username)
+
+
+def test_export_equipos_csv_mismos_filtros_que_listado(client, session, monkeypatch):
+    # Lotes pequeños: el cuerpo llega en varios trozos
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    headers = _admin_headers(client, session)
+    for _ in range(5):
+        create_random_equipo(session, estado="RESERVA")
+
+    cursores = []
+    conn = session.connection()
+
+    def _capturar(conn, cursor, statement, parameters, context, executemany):
+        if "FROM equipo" in statement:
+            cursores.append(getattr(cursor, "name", None))
+
+    event.listen(conn, "before_cursor_execute", _capturar)
+    try:
+        r = client.get("/api/v1/equipos/export", params={"estado": "RESERVA", "ordenar": "id_asc"}, headers=headers)
+    finally:
+        event.remove(conn, "before_cursor_execute", _capturar)
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert 'filename="equipos-' in r.headers["content-disposition"]
+    assert "x-total-count" not in r.headers
+    # Cursor del servidor (psycopg ServerCursor con nombre)
+    assert cursores and all(cursores)
+
+    filas = list(csv.DictReader(io.StringIO(r.text)))
+    listado = client.get(
+        "/api/v1/equipos", params={"estado": "RESERVA", "ordenar": "id_asc", "limit": 200}, headers=headers
+    ).json()
+    assert [int(f["id"]) for f in filas] == [e["id"] for e in listado]
+    assert {f["estado"] for f in filas} == {"RESERVA"}
+
+
+def test_export_movimientos_ndjson_por_fecha(client, session):
+    headers = _admin_headers(client, session)
+    eq = create_random_equipo(session)
+    for dia in (1, 15, 28):
+        session.add(Movimiento(equipo_id=eq.id, fecha=datetime(2024, 5, dia, tzinfo=timezone.utc), comentario=f"d{dia}"))
+    session.commit()
+
+    r = client.get(
+        "/api/v1/movimientos/export",
+        params={"formato": "ndjson", "equipo_id": eq.id, "desde": "2024-05-10T00:00:00Z", "ordenar": "fecha_asc"},
+        headers=headers,
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    docs = [json.loads(line) for line in r.text.splitlines()]
+    assert [d["comentario"] for d in docs] == ["d15", "d28"]
+    assert docs[0]["fecha"].startswith("2024-05-15T")
+
+
+def test_export_incidencias_y_reparaciones(client, session):
+    headers = _admin_headers(client, session)
+    eq = create_random_equipo(session)
+    inc = Incidencia(equipo_id=eq.id, titulo="Export", estado="ABIERTA")
+    session.add(inc)
+    session.commit()
+    session.add(Reparacion(equipo_id=eq.id, incidencia_id=inc.id, titulo="Rep export", estado="ABIERTA"))
+    session.commit()
+
+    r = client.get("/api/v1/incidencias/export", params={"equipo_id": eq.id}, headers=headers)
+    assert r.status_code == 200
+    assert [f["titulo"] for f in csv.DictReader(io.StringIO(r.text))] == ["Export"]
+
+    r = client.get("/api/v1/reparaciones/export", params={"equipo_id": eq.id, "formato": "ndjson"}, headers=headers)
+    assert r.status_code == 200
+    assert [json.loads(line)["titulo"] for line in r.text.splitlines()] == ["Rep export"]
+
+
+def test_export_valida_antes_de_empezar(client, session):
+    headers = _admin_headers(client, session)
+    assert client.get("/api/v1/incidencias/export", params={"ordenar": "nada"}, headers=headers).status_code == 422
+    assert client.get("/api/v1/equipos/export", params={"formato": "xml"}, headers=headers).status_code == 422
+    r = client.get(
+        "/api/v1/movimientos/export",
+        params={"desde": "2024-02-01T00:00:00Z", "hasta": "2024-01-01T00:00:00Z"},
+        headers=headers,
+    )
+    assert r.status_code == 400
+
+    operario = create_user(session, role="OPERARIO")
+    op_headers = get_auth_headers(client, operario.username)
+    assert client.get("/api/v1/reparaciones/export", headers=op_headers).status_code == 403
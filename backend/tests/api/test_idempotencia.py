@@ -0,0 +1,151 @@
+# backend/tests/api/test_idempotencia.py
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlmodel import func, select
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.middleware.idempotency import IdempotencyMiddleware, _clave
+from app.models.movimiento import Movimiento
+from app.models.ubicacion import Ubicacion
+from tests.utils import create_random_equipo, create_user, get_auth_headers, random_string
+
+# -------------------------------------------------------------------------
+# IDEMPOTENCY-KEY CON RESPUESTA GUARDADA (app/middleware/idempotency.py)
+# -------------------------------------------------------------------------
+
+
+def _destino(session) -> Ubicacion:
+    ubi = Ubicacion(nombre=f"Almacén {random_string(6)}", tipo="ALMACEN")
+    session.add(ubi)
+    session.commit()
+    return ubi
+
+
+def _movimientos(session, ubicacion_id: int) -> int:
+    return session.exec(
+        select(func.count()).select_from(Movimiento).where(Movimiento.hacia_ubicacion_id == ubicacion_id)
+    ).one()
+
+
+def test_reintento_reproduce_la_respuesta(client, session):
+    headers = get_auth_headers(client, create_user(session, role="MANTENIMIENTO").username)
+    destino = _destino(session)
+    eq = create_random_equipo(session)
+    body = {"equipo_ids": [eq.id], "hacia_ubicacion_id": destino.id}
+
+    idem = {**headers, "Idempotency-Key": "lote-1"}
+    first = client.post("/api/v1/movimientos/lote", json=body, headers=idem)
+    retry = client.post("/api/v1/movimientos/lote", json=body, headers=idem)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.content == first.content  # "ok", no "conflicto"
+    assert retry.json()["resultados"][0]["resultado"] == "ok"
+    assert retry.headers["Idempotency-Replayed"] == "true"
+    assert "Idempotency-Replayed" not in first.headers
+    assert _movimientos(session, destino.id) == 1
+
+    # Sin clave (u otra clave) es otra operación
+    otra = client.post("/api/v1/movimientos/lote", json=body, headers={**headers, "Idempotency-Key": "lote-2"})
+    assert otra.json()["resultados"][0]["resultado"] == "conflicto"
+
+
+def test_reintento_no_devuelve_409_en_rutas_con_assert_idempotent(client, session):
+    user = create_user(session, role="OPERARIO")
+    session.add(Ubicacion(nombre=f"Tecnico-{random_string(6)}", tipo="TECNICO", usuario_id=user.id))
+    session.commit()
+    headers = {**get_auth_headers(client, user.username), "X-Idempotency-Key": "retirar-1"}
+    body = {"equipo_id": create_random_equipo(session).id}
+
+    first = client.post("/api/v1/movimientos/retirar/me", json=body, headers=headers)
+    retry = client.post("/api/v1/movimientos/retirar/me", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 201, retry.text
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.headers["Location"] == first.headers["Location"]
+
+
+def test_clave_de_otro_usuario_no_se_reproduce(client, session):
+    destino = _destino(session)
+    eq1, eq2 = create_random_equipo(session), create_random_equipo(session)
+    for eq in (eq1, eq2):
+        user = create_user(session, role="MANTENIMIENTO")
+        headers = {**get_auth_headers(client, user.username), "Idempotency-Key": "compartida"}
+        r = client.post("/api/v1/movimientos/lote",
+                        json={"equipo_ids": [eq.id], "hacia_ubicacion_id": destino.id}, headers=headers)
+        assert r.json()["resultados"][0]["equipo_id"] == eq.id
+        assert "Idempotency-Replayed" not in r.headers
+    assert _movimientos(session, destino.id) == 2
+
+
+def test_duplicado_concurrente_espera_a_la_primera(client, session, redis_client):
+    headers = get_auth_headers(client, create_user(session, role="MANTENIMIENTO").username)
+    destino = _destino(session)
+    body = {"equipo_ids": [create_random_equipo(session).id], "hacia_ubicacion_id": destino.id}
+
+    # Respuesta de "la primera" (ejecutada con otra clave) y marca en curso de
+    # "lote-c", como si esa primera siguiera ejecutándose
+    origen = client.post("/api/v1/movimientos/lote", json=body, headers={**headers, "Idempotency-Key": "origen"})
+    (clave_origen,) = redis_client.keys("idempotency:resp:*")
+    scope = {"method": "POST", "path": "/api/v1/movimientos/lote",
+             "headers": [(b"authorization", headers["Authorization"].encode())]}
+    clave = _clave(scope, "lote-c")
+    redis_client.set(clave, "inflight")
+
+    def primera_termina():
+        time.sleep(0.3)
+        redis_client.set(clave, redis_client.get(clave_origen))
+
+    hilo = threading.Thread(target=primera_termina)
+    hilo.start()
+    inicio = time.monotonic()
+    dup = client.post("/api/v1/movimientos/lote", json=body, headers={**headers, "Idempotency-Key": "lote-c"})
+    hilo.join()
+
+    assert time.monotonic() - inicio >= 0.3
+    assert dup.status_code == 200
+    assert dup.headers["Idempotency-Replayed"] == "true"
+    assert dup.content == origen.content
+    assert _movimientos(session, destino.id) == 1
+
+
+def _app_contador(respuestas):
+    llamadas = []
+
+    async def crear(request):
+        llamadas.append(1)
+        status = respuestas[min(len(llamadas), len(respuestas)) - 1]
+        return JSONResponse({"n": len(llamadas)}, status_code=status)
+
+    app = Starlette(routes=[Route("/api/v1/incidencias", crear, methods=["POST"])])
+    return IdempotencyMiddleware(app), llamadas
+
+
+def test_errores_5xx_y_429_no_se_guardan(redis_compartido):
+    app, llamadas = _app_contador([503, 429, 201])
+    c = TestClient(app)
+    headers = {"Idempotency-Key": "inc-1"}
+    assert [c.post("/api/v1/incidencias", headers=headers).status_code for _ in range(4)] == [
+        503, 429, 201, 201,
+    ]
+    assert len(llamadas) == 3  # la cuarta se reproduce
+
+
+def test_misma_clave_con_otro_cuerpo_es_422(client, session):
+    headers = {**get_auth_headers(client, create_user(session, role="MANTENIMIENTO").username),
+               "Idempotency-Key": "lote-x"}
+    destino = _destino(session)
+    eq1, eq2 = create_random_equipo(session), create_random_equipo(session)
+
+    first = client.post("/api/v1/movimientos/lote",
+                        json={"equipo_ids": [eq1.id], "hacia_ubicacion_id": destino.id}, headers=headers)
+    otra = client.post("/api/v1/movimientos/lote",
+                       json={"equipo_ids": [eq2.id], "hacia_ubicacion_id": destino.id}, headers=headers)
+
+    assert first.status_code == 200
+    assert otra.status_code == 422
+    assert "Idempotency-Replayed" not in otra.headers
+    assert _movimientos(session, destino.id) == 1
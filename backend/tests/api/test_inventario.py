@@ -0,0 +1,93 @@
+# backend/tests/api/test_inventario.py
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.core.inventario import inventario_stmt
+from app.models.equipo import Equipo
+from app.models.movimiento import Movimiento
+from app.models.seccion import Seccion
+from app.models.ubicacion import Ubicacion
+from tests.utils import create_user, get_auth_headers, random_string
+
+
+def _dt(mes, dia):
+    return datetime(2024, mes, dia, tzinfo=timezone.utc)
+
+
+def _escenario(session):
+    sec = Seccion(nombre=f"Sec-{random_string(6)}")
+    session.add(sec)
+    session.commit()
+    a, b, c = (Ubicacion(nombre=f"{n}-{random_string(6)}", tipo="ALMACEN") for n in "ABC")
+    session.add_all([a, b, c])
+    session.commit()
+
+    def equipo(nombre, ubicacion, creado):
+        eq = Equipo(identidad=f"{nombre}-{random_string(6)}", tipo="Otro", seccion_id=sec.id,
+                    ubicacion_id=ubicacion.id, creado_en=creado)
+        session.add(eq)
+        session.commit()
+        return eq
+
+    movido = equipo("movido", c, _dt(1, 1))         # A -> B (1/3) -> C (1/5)
+    quieto = equipo("quieto", a, _dt(1, 1))         # nunca se ha movido
+    nuevo = equipo("nuevo", a, _dt(6, 1))           # alta posterior
+    importado = equipo("importado", b, _dt(1, 1))   # sin historial hasta 1/4: A -> B
+    session.add_all([
+        Movimiento(equipo_id=movido.id, fecha=_dt(3, 1), desde_ubicacion_id=a.id, hacia_ubicacion_id=b.id),
+        Movimiento(equipo_id=movido.id, fecha=_dt(5, 1), desde_ubicacion_id=b.id, hacia_ubicacion_id=c.id),
+        Movimiento(equipo_id=importado.id, fecha=_dt(4, 1), desde_ubicacion_id=a.id, hacia_ubicacion_id=b.id),
+    ])
+    session.commit()
+    return sec, (a, b, c), (movido, quieto, nuevo, importado)
+
+
+def test_inventario_a_fecha(client, session):
+    headers = get_auth_headers(client, create_user(session, role="OPERARIO").username)
+    sec, (a, b, c), (movido, quieto, nuevo, importado) = _escenario(session)
+
+    def inventario(fecha, **params):
+        r = client.get("/api/v1/equipos/inventario",
+                       params={"fecha": fecha.isoformat(), "seccion_id": sec.id, **params}, headers=headers)
+        assert r.status_code == 200, r.text
+        return {e["id"]: e for e in r.json()}
+
+    en_marzo = inventario(_dt(3, 15))
+    assert {i: e.get("ubicacion_id") for i, e in en_marzo.items()} == {
+        movido.id: b.id, quieto.id: a.id, importado.id: a.id,
+    }
+    assert en_marzo[movido.id]["desde"].startswith("2024-03-01")
+    assert "movimiento_id" not in en_marzo[quieto.id]
+
+    # Hoy: coincide con la ubicación actual de cada equipo
+    hoy = inventario(datetime.now(timezone.utc))
+    assert {i: e["ubicacion_id"] for i, e in hoy.items()} == {
+        movido.id: c.id, quieto.id: a.id, nuevo.id: a.id, importado.id: b.id,
+    }
+
+    # "¿Qué había en A el 15/3?"
+    assert set(inventario(_dt(3, 15), ubicacion_id=a.id)) == {quieto.id, importado.id}
+    assert set(inventario(_dt(2, 1), ubicacion_id=a.id)) == {movido.id, quieto.id, importado.id}
+
+
+def test_inventario_paginado_por_cursor(client, session):
+    headers = get_auth_headers(client, create_user(session, role="OPERARIO").username)
+    sec, _, equipos = _escenario(session)
+    params = {"fecha": _dt(12, 31).isoformat(), "seccion_id": sec.id, "limit": 3}
+
+    r = client.get("/api/v1/equipos/inventario", params=params, headers=headers)
+    assert len(r.json()) == 3
+    r2 = client.get("/api/v1/equipos/inventario", params={**params, "cursor": r.headers["X-Next-Cursor"]},
+                    headers=headers)
+    assert [e["id"] for e in r.json() + r2.json()] == sorted(e.id for e in equipos)
+    assert client.get("/api/v1/equipos/inventario", headers=headers).status_code == 422  # falta fecha
+
+
+def test_inventario_usa_indice_por_equipo(session):
+    stmt = inventario_stmt(_dt(3, 15), ubicacion_id=1)
+    compiled = stmt.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+    session.exec(text("SET LOCAL enable_seqscan = off"))
+    plan = "\n".join(r[0] for r in session.exec(text(f"EXPLAIN {compiled}")).all())
+    movs = [line for line in plan.splitlines() if "movimiento" in line and "Scan" in line]
+    assert movs and all("equipo_id_fecha_idx" in line or "ix_movimiento_equipo_fecha" in line for line in movs), plan
@@ -0,0 +1,100 @@
+# backend/tests/api/test_movimientos_lote.py
+from sqlmodel import select
+from app.models.equipo import Equipo
+from app.models.ubicacion import Ubicacion
+from app.models.movimiento import Movimiento
+from tests.utils import create_user, get_auth_headers, create_random_equipo, random_string
+
+# -------------------------------------------------------------------------
+# MOVIMIENTO POR LOTES (POST /movimientos/lote)
+# -------------------------------------------------------------------------
+
+
+def _ubicacion(session, nombre: str, **kw) -> Ubicacion:
+    ubi = Ubicacion(nombre=nombre, tipo=kw.pop("tipo", "ALMACEN"), **kw)
+    session.add(ubi)
+    session.commit()
+    session.refresh(ubi)
+    return ubi
+
+
+def test_lote_resultados_por_elemento(client, session):
+    """
+    Mezcla de elementos válidos, inexistentes, repetidos y no movibles:
+    sólo los válidos generan Movimiento y el resto se informa por elemento.
+    """
+    user = create_user(session, role="MANTENIMIENTO")
+    headers = get_auth_headers(client, user.username)
+    destino = _ubicacion(session, f"Almacén {random_string(4)}")
+
+    ok_nfc = create_random_equipo(session)
+    ok_nfc.nfc_tag = f"tag-{random_string(6).lower()}"
+    session.add(ok_nfc)
+    session.commit()
+    ok_id = create_random_equipo(session)
+    baja = create_random_equipo(session, estado="BAJA")
+
+    payload = {
+        "nfc_tags": [ok_nfc.nfc_tag.upper(), "no-existe-xyz"],
+        "equipo_ids": [ok_id.id, baja.id, ok_id.id],
+        "hacia_ubicacion_id": destino.id,
+    }
+    resp = client.post("/api/v1/movimientos/lote", json=payload, headers=headers)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+
+    assert data["movidos"] == 2
+    assert [r["resultado"] for r in data["resultados"]] == [
+        "ok", "no_encontrado", "ok", "conflicto", "conflicto",
+    ]
+    assert data["resultados"][0]["equipo_id"] == ok_nfc.id
+
+    movs = session.exec(select(Movimiento).where(Movimiento.hacia_ubicacion_id == destino.id)).all()
+    assert {m.equipo_id for m in movs} == {ok_nfc.id, ok_id.id}
+    assert all(m.usuario_id == user.id for m in movs)
+    session.refresh(baja)
+    assert baja.ubicacion_id != destino.id
+
+
+def test_lote_misma_ubicacion_es_conflicto(client, session):
+    user = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, user.username)
+    destino = _ubicacion(session, f"Lab {random_string(4)}", tipo="LABORATORIO")
+    eq = create_random_equipo(session)
+
+    body = {"equipo_ids": [eq.id], "hacia_ubicacion_id": destino.id}
+    first = client.post("/api/v1/movimientos/lote", json=body, headers=headers)
+    assert first.json()["resultados"][0]["resultado"] == "ok"
+
+    second = client.post("/api/v1/movimientos/lote", json=body, headers=headers)
+    assert second.status_code == 200
+    assert second.json()["resultados"][0]["resultado"] == "conflicto"
+
+
+def test_lote_sin_destino_usa_ubicacion_tecnico(client, session):
+    tech = create_user(session, role="OPERARIO")
+    ubi_tech = _ubicacion(session, f"Personal: {tech.username}", tipo="TECNICO", usuario_id=tech.id)
+    eq = create_random_equipo(session)
+    headers = get_auth_headers(client, tech.username)
+
+    resp = client.post("/api/v1/movimientos/lote", json={"equipo_ids": [eq.id]}, headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["hacia_ubicacion_id"] == ubi_tech.id
+    session.refresh(eq)
+    assert eq.ubicacion_id == ubi_tech.id
+
+
+def test_lote_vacio_o_destino_inexistente_422(client, session):
+    user = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, user.username)
+    eq = create_random_equipo(session)
+
+    resp = client.post("/api/v1/movimientos/lote", json={"hacia_ubicacion_id": 1}, headers=headers)
+    assert resp.status_code == 422
+
+    resp = client.post(
+        "/api/v1/movimientos/lote",
+        json={"equipo_ids": [eq.id], "hacia_ubicacion_id": 999999},
+        headers=headers,
+    )
+    assert resp.status_code == 422
@@ -1,4 +1,6 @@
 # backend/tests/api/test_movimientos_tecnico.py
+import asyncio
+
 import pytest
 from sqlmodel import select
 from app.models.equipo import Equipo
@@ -106,6 +108,43 @@ def test_retirar_para_mi_nfc(client, session):
     session.refresh(eq)
     assert eq.ubicacion_id == ubi_tech.id
 
+
+def test_retirar_nfc_no_usa_redis_en_el_event_loop(client, session, redis_client, monkeypatch):
+    """Guard NFC y caché de lookup (Redis síncrono) se ejecutan en el threadpool."""
+    tech = create_user(session, role="OPERARIO")
+    session.add(Ubicacion(nombre="UbiTech2", tipo="TECNICO", usuario_id=tech.id))
+    eq = create_random_equipo(session)
+    eq.nfc_tag = "tag_hilo_456"
+    session.add(eq)
+    session.commit()
+    headers = get_auth_headers(client, tech.username)
+
+    en_loop = []
+
+    def vigilar(nombre):
+        original = getattr(redis_client, nombre)
+
+        def wrapper(*args, **kwargs):
+            claves = [a for a in args if isinstance(a, str) and (":nfc:" in a or a.startswith("equipo:lookup:"))]
+            try:
+                asyncio.get_running_loop()
+                en_loop.extend(claves)
+            except RuntimeError:
+                pass
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(redis_client, nombre, wrapper)
+
+    for nombre in ("eval", "evalsha", "get", "setex"):
+        vigilar(nombre)
+
+    resp = client.post("/api/v1/movimientos/retirar/me/nfc", json={"nfc_tag": "tag_hilo_456"}, headers=headers)
+
+    assert resp.status_code == 201, resp.text
+    assert redis_client.get("equipo:lookup:nfc_tag:tag_hilo_456") == str(eq.id)
+    assert en_loop == []
+
+
 # -------------------------------------------------------------------------
 # 2. MOVIMIENTOS ESTÁNDAR (Regresión)
 # -------------------------------------------------------------------------
@@ -0,0 +1,204 @@
+# backend/tests/api/test_paginacion.py
+from tests.utils import create_user, get_auth_headers, create_random_equipo
+
+# -------------------------------------------------------------------------
+# PAGINACIÓN POR CURSOR (X-Next-Cursor)
+# -------------------------------------------------------------------------
+
+
+def _recorrer(client, url, headers, params):
+    """Recorre todas las páginas siguiendo X-Next-Cursor y devuelve los ids."""
+    ids = []
+    params = dict(params)
+    for _ in range(50):
+        r = client.get(url, headers=headers, params=params)
+        assert r.status_code == 200, r.text
+        ids.extend(item["id"] for item in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+    return ids
+
+
+def test_cursor_equipos_recorre_sin_duplicados(client, session):
+    """
+    Recorrer equipos con cursor devuelve los mismos ids que una única página grande.
+    """
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    for _ in range(7):
+        create_random_equipo(session)
+
+    for ordenar in ("id_desc", "identidad_asc", "tipo_desc"):
+        completo = client.get(
+            "/api/v1/equipos", headers=headers, params={"limit": 200, "ordenar": ordenar}
+        ).json()
+        ids_cursor = _recorrer(client, "/api/v1/equipos", headers, {"limit": 3, "ordenar": ordenar})
+        assert ids_cursor == [e["id"] for e in completo]
+
+
+def test_cursor_ultima_pagina_sin_cabecera(client, session):
+    """Si la página no está llena no se devuelve X-Next-Cursor."""
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    create_random_equipo(session)
+
+    r = client.get("/api/v1/equipos", headers=headers, params={"limit": 200})
+    assert r.status_code == 200
+    assert "X-Next-Cursor" not in r.headers
+
+
+def test_cursor_invalido_422(client, session):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+
+    r = client.get("/api/v1/equipos", headers=headers, params={"cursor": "no-es-un-cursor"})
+    assert r.status_code == 422
+
+
+def test_cursor_de_otro_orden_422(client, session):
+    """Un cursor emitido para un 'ordenar' no vale para otro."""
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    for _ in range(3):
+        create_random_equipo(session)
+
+    r = client.get("/api/v1/equipos", headers=headers, params={"limit": 1, "ordenar": "id_desc"})
+    cursor = r.headers["X-Next-Cursor"]
+
+    r = client.get(
+        "/api/v1/equipos", headers=headers, params={"limit": 1, "ordenar": "id_asc", "cursor": cursor}
+    )
+    assert r.status_code == 422
+
+
+# -------------------------------------------------------------------------
+# TOTAL (include_total)
+# -------------------------------------------------------------------------
+
+
+def test_include_total_false_sin_cabecera(client, session):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    create_random_equipo(session)
+
+    r = client.get("/api/v1/equipos", headers=headers, params={"include_total": "false"})
+    assert r.status_code == 200
+    assert "X-Total-Count" not in r.headers
+    assert len(r.json()) >= 1
+
+
+def test_include_total_estimate_pequeno_es_exacto(client, session):
+    """Con pocas filas estimadas se devuelve el conteo exacto (sin marca de estimado)."""
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    eq = create_random_equipo(session)
+
+    exacto = client.get(
+        "/api/v1/equipos", headers=headers, params={"identidad_eq": eq.identidad}
+    )
+    estimado = client.get(
+        "/api/v1/equipos",
+        headers=headers,
+        params={"identidad_eq": eq.identidad, "include_total": "estimate"},
+    )
+    assert estimado.status_code == 200
+    assert estimado.headers["X-Total-Count"] == exacto.headers["X-Total-Count"] == "1"
+    assert "X-Total-Count-Estimated" not in estimado.headers
+
+
+def test_include_total_invalido_422(client, session):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+
+    r = client.get("/api/v1/movimientos", headers=headers, params={"include_total": "aprox"})
+    assert r.status_code == 422
+
+
+def test_include_total_estimate_usa_planner(client, session, monkeypatch):
+    """Por encima del umbral se devuelve la estimación del planner marcada como tal."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "COUNT_ESTIMATE_MIN_ROWS", 0)
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    create_random_equipo(session)
+
+    r = client.get(
+        "/api/v1/equipos", headers=headers, params={"estado": "OPERATIVO", "include_total": "estimate"}
+    )
+    assert r.status_code == 200
+    assert r.headers["X-Total-Count-Estimated"] == "true"
+    assert int(r.headers["X-Total-Count"]) >= 0
+
+
+def test_total_exacto_cachea_fuera_del_event_loop(client, session, redis_client, monkeypatch):
+    """La caché de X-Total-Count (Redis síncrono) se consulta en el threadpool."""
+    import asyncio
+
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    create_random_equipo(session)
+
+    en_loop = []
+
+    def vigilar(nombre):
+        original = getattr(redis_client, nombre)
+
+        def wrapper(key, *args, **kwargs):
+            if key.startswith("count:"):
+                try:
+                    asyncio.get_running_loop()
+                    en_loop.append((nombre, key))
+                except RuntimeError:
+                    pass
+            return original(key, *args, **kwargs)
+
+        monkeypatch.setattr(redis_client, nombre, wrapper)
+
+    for nombre in ("get", "setex"):
+        vigilar(nombre)
+
+    params = {"estado": "OPERATIVO", "include_total": "exact"}
+    r1 = client.get("/api/v1/equipos", headers=headers, params=params)
+    r2 = client.get("/api/v1/equipos", headers=headers, params=params)
+
+    assert r1.status_code == r2.status_code == 200
+    assert r1.headers["X-Total-Count"] == r2.headers["X-Total-Count"]
+    assert redis_client.keys("count:*")
+    assert en_loop == []
+
+
+# -------------------------------------------------------------------------
+# CONSULTAS POR PÁGINA (sin N+1)
+# -------------------------------------------------------------------------
+def test_listados_no_crecen_en_consultas_con_la_pagina(client, session, assert_queries_constant):
+    from app.models.incidencia import Incidencia
+    from app.models.movimiento import Movimiento
+    from app.models.reparacion import Reparacion
+    from app.models.seccion import Seccion
+    from app.models.ubicacion import Ubicacion
+    from tests.utils import random_string
+
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    for _ in range(5):
+        create_user(session, role="OPERARIO")
+        eq = create_random_equipo(session)
+        inc = Incidencia(equipo_id=eq.id, titulo="N+1", estado="ABIERTA", usuario_id=admin.id)
+        session.add_all([
+            inc,
+            Movimiento(equipo_id=eq.id, usuario_id=admin.id),
+            Seccion(nombre=f"Sec-{random_string(6)}"),
+            Ubicacion(nombre=f"Ubi-{random_string(6)}", tipo="ALMACEN"),
+        ])
+        session.commit()
+        session.add(Reparacion(equipo_id=eq.id, incidencia_id=inc.id, titulo="N+1", estado="ABIERTA"))
+        session.commit()
+
+    for url in ("/api/v1/equipos", "/api/v1/movimientos", "/api/v1/incidencias",
+                "/api/v1/reparaciones", "/api/v1/secciones", "/api/v1/ubicaciones", "/api/v1/usuarios"):
+        assert_queries_constant(
+            lambda limit: client.get(url, params={"limit": limit, "include_total": "false"}, headers=headers)
+        )
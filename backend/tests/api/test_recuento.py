@@ -0,0 +1,93 @@
+# backend/tests/api/test_recuento.py
+from sqlmodel import select
+
+from app.models.equipo import Equipo
+from app.models.movimiento import Movimiento
+from app.models.ubicacion import Ubicacion
+from tests.utils import create_random_equipo, create_user, get_auth_headers, random_string
+
+
+def _ubicacion(session):
+    ubi = Ubicacion(nombre=f"Recuento-{random_string(6)}", tipo="ALMACEN")
+    session.add(ubi)
+    session.commit()
+    return ubi
+
+
+def _equipo(session, ubicacion, estado="OPERATIVO", tag=True):
+    eq = create_random_equipo(session, estado=estado)
+    eq.ubicacion_id = ubicacion.id if ubicacion else None
+    eq.nfc_tag = f"tag-{random_string(10)}".lower() if tag else None
+    session.add(eq)
+    session.commit()
+    return eq
+
+
+def _escenario(session):
+    aqui, otra = _ubicacion(session), _ubicacion(session)
+    presente = _equipo(session, aqui)
+    faltante = _equipo(session, aqui)
+    sin_tag = _equipo(session, aqui, tag=False)
+    extraviado = _equipo(session, otra)
+    sin_ubicacion = _equipo(session, None)
+    de_baja = _equipo(session, otra, estado="BAJA")
+    tags = [presente.nfc_tag.upper(), f" {extraviado.nfc_tag} ", sin_ubicacion.nfc_tag, de_baja.nfc_tag,
+            "no-existe-1", "NO-EXISTE-1", "", presente.nfc_tag]
+    return aqui, otra, (presente, faltante, sin_tag, extraviado, sin_ubicacion, de_baja), tags
+
+
+def test_recuento_informa_sin_mover(client, session):
+    headers = get_auth_headers(client, create_user(session, role="OPERARIO").username)
+    aqui, otra, (presente, faltante, sin_tag, extraviado, sin_ubicacion, de_baja), tags = _escenario(session)
+
+    r = client.post(f"/api/v1/ubicaciones/{aqui.id}/recuento", json={"nfc_tags": tags}, headers=headers)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["escaneados"] == 5 and data["presentes"] == 1 and data["movidos"] == 0
+    assert {e["equipo_id"] for e in data["faltantes"]} == {faltante.id, sin_tag.id}
+    assert {e["equipo_id"]: e.get("ubicacion_id") for e in data["en_otra_ubicacion"]} == {
+        extraviado.id: otra.id, sin_ubicacion.id: None, de_baja.id: otra.id,
+    }
+    assert data["desconocidos"] == ["no-existe-1"]
+    session.expire_all()
+    assert session.get(Equipo, extraviado.id).ubicacion_id == otra.id
+
+
+def test_recuento_corrige_en_bloque(client, session):
+    user = create_user(session, role="MANTENIMIENTO")
+    headers = get_auth_headers(client, user.username)
+    aqui, otra, (presente, faltante, sin_tag, extraviado, sin_ubicacion, de_baja), tags = _escenario(session)
+
+    r = client.post(
+        f"/api/v1/ubicaciones/{aqui.id}/recuento",
+        json={"nfc_tags": tags, "corregir": True},
+        headers={**headers, "Idempotency-Key": random_string(12)},
+    )
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["movidos"] == 2
+    corregidos = {e["equipo_id"]: e.get("movimiento_id") for e in data["en_otra_ubicacion"]}
+    assert corregidos[extraviado.id] and corregidos[sin_ubicacion.id] and corregidos[de_baja.id] is None
+
+    session.expire_all()
+    assert session.get(Equipo, extraviado.id).ubicacion_id == aqui.id
+    assert session.get(Equipo, de_baja.id).ubicacion_id == otra.id
+    mov = session.exec(select(Movimiento).where(Movimiento.id == corregidos[extraviado.id])).one()
+    assert (mov.desde_ubicacion_id, mov.hacia_ubicacion_id, mov.usuario_id) == (otra.id, aqui.id, user.id)
+    assert mov.comentario == "Recuento"
+
+    # Repetir el recuento ya no encuentra nada que corregir
+    r = client.post(f"/api/v1/ubicaciones/{aqui.id}/recuento", json={"nfc_tags": tags, "corregir": True},
+                    headers=headers)
+    assert r.json()["presentes"] == 3 and r.json()["movidos"] == 0
+
+
+def test_recuento_validaciones(client, session, monkeypatch):
+    from app.core.config import settings
+
+    headers = get_auth_headers(client, create_user(session, role="OPERARIO").username)
+    assert client.post("/api/v1/ubicaciones/999999/recuento", json={"nfc_tags": []}, headers=headers).status_code == 404
+    monkeypatch.setattr(settings, "RECUENTO_MAX_TAGS", 2)
+    ubi = _ubicacion(session)
+    r = client.post(f"/api/v1/ubicaciones/{ubi.id}/recuento", json={"nfc_tags": ["a", "b", "c"]}, headers=headers)
+    assert r.status_code == 422
@@ -0,0 +1,82 @@
+# backend/tests/api/test_timeline.py
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.core.timeline import timeline_stmt
+from app.models.equipo_adjunto import EquipoAdjunto
+from app.models.incidencia import Incidencia
+from app.models.movimiento import Movimiento
+from app.models.reparacion import Reparacion
+from tests.utils import create_random_equipo, create_user, get_auth_headers
+
+
+def _historial(session, equipo_id):
+    """Un evento de cada tipo por día, con dos eventos a la misma hora (empate)."""
+    base = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+    esperados = []
+    for d in range(3):
+        t = base + timedelta(days=d)
+        inc = Incidencia(equipo_id=equipo_id, titulo=f"inc{d}", estado="ABIERTA", fecha=t)
+        session.add(inc)
+        session.commit()
+        session.add_all([
+            Movimiento(equipo_id=equipo_id, fecha=t, comentario=f"mov{d}"),
+            Reparacion(equipo_id=equipo_id, incidencia_id=inc.id, titulo=f"rep{d}", estado="ABIERTA",
+                       fecha_inicio=t + timedelta(hours=1)),
+            EquipoAdjunto(equipo_id=equipo_id, nombre_archivo=f"adj{d}.pdf", ruta_relativa="x",
+                          subido_en=t + timedelta(hours=2)),
+        ])
+        session.commit()
+        # Orden esperado dentro del día: fecha desc y, a igual fecha, tipo desc
+        esperados = [f"adj{d}.pdf", f"rep{d}", f"mov{d}", f"inc{d}"] + esperados
+    return esperados
+
+
+def test_timeline_une_y_ordena_con_cursor(client, session):
+    headers = get_auth_headers(client, create_user(session, role="OPERARIO").username)
+    eq = create_random_equipo(session)
+    otro = create_random_equipo(session)
+    esperados = _historial(session, eq.id)
+    _historial(session, otro.id)
+
+    vistos, params = [], {"limit": 5}
+    for _ in range(10):
+        r = client.get(f"/api/v1/equipos/{eq.id}/timeline", params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        vistos += r.json()
+        if "X-Next-Cursor" not in r.headers:
+            break
+        params["cursor"] = r.headers["X-Next-Cursor"]
+
+    assert [e["titulo"] for e in vistos] == esperados
+    assert {e["tipo"] for e in vistos} == {"movimiento", "incidencia", "reparacion", "adjunto"}
+    rep = next(e for e in vistos if e["tipo"] == "reparacion")
+    assert rep["estado"] == "ABIERTA" and rep["incidencia_id"]
+
+
+def test_timeline_404_y_cursor_ajeno(client, session):
+    headers = get_auth_headers(client, create_user(session, role="OPERARIO").username)
+    assert client.get("/api/v1/equipos/999999/timeline", headers=headers).status_code == 404
+
+    eq = create_random_equipo(session)
+    session.add(Movimiento(equipo_id=eq.id))
+    session.commit()
+    r = client.get("/api/v1/equipos", params={"limit": 1}, headers=headers)
+    cursor = r.headers["X-Next-Cursor"]
+    r = client.get(f"/api/v1/equipos/{eq.id}/timeline", params={"cursor": cursor}, headers=headers)
+    assert r.status_code == 422
+
+
+def test_timeline_usa_indices_por_equipo(session):
+    eq = create_random_equipo(session)
+    stmt = timeline_stmt(eq.id, 20, [datetime(2024, 3, 2, tzinfo=timezone.utc), "movimiento", 10])
+    compiled = stmt.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+
+    session.exec(text("SET LOCAL enable_seqscan = off"))
+    plan = "\n".join(r[0] for r in session.exec(text(f"EXPLAIN {compiled}")).all())
+    for ix in ("ix_incidencia_equipo", "ix_reparacion_equipo_fecha_inicio", "ix_equipo_adjunto_equipo_subido"):
+        assert ix in plan, plan
+    # movimiento está particionada: índice de cada partición
+    assert "equipo_id_fecha_idx" in plan or "ix_movimiento_equipo_fecha" in plan, plan
+    assert "Seq Scan" not in plan, plan
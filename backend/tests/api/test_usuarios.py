@@ -63,4 +63,23 @@ def test_me_endpoint_returns_full_info(client, session):
     data = resp.json()
     
     assert data["nombre"] == "Self"
-    assert data["apellidos"] == "Test"
\ No newline at end of file
+    assert data["apellidos"] == "Test"
+
+def test_cambios_que_revocan_sesiones_dan_503_sin_redis(client, session, monkeypatch):
+    import app.api.v1.routes_usuarios as routes_usuarios
+
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    user = create_user(session, role="OPERARIO")
+    monkeypatch.setattr(routes_usuarios, "revoke_all_user_tokens", lambda _uid: 0)
+
+    r = client.post(f"/api/v1/usuarios/{user.id}/password", json={"password": "otraClave123"}, headers=headers)
+    assert r.status_code == 503
+    r = client.patch(f"/api/v1/usuarios/{user.id}", json={"active": False}, headers=headers)
+    assert r.status_code == 503
+    assert client.delete(f"/api/v1/usuarios/{user.id}", headers=headers).status_code == 503
+
+    # Nada se aplicó: sigue activo y con su contraseña
+    session.refresh(user)
+    assert user.active
+    assert get_auth_headers(client, user.username)
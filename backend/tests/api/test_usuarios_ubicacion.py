@@ -82,3 +82,30 @@ def test_admin_actualiza_ubicacion_usuario(client, session):
     session.refresh(ubi2)
     assert ubi1.usuario_id is None
     assert ubi2.usuario_id == user.id
+
+
+def test_listado_usuarios_sin_n_mas_1(client, session, assert_queries_constant, count_queries):
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+    for _ in range(5):
+        tecnico = create_user(session, role="MANTENIMIENTO")
+        ubi = _crear_ubicacion_tecnico(session)
+        ubi.usuario_id = tecnico.id
+        session.add(ubi)
+        session.commit()
+
+    params = {"role": "MANTENIMIENTO", "include_total": "false"}
+    assert_queries_constant(
+        lambda limit: client.get("/api/v1/usuarios", params={**params, "limit": limit}, headers=headers)
+    )
+
+    session.expunge_all()
+    r = client.get("/api/v1/usuarios", params={**params, "limit": 5}, headers=headers)
+    assert all(u["ubicacion_id"] for u in r.json())
+
+    session.expunge_all()
+    with count_queries() as stmts:
+        r = client.get(f"/api/v1/usuarios/{tecnico.id}", headers=headers)
+    assert r.json()["ubicacion_id"] == ubi.id
+    # Sin carga perezosa de la ubicación asociada (va en el JOIN)
+    assert not [s for s in stmts if "FROM ubicacion WHERE" in s]
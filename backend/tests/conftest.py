@@ -1,5 +1,6 @@
 import os
 import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
 import pytest
@@ -9,6 +10,7 @@ from fastapi.testclient import TestClient
 from sqlmodel import SQLModel, Session, text
 from sqlalchemy import exc, event
 from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # --------------------------------------------------------------------
 # 1) Cargar .env.test y forzar entorno de TEST
@@ -38,7 +40,7 @@ os.environ.setdefault("TRUSTED_HOSTS", "testserver,localhost,127.0.0.1")
 # --------------------------------------------------------------------
 from app.main import app  # noqa: E402
 from app.core.db import get_engine, get_session  # noqa: E402
-from app.core.deps import get_db  # noqa: E402
+from app.core.deps import get_async_db, get_async_read_db, get_db, get_read_db, get_stream_read_db  # noqa: E402
 from app.core.config import settings  # noqa: E402
 from seeds.seed_dev import run as seed_dev_run  # noqa: E402
 
@@ -81,15 +83,16 @@ def wait_for_services():
 @pytest.fixture(scope="session", autouse=True)
 def setup_db_schema(wait_for_services):
     """
-    - Crea la extensión CITEXT (necesaria para Usuario, etc.).
+    - Crea las extensiones CITEXT (Usuario, etc.) y pg_trgm (búsqueda).
     - Crea todas las tablas (SQLModel.metadata.create_all).
     - Ejecuta seed_dev (admin, ubicaciones, equipos base).
     """
     import app.models  # registra modelos en SQLModel.metadata
 
-    # Extensión CITEXT (Postgres)
+    # Extensiones CITEXT y pg_trgm (búsqueda q=) en Postgres
     with engine.connect() as connection:
         connection.execute(text("CREATE EXTENSION IF NOT EXISTS citext"))
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         connection.commit()
 
     # Crear tablas
@@ -169,15 +172,27 @@ def redis_client_fixture():
         r.close()
 
 
+@pytest.fixture
+def redis_compartido(redis_client, monkeypatch):
+    """redis_client inyectado como cliente Redis compartido (app.core.redis_client)."""
+    import app.core.redis_client as redis_client_module
+
+    monkeypatch.setattr(redis_client_module, "_client", redis_client)
+    return redis_client
+
+
 # --------------------------------------------------------------------
 # 7) TestClient de FastAPI con overrides de DB y Redis
 # --------------------------------------------------------------------
 @pytest.fixture(name="client")
-def client_fixture(session: Session, redis_client):
+def client_fixture(session: Session, redis_compartido):
     """
     Cliente de tests para la API:
     - Sobrescribe get_session y get_db para usar la 'session' del test.
-    - Inyecta redis_client en rate_limit y security.
+    - Sobrescribe get_async_db con una AsyncSession que envuelve esa misma
+      'session' (sync_session_class), así las rutas async ven los datos del
+      test y participan del mismo SAVEPOINT.
+    - Usa redis_client como cliente Redis compartido (fixture redis_compartido).
     """
 
     # ----- Override de dependencias de BD -----
@@ -194,18 +209,17 @@ def client_fixture(session: Session, redis_client):
         finally:
             pass
 
+    async def get_async_db_override():
+        # Sin cerrar: el ciclo de vida lo gestiona la fixture 'session'
+        yield AsyncSession(sync_session_class=lambda **_: session)
+
     app.dependency_overrides[get_session] = get_session_override
     app.dependency_overrides[get_db] = get_db_override
-
-    # ----- Inyección de Redis en singletons -----
-    import app.core.rate_limit as rate_limit_module
-    import app.core.security as security_module
-
-    original_rl_client = getattr(rate_limit_module, "_redis_client", None)
-    original_sec_client = getattr(security_module, "_redis_client", None)
-
-    rate_limit_module._redis_client = redis_client
-    security_module._redis_client = redis_client
+    app.dependency_overrides[get_async_db] = get_async_db_override
+    # Lecturas (réplicas): en tests también sobre la sesión del test
+    app.dependency_overrides[get_read_db] = get_db_override
+    app.dependency_overrides[get_async_read_db] = get_async_db_override
+    app.dependency_overrides[get_stream_read_db] = lambda: lambda: nullcontext(session)
 
     try:
         with TestClient(app) as c:
@@ -213,5 +227,58 @@ def client_fixture(session: Session, redis_client):
     finally:
         # Restaurar estado original
         app.dependency_overrides.clear()
-        rate_limit_module._redis_client = original_rl_client
-        security_module._redis_client = original_sec_client
+
+
+# --------------------------------------------------------------------
+# 8) Conteo de consultas (detectar N+1)
+# --------------------------------------------------------------------
+@pytest.fixture
+def count_queries(session: Session):
+    """
+    Context manager que recoge las sentencias SQL ejecutadas en la conexión
+    del test (la misma que usan las rutas a través de los overrides).
+
+        with count_queries() as stmts:
+            client.get(...)
+        assert len(stmts) <= 3
+    """
+    @contextmanager
+    def _count():
+        stmts = []
+        conn = session.connection()
+
+        def _on_execute(conn, cursor, statement, parameters, context, executemany):
+            stmts.append(statement)
+
+        event.listen(conn, "before_cursor_execute", _on_execute)
+        try:
+            yield stmts
+        finally:
+            event.remove(conn, "before_cursor_execute", _on_execute)
+
+    return _count
+
+
+@pytest.fixture
+def assert_queries_constant(session: Session, count_queries):
+    """
+    Falla si el nº de consultas de un listado crece con el tamaño de página.
+    'fetch(limit)' debe hacer la petición y devolver la respuesta; se vacía el
+    identity map antes de cada llamada para que nada venga ya cargado.
+    """
+    def _check(fetch, small: int = 1, large: int = 5):
+        conteos = {}
+        for limit in (small, large):
+            session.expunge_all()
+            with count_queries() as stmts:
+                r = fetch(limit)
+            assert r.status_code == 200, r.text
+            assert len(r.json()) == limit, f"hacen falta al menos {large} filas para comparar"
+            conteos[limit] = stmts
+        # '<=': la segunda llamada puede ahorrarse el COUNT cacheado en Redis
+        assert len(conteos[large]) <= len(conteos[small]), (
+            f"{len(conteos[small])} consultas con limit={small} y {len(conteos[large])} con limit={large}:\n"
+            + "\n---\n".join(conteos[large])
+        )
+
+    return _check
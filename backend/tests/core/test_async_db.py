@@ -0,0 +1,37 @@
+# backend/tests/core/test_async_db.py
+import asyncio
+
+from sqlmodel import select
+
+from app.core.db import dispose_async_engine, get_async_session
+from app.core.deps import get_async_db
+from app.main import app
+from app.models.ubicacion import Ubicacion
+from tests.utils import get_auth_headers
+
+
+def test_sesion_async_contra_postgres():
+    """El motor async (psycopg 3 async) lee los datos del seed."""
+    async def run():
+        try:
+            async for s in get_async_session():
+                nombres = (await s.exec(select(Ubicacion.nombre))).all()
+                return nombres
+        finally:
+            await dispose_async_engine()
+
+    assert "Almacén Central" in asyncio.run(run())
+
+
+def test_ruta_async_con_motor_real(client):
+    """Sin override de get_async_db: la ruta usa el pool async de verdad."""
+    headers = get_auth_headers(client, "admin", "admin123")
+    app.dependency_overrides.pop(get_async_db, None)
+
+    r = client.get("/api/v1/ubicaciones", params={"q": "Almacén"}, headers=headers)
+    assert r.status_code == 200
+    assert any(u["nombre"] == "Almacén Central" for u in r.json())
+    assert int(r.headers["X-Total-Count"]) >= 1
+
+    r = client.get(f"/api/v1/ubicaciones/{r.json()[0]['id']}", headers=headers)
+    assert r.status_code == 200
@@ -0,0 +1,78 @@
+# backend/tests/core/test_jwt_cache.py
+
+import pytest
+from jose import JWTError, jwt
+
+import app.core.security as security
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def limpiar_cache():
+    security.clear_decoded_token_cache()
+    yield
+    security.clear_decoded_token_cache()
+
+
+@pytest.fixture
+def contar_decodes(monkeypatch):
+    llamadas = []
+    original = jwt.decode
+
+    def decode(*args, **kwargs):
+        llamadas.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", decode)
+    return llamadas
+
+
+def test_segunda_decodificacion_sale_de_cache(contar_decodes):
+    token, _ = security.issue_access_token(1, "ADMIN")
+
+    p1 = security.decode_token_cached(token)
+    p2 = security.decode_token_cached(token)
+
+    assert p1 == p2
+    assert len(contar_decodes) == 1
+    # Copias independientes
+    p2["role"] = "X"
+    assert security.decode_token_cached(token)["role"] == "ADMIN"
+
+
+def test_token_caducado_no_se_sirve_de_cache(contar_decodes, monkeypatch):
+    token, _ = security.issue_access_token(1, "ADMIN")
+    exp = security.decode_token_cached(token, leeway_seconds=0)["exp"]
+    assert len(contar_decodes) == 1
+
+    # Pasado 'exp' la entrada se descarta y el token se vuelve a verificar
+    # (jose usa su propio reloj, así que aquí la verificación aún pasa)
+    monkeypatch.setattr(security.time, "time", lambda: exp + 1)
+    security.decode_token_cached(token, leeway_seconds=0)
+    assert len(contar_decodes) == 2
+
+
+def test_token_manipulado_no_valida(contar_decodes):
+    token, _ = security.issue_access_token(1, "ADMIN")
+    security.decode_token_cached(token)
+    with pytest.raises(JWTError):
+        security.decode_token_cached(token[:-2] + ("AA" if token[-2:] != "AA" else "BB"))
+
+
+def test_lru_acotado(monkeypatch, contar_decodes):
+    monkeypatch.setattr(settings, "JWT_DECODE_CACHE_SIZE", 2)
+    t1, t2, t3 = (security.issue_access_token(i, "OPERARIO")[0] for i in (1, 2, 3))
+    for t in (t1, t2, t3):
+        security.decode_token_cached(t)
+    assert len(security._decoded_cache) == 2
+
+    security.decode_token_cached(t1)  # expulsado -> se vuelve a verificar
+    assert len(contar_decodes) == 4
+
+
+def test_cache_desactivada(monkeypatch, contar_decodes):
+    monkeypatch.setattr(settings, "JWT_DECODE_CACHE_SIZE", 0)
+    token, _ = security.issue_access_token(1, "ADMIN")
+    security.decode_token_cached(token)
+    security.decode_token_cached(token)
+    assert len(contar_decodes) == 2
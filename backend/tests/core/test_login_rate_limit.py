@@ -0,0 +1,89 @@
+# backend/tests/core/test_login_rate_limit.py
+import threading
+import time
+
+from app.core.config import settings
+from app.core.rate_limit import (
+    check_login_attempt,
+    give_back_login_attempt,
+    register_login_fail,
+    reset_login_counters_and_unlock,
+)
+
+
+def _login_fallido(username: str, ip: str) -> bool:
+    """Flujo de /auth/login con contraseña incorrecta; True si llegó a verificarla."""
+    locked, _, _ = check_login_attempt(username, ip)
+    if locked:
+        return False
+    time.sleep(0.01)  # verificación Argon2
+    register_login_fail(username, ip)
+    return True
+
+
+def _en_paralelo(r, n: int, fn) -> list:
+    # Conexiones abiertas de antemano: la carrera es entre los scripts, no en el connect
+    pool = r.connection_pool
+    conns = [pool.get_connection("PING") for _ in range(n)]
+    for c in conns:
+        c.connect()
+        pool.release(c)
+
+    barrera = threading.Barrier(n)
+    resultados = [None] * n
+
+    def worker(i):
+        barrera.wait()
+        resultados[i] = fn(i)
+
+    hilos = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return resultados
+
+
+def test_bloqueo_por_usuario_y_reset(redis_compartido):
+    for _ in range(settings.LOGIN_MAX_FAILS_PER_USER - 1):
+        assert _login_fallido("ana", "10.0.0.1")
+    assert check_login_attempt("ana", "10.0.0.1")[0] is False
+    locked, ttl, motivo = register_login_fail("ana", "10.0.0.1")
+    assert (locked, motivo) == (True, "user")
+    assert 0 < ttl <= settings.LOGIN_BLOCK_TTL_PER_USER_SECONDS
+
+    # Otro usuario desde la misma IP sigue pudiendo intentarlo
+    assert check_login_attempt("bea", "10.0.0.1")[0] is False
+    locked, _, motivo = check_login_attempt("ana", "10.0.0.2")
+    assert (locked, motivo) == (True, "user")
+
+    reset_login_counters_and_unlock("ana", "10.0.0.1")
+    assert check_login_attempt("ana", "10.0.0.1")[0] is False
+
+
+def test_devolver_intento_no_baja_de_cero(redis_compartido):
+    check_login_attempt("cris", "10.0.0.3")
+    check_login_attempt("cris", "10.0.0.3")
+    give_back_login_attempt("cris", "10.0.0.3")
+    assert redis_compartido.get("rl:login:user:cris:fails") == "1"
+    give_back_login_attempt("cris", "10.0.0.3")
+    give_back_login_attempt("cris", "10.0.0.3")
+    assert not redis_compartido.exists("rl:login:user:cris:fails", "rl:login:ip:10.0.0.3:fails")
+
+
+def test_100_logins_fallidos_en_paralelo_umbral_exacto(redis_compartido):
+    # Mismo usuario desde IPs distintas (credential stuffing distribuido)
+    verificados = _en_paralelo(redis_compartido, 100, lambda i: _login_fallido("victima", f"10.1.0.{i}"))
+
+    assert sum(verificados) == settings.LOGIN_MAX_FAILS_PER_USER
+    assert int(redis_compartido.get("rl:login:user:victima:fails")) == settings.LOGIN_MAX_FAILS_PER_USER
+    assert redis_compartido.ttl("rl:login:user:victima:lock") > 0
+
+
+def test_100_logins_fallidos_en_paralelo_misma_ip(redis_compartido):
+    # Usuarios distintos desde una IP: manda el umbral por IP
+    verificados = _en_paralelo(redis_compartido, 100, lambda i: _login_fallido(f"u{i}", "10.2.0.1"))
+
+    assert sum(verificados) == settings.LOGIN_MAX_FAILS_PER_IP
+    assert redis_compartido.ttl("rl:login:ip:10.2.0.1:lock") > 0
+    assert check_login_attempt("otro", "10.2.0.1")[2] == "ip"
@@ -0,0 +1,76 @@
+# backend/tests/core/test_nfc_guard.py
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import app.core.redis_client as redis_client_module
+from app.core.security import assert_nfc_guard
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # EVAL en fakeredis
+
+
+def _request(idem_key: str | None = None) -> Request:
+    headers = [(b"x-idempotency-key", idem_key.encode())] if idem_key else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    r = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client_module, "_client", r)
+    yield r
+    r.flushall()
+
+
+def test_guard_ok_registra_marcas(fake_redis):
+    assert_nfc_guard(_request("k1"), 7, " TAG-1 ", "retirar")
+
+    assert fake_redis.get("idempotency:k1") == "1"
+    assert fake_redis.ttl("debounce:nfc:7:tag-1:retirar") > 0
+    assert fake_redis.get("rate_limit:nfc:7:tag-1") == "1"
+
+
+def test_guard_idempotency_repetida_409(fake_redis):
+    assert_nfc_guard(_request("k2"), 1, "tag", "retirar")
+    with pytest.raises(HTTPException) as exc:
+        assert_nfc_guard(_request("k2"), 1, "otro-tag", "devolver")
+    assert exc.value.status_code == 409
+
+
+def test_guard_debounce_429_no_consume_idempotency(fake_redis):
+    assert_nfc_guard(_request(), 1, "tag", "retirar")
+    with pytest.raises(HTTPException) as exc:
+        assert_nfc_guard(_request("k3"), 1, "tag", "retirar")
+    assert exc.value.status_code == 429
+    # La petición rechazada no deja marcada su Idempotency-Key
+    assert fake_redis.get("idempotency:k3") is None
+
+
+def test_guard_rate_limit_429(fake_redis):
+    for i in range(3):
+        assert_nfc_guard(_request(), 1, "tag", f"accion{i}", limit=3)
+    with pytest.raises(HTTPException) as exc:
+        assert_nfc_guard(_request(), 1, "tag", "otra", limit=3)
+    assert exc.value.status_code == 429
+    assert "NFC" in exc.value.detail
+    assert fake_redis.get("rate_limit:nfc:1:tag") == "3"
+
+
+def test_guard_fail_open_si_redis_falla(monkeypatch):
+    class Roto:
+        def eval(self, *args):
+            raise ConnectionError("redis caído")
+
+        evalsha = eval
+
+    monkeypatch.setattr(redis_client_module, "_client", Roto())
+    assert_nfc_guard(_request("k4"), 1, "tag", "retirar")  # no lanza
+
+
+def test_guard_reutiliza_el_script_por_evalsha(fake_redis, monkeypatch):
+    assert_nfc_guard(_request(), 1, "tag-a", "retirar")
+    llamadas = []
+    monkeypatch.setattr(fake_redis, "eval", lambda *a: llamadas.append(a))
+    assert_nfc_guard(_request(), 1, "tag-b", "retirar")
+    assert llamadas == []  # segunda vez por EVALSHA, sin reenviar el script
@@ -0,0 +1,143 @@
+# backend/tests/core/test_particiones.py
+import gzip
+from datetime import date, datetime, timezone
+
+from sqlalchemy import event, text
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.core.particiones import archivar_particiones, asegurar_particiones, listar_particiones
+from app.models.movimiento import Movimiento
+from tests.utils import create_random_equipo, create_user, get_auth_headers
+
+
+def _particion_de(session, mov_id):
+    return session.exec(
+        text("SELECT tableoid::regclass::text FROM movimiento WHERE id = :id"), params={"id": mov_id}
+    ).scalar_one()
+
+
+def test_movimiento_va_a_la_particion_del_mes(session):
+    eq = create_random_equipo(session)
+    mov = Movimiento(equipo_id=eq.id)
+    session.add(mov)
+    session.commit()
+
+    assert _particion_de(session, mov.id) == f"movimiento_p{mov.fecha:%Y%m}"
+    # La identidad del ORM sigue siendo sólo el id
+    session.expunge_all()
+    assert session.get(Movimiento, mov.id).equipo_id == eq.id
+
+
+def test_crear_particion_recoge_filas_del_default(session):
+    eq = create_random_equipo(session)
+    mov = Movimiento(equipo_id=eq.id, fecha=datetime(2031, 3, 15, tzinfo=timezone.utc))
+    session.add(mov)
+    session.commit()
+    assert _particion_de(session, mov.id) == "movimiento_default"
+
+    creadas = session.exec(text("SELECT movimiento_asegurar_particiones('2031-03-01', 2)")).scalar_one()
+    assert creadas == 2
+    assert _particion_de(session, mov.id) == "movimiento_p203103"
+    # Idempotente
+    assert session.exec(text("SELECT movimiento_asegurar_particiones('2031-03-01', 2)")).scalar_one() == 0
+    assert asegurar_particiones(session) == 0
+
+
+def test_listado_por_fecha_solo_lee_su_particion(client, session):
+    """EXPLAIN de la consulta real de GET /movimientos con desde/hasta: poda de particiones."""
+    session.exec(text("SELECT movimiento_asegurar_particiones('2032-01-01', 4)"))
+    eq = create_random_equipo(session)
+    for mes in (1, 2, 3, 4):
+        session.add(Movimiento(equipo_id=eq.id, fecha=datetime(2032, mes, 10, tzinfo=timezone.utc)))
+    session.commit()
+
+    admin = create_user(session, role="ADMIN")
+    headers = get_auth_headers(client, admin.username)
+
+    capturadas = []
+    conn = session.connection()
+
+    def _capturar(conn, cursor, statement, parameters, context, executemany):
+        if "FROM movimiento" in statement:
+            capturadas.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", _capturar)
+    try:
+        r = client.get(
+            "/api/v1/movimientos",
+            params={"desde": "2032-02-01T00:00:00Z", "hasta": "2032-02-28T23:59:59Z"},
+            headers=headers,
+        )
+    finally:
+        event.remove(conn, "before_cursor_execute", _capturar)
+    assert r.status_code == 200
+    assert len(r.json()) == 1
+    assert capturadas
+
+    for statement, parameters in capturadas:
+        plan = "\n".join(
+            row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+        )
+        leidas = {p for p in ("movimiento_p203201", "movimiento_p203202", "movimiento_p203203",
+                              "movimiento_p203204", "movimiento_default") if p in plan}
+        assert leidas == {"movimiento_p203202"}, plan
+
+
+def test_archivar_separa_exporta_y_borra(tmp_path):
+    # Fuera del SAVEPOINT: DETACH/DROP necesitan datos confirmados
+    with Session(engine) as s:
+        s.exec(text("SELECT movimiento_asegurar_particiones('2001-01-01', 1)"))
+        eq = create_random_equipo(s)
+        s.add(Movimiento(equipo_id=eq.id, fecha=datetime(2001, 1, 20, tzinfo=timezone.utc), comentario="viejo"))
+        s.commit()
+        eq_id = eq.id
+
+    archivos = archivar_particiones(12, tmp_path)
+
+    assert archivos == [tmp_path / "movimiento_p200101.csv.gz"]
+    with gzip.open(archivos[0], "rt") as fh:
+        lineas = fh.read().splitlines()
+    assert lineas[0].startswith("id,equipo_id,fecha")
+    assert len(lineas) == 2 and "viejo" in lineas[1]
+
+    with Session(engine) as s:
+        assert all(p.mes > date(2001, 1, 1) for p in listar_particiones(s))
+        assert s.exec(
+            text("SELECT count(*) FROM movimiento WHERE equipo_id = :id"), params={"id": eq_id}
+        ).scalar_one() == 0
+        s.exec(text("DELETE FROM equipo WHERE id = :id"), params={"id": eq_id})
+        s.commit()
+
+
+def test_archivar_rescata_default_y_conservar_no_reexporta(tmp_path):
+    # Sin partición para 2002-03: la fila cae en movimiento_default
+    with Session(engine) as s:
+        eq = create_random_equipo(s)
+        mov = Movimiento(equipo_id=eq.id, fecha=datetime(2002, 3, 5, tzinfo=timezone.utc), comentario="huérfano")
+        s.add(mov)
+        s.commit()
+        assert _particion_de(s, mov.id) == "movimiento_default"
+        eq_id = eq.id
+
+    try:
+        archivos = archivar_particiones(12, tmp_path, borrar=False)
+        assert archivos == [tmp_path / "movimiento_p200203.csv.gz"]
+        with gzip.open(archivos[0], "rt") as fh:
+            assert "huérfano" in fh.read()
+        mtime = archivos[0].stat().st_mtime_ns
+
+        # Segunda pasada con --conservar: la tabla separada ya está exportada
+        assert archivar_particiones(12, tmp_path, borrar=False) == []
+        assert archivos[0].stat().st_mtime_ns == mtime
+        # Sin --conservar sólo queda borrarla
+        assert archivar_particiones(12, tmp_path) == archivos
+        assert archivos[0].stat().st_mtime_ns == mtime
+        with Session(engine) as s:
+            assert all(p.nombre != "movimiento_p200203" for p in listar_particiones(s))
+    finally:
+        with Session(engine) as s:
+            s.exec(text('DROP TABLE IF EXISTS "movimiento_p200203"'))
+            s.exec(text("DELETE FROM movimiento WHERE equipo_id = :id"), params={"id": eq_id})
+            s.exec(text("DELETE FROM equipo WHERE id = :id"), params={"id": eq_id})
+            s.commit()
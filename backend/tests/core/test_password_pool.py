@@ -0,0 +1,145 @@
+# backend/tests/core/test_password_pool.py
+import asyncio
+import threading
+
+import anyio.to_thread
+import pytest
+
+import app.core.password_pool as password_pool_module
+from app.core.config import settings
+from app.core.password_pool import PasswordPool, PasswordPoolBusy
+from tests.utils import create_user, TEST_PASSWORD
+
+
+@pytest.fixture
+def pool():
+    p = PasswordPool(workers=1, max_queue=1, timeout_seconds=5)
+    yield p
+    p.shutdown()
+
+
+def _ocupar(pool: PasswordPool, n: int) -> threading.Event:
+    """Lanza n tareas que se bloquean hasta que se active el evento devuelto."""
+    liberar = threading.Event()
+    for _ in range(n):
+        threading.Thread(target=pool.run, args=(liberar.wait,), daemon=True).start()
+    return liberar
+
+
+def _esperar(cond, timeout=2.0):
+    ev = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if cond():
+            return
+        ev.wait(0.01)
+    raise AssertionError("condición no alcanzada")
+
+
+def test_ejecuta_y_cuenta(pool):
+    assert pool.run(lambda a, b: a + b, 2, 3) == 5
+    stats = pool.stats()
+    assert stats["completed_total"] == 1
+    assert stats["running"] == 0 and stats["queued"] == 0
+
+
+def test_cola_llena_rechaza_al_momento(pool):
+    liberar = _ocupar(pool, 2)   # 1 ejecutando + 1 en cola
+    _esperar(lambda: pool.stats()["running"] == 1 and pool.stats()["queued"] == 1)
+
+    with pytest.raises(PasswordPoolBusy):
+        pool.run(lambda: None)
+    assert pool.stats()["rejected_total"] == 1
+
+    liberar.set()
+    _esperar(lambda: pool.stats()["completed_total"] == 2)
+    assert pool.run(lambda: "ok") == "ok"
+
+
+def test_timeout_no_pierde_el_hueco():
+    p = PasswordPool(workers=1, max_queue=0, timeout_seconds=0.05)
+    liberar = threading.Event()
+    try:
+        with pytest.raises(PasswordPoolBusy):
+            p.run(liberar.wait)
+        assert p.stats()["timeouts_total"] == 1
+        # La tarea sigue ocupando su hueco hasta terminar
+        with pytest.raises(PasswordPoolBusy):
+            p.run(lambda: None)
+        liberar.set()
+        _esperar(lambda: p.stats()["completed_total"] == 1)
+        assert p.run(lambda: 1) == 1
+    finally:
+        p.shutdown()
+
+
+def test_run_async_timeout_cancela_la_tarea_en_cola():
+    p = PasswordPool(workers=1, max_queue=1, timeout_seconds=0.05)
+    liberar = _ocupar(p, 1)
+    try:
+        _esperar(lambda: p.stats()["running"] == 1)
+        with pytest.raises(PasswordPoolBusy):
+            asyncio.run(p.run_async(lambda: None))
+        # La tarea en cola se cancela y devuelve su hueco al momento
+        assert p.stats()["running"] == 1 and p.stats()["queued"] == 0
+    finally:
+        liberar.set()
+        p.shutdown()
+
+
+def test_login_saturado_devuelve_503(client, session, monkeypatch, pool):
+    user = create_user(session, role="OPERARIO")
+    monkeypatch.setattr(password_pool_module, "_pool", pool)
+    liberar = _ocupar(pool, 2)
+    _esperar(lambda: pool.stats()["queued"] == 1)
+    try:
+        r = client.post("/api/auth/login", json={"username_or_email": user.username, "password": TEST_PASSWORD})
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == "1"
+    finally:
+        liberar.set()
+
+    _esperar(lambda: pool.stats()["completed_total"] == 2)
+    r = client.post("/api/auth/login", json={"username_or_email": user.username, "password": TEST_PASSWORD})
+    assert r.status_code == 200
+    assert client.get("/_meta/password-pool").json()["rejected_total"] == 1
+
+
+def test_login_en_cola_no_ocupa_hilos_del_threadpool(client, session, monkeypatch, pool):
+    user = create_user(session, role="OPERARIO")
+    monkeypatch.setattr(password_pool_module, "_pool", pool)
+    limiter = client.portal.call(anyio.to_thread.current_default_thread_limiter)
+    tokens = limiter.total_tokens
+    client.portal.call(setattr, limiter, "total_tokens", 1)
+    liberar = _ocupar(pool, 1)
+    _esperar(lambda: pool.stats()["running"] == 1)
+    resultado = {}
+    login = threading.Thread(target=lambda: resultado.update(r=client.post(
+        "/api/auth/login", json={"username_or_email": user.username, "password": TEST_PASSWORD})))
+    try:
+        login.start()
+        _esperar(lambda: pool.stats()["queued"] == 1)
+        # El login espera su Argon2 sin retener el único hilo de AnyIO
+        assert client.portal.call(lambda: limiter.borrowed_tokens) == 0
+        assert client.get("/").status_code == 200  # endpoint síncrono
+    finally:
+        liberar.set()
+        login.join()
+        client.portal.call(setattr, limiter, "total_tokens", tokens)
+    assert resultado["r"].status_code == 200
+
+
+def test_503_del_pool_no_cuenta_para_el_bloqueo(client, session, redis_client, monkeypatch, pool):
+    user = create_user(session, role="OPERARIO")
+    monkeypatch.setattr(password_pool_module, "_pool", pool)
+    liberar = _ocupar(pool, 2)
+    _esperar(lambda: pool.stats()["queued"] == 1)
+    body = {"username_or_email": user.username, "password": TEST_PASSWORD}
+    try:
+        for _ in range(settings.LOGIN_MAX_FAILS_PER_USER + 1):
+            assert client.post("/api/auth/login", json=body).status_code == 503
+        assert not redis_client.exists(f"rl:login:user:{user.username.lower()}:fails")
+    finally:
+        liberar.set()
+
+    _esperar(lambda: pool.stats()["completed_total"] == 2)
+    assert client.post("/api/auth/login", json=body).status_code == 200
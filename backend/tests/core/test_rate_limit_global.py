@@ -0,0 +1,97 @@
+# backend/tests/core/test_rate_limit_global.py
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+import app.middleware.rate_limit as rate_limit_middleware
+from app.core.rate_limit import LocalGCRA, allow_sliding_window, parse_rate
+from app.core.security import issue_access_token
+from app.middleware.rate_limit import RateLimitMiddleware
+
+
+def _cliente(rate="3/minute", overrides=None, trusted_proxies=(), peer="10.9.0.1") -> TestClient:
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/{path:path}", ok, methods=["GET", "POST"])])
+    middleware = RateLimitMiddleware(app, rate=rate, overrides=overrides or {}, trusted_proxies=trusted_proxies)
+    return TestClient(middleware, client=(peer, 50000))
+
+
+def test_parse_rate():
+    assert parse_rate("200/minute") == (200, 60)
+    assert parse_rate("50 / 5 minutes") == (50, 300)
+    assert parse_rate("10/second") == (10, 1)
+    assert parse_rate("off") is None and parse_rate("") is None and parse_rate("x/minute") is None
+
+
+def test_gcra_rafaga_y_429_con_cabeceras(redis_compartido):
+    c = _cliente()
+    rs = [c.get("/api/v1/equipos") for _ in range(4)]
+
+    assert [r.status_code for r in rs] == [200, 200, 200, 429]
+    assert [r.headers["RateLimit-Remaining"] for r in rs] == ["2", "1", "0", "0"]
+    assert all(r.headers["RateLimit-Limit"] == "3" for r in rs)
+    assert 19 <= int(rs[-1].headers["Retry-After"]) <= 20  # una petición cada 20 s
+    assert int(rs[-1].headers["RateLimit-Reset"]) == 60
+    # Memoria constante: una clave por cliente
+    assert len(redis_compartido.keys("rl:gcra:*")) == 1
+
+
+def test_clave_por_usuario_o_ip(redis_compartido):
+    c = _cliente(rate="1/minute")
+    t1, _ = issue_access_token(1, "OPERARIO")
+    t2, _ = issue_access_token(2, "OPERARIO")
+
+    assert c.get("/x", headers={"Authorization": f"Bearer {t1}"}).status_code == 200
+    assert c.get("/x", headers={"Authorization": f"Bearer {t1}"}).status_code == 429
+    assert c.get("/x", headers={"Authorization": f"Bearer {t2}"}).status_code == 200
+    # Sin token: por IP de la conexión; X-Forwarded-For de un cliente directo no cuenta
+    assert c.get("/x", headers={"X-Forwarded-For": "10.0.0.1"}).status_code == 200
+    assert c.get("/x", headers={"X-Forwarded-For": "10.0.0.2"}).status_code == 429
+
+
+def test_x_forwarded_for_solo_desde_proxy_de_confianza(redis_compartido):
+    c = _cliente(rate="1/minute", trusted_proxies=["172.16.0.0/12"], peer="172.16.0.5")
+
+    assert c.get("/x", headers={"X-Forwarded-For": "10.0.0.1"}).status_code == 200
+    # El cliente real es la última IP que no es de un proxy propio
+    assert c.get("/x", headers={"X-Forwarded-For": "1.2.3.4, 10.0.0.1, 172.16.0.9"}).status_code == 429
+    assert c.get("/x", headers={"X-Forwarded-For": "10.0.0.2"}).status_code == 200
+    assert c.get("/x", headers={"X-Real-IP": "10.0.0.3"}).status_code == 200
+
+
+def test_limites_por_ruta(redis_compartido):
+    c = _cliente(rate="2/minute", overrides={r"^/health$": "off", r"/export$": "1/minute"})
+
+    assert all(c.get("/health").status_code == 200 for _ in range(5))
+    assert "RateLimit-Limit" not in c.get("/health").headers
+    # Contador propio: no consume del global
+    assert [c.get("/api/v1/equipos/export").status_code for _ in range(2)] == [200, 429]
+    assert [c.get("/api/v1/equipos").status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_sin_redis_limita_en_local_sin_reintentar_cada_peticion(monkeypatch):
+    intentos = []
+
+    def sin_redis(*args):
+        intentos.append(args)
+        raise ConnectionError("Redis caído")
+
+    monkeypatch.setattr(rate_limit_middleware, "gcra", sin_redis)
+    c = _cliente(rate="2/minute")
+    assert [c.get("/x").status_code for _ in range(3)] == [200, 200, 429]
+    assert len(intentos) == 1  # circuit breaker: el resto, directamente en local
+
+
+def test_local_gcra_lru_acotada():
+    local = LocalGCRA(max_keys=2)
+    for k in ("a", "b", "c"):
+        assert local(k, 1, 60)[0]
+    assert not local("c", 1, 60)[0]
+    assert local("a", 1, 60)[0]  # 'a' salió de la LRU
+
+
+def test_sliding_window_no_colapsa_peticiones_del_mismo_segundo(redis_compartido):
+    assert [allow_sliding_window("k", 3, 60)[0] for _ in range(4)] == [True, True, True, False]
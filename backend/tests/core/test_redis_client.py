@@ -0,0 +1,43 @@
+# backend/tests/core/test_redis_client.py
+import pytest
+
+import app.core.redis_client as redis_client_module
+from app.core.config import settings
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    """Cliente compartido recién creado (sin el cliente inyectado por conftest)."""
+    monkeypatch.setattr(redis_client_module, "_client", None)
+    monkeypatch.setattr(redis_client_module, "_pool", None)
+    yield
+    redis_client_module.close_redis()
+
+
+def test_cliente_unico_y_pool_configurado(fresh_pool):
+    r1 = redis_client_module.get_redis()
+    r2 = redis_client_module.get_redis()
+    assert r1 is r2
+
+    kwargs = r1.connection_pool.connection_kwargs
+    assert kwargs["socket_timeout"] == settings.REDIS_SOCKET_TIMEOUT_SECONDS
+    assert kwargs["socket_connect_timeout"] == settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS
+    assert kwargs["retry_on_timeout"] is settings.REDIS_RETRY_ON_TIMEOUT
+    assert r1.connection_pool.max_connections == settings.REDIS_MAX_CONNECTIONS
+
+
+def test_pool_stats(fresh_pool):
+    assert redis_client_module.pool_stats()["initialized"] is False
+
+    assert redis_client_module.get_redis().ping()
+    stats = redis_client_module.pool_stats()
+    assert stats["initialized"] is True
+    assert stats["created"] == 1
+    assert stats["in_use"] == 0
+    assert stats["available"] == 1
+
+
+def test_meta_redis_expone_pool(client):
+    r = client.get("/_meta/redis")
+    assert r.status_code == 200
+    assert "max_connections" in r.json()["pool"]
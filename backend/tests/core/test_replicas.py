@@ -0,0 +1,105 @@
+# backend/tests/core/test_replicas.py
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+import app.core.replicas as replicas
+from app.core.config import settings
+from app.core.db import engine
+from app.core.deps import get_read_db
+from app.main import app
+from tests.utils import get_auth_headers
+
+# El propio servidor de tests hace de "réplica": basta para el enrutado
+# (el retraso de un primario se lee como NULL => sana).
+REPLICA_URL = settings.DATABASE_URL
+CAIDA_URL = "postgresql+psycopg://postgres:x@127.0.0.1:1/nada?connect_timeout=1"
+
+
+@pytest.fixture
+def router(monkeypatch):
+    created = []
+
+    def make(*urls):
+        r = replicas.ReplicaRouter(list(urls))
+        r.check_all()
+        monkeypatch.setattr(replicas, "_router", r)
+        created.append(r)
+        return r
+
+    yield make
+    for r in created:
+        r.stop()
+
+
+def test_round_robin_entre_replicas_sanas(router):
+    r = router(REPLICA_URL, REPLICA_URL)
+    assert all(x.healthy for x in r.replicas)
+    picks = [r.pick() for _ in range(4)]
+    assert picks[0] is picks[2] and picks[1] is picks[3]
+    assert picks[0] is not picks[1]
+
+
+def test_replica_caida_sale_de_rotacion(router, redis_compartido):
+    r = router(CAIDA_URL, REPLICA_URL)
+    caida, sana = r.replicas
+    assert caida.healthy is False and caida.error
+    assert {id(r.pick()) for _ in range(4)} == {id(sana)}
+
+    # Sin ninguna sana se lee del primario
+    sana.healthy = False
+    gen = replicas.get_read_session(user_id=1)
+    s = next(gen)
+    assert s.get_bind() is engine
+    gen.close()
+
+
+def test_read_your_writes(router, redis_compartido):
+    r = router(REPLICA_URL)
+    replicas.mark_recent_write(7)
+    assert redis_compartido.ttl("db:rw:7") <= settings.REPLICA_STICKY_SECONDS
+
+    assert replicas._pick_for(7) is None          # acaba de escribir: primario
+    assert replicas._pick_for(8) is r.replicas[0]  # otro usuario: réplica
+
+
+def test_sesion_async_respeta_read_your_writes(router, redis_compartido):
+    r = router(REPLICA_URL)
+    replicas.mark_recent_write(7)
+
+    async def bind_de(user_id):
+        gen = replicas.get_async_read_session(user_id)
+        s = await gen.__anext__()
+        bind = s.bind
+        await gen.aclose()
+        return bind
+
+    assert asyncio.run(bind_de(7)) is not r.replicas[0].async_engine
+    assert asyncio.run(bind_de(8)) is r.replicas[0].async_engine
+
+
+def test_lectura_por_replica_y_marca_tras_escritura(client, session, redis_client, router):
+    r = router(REPLICA_URL)
+    headers = get_auth_headers(client, "admin", "admin123")
+    app.dependency_overrides.pop(get_read_db, None)
+
+    resp = client.get("/api/v1/equipos/estadisticas/resumen", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["total_equipos"] >= 1
+
+    # Una escritura correcta fija las lecturas del admin al primario
+    admin_id = session.exec(text("SELECT id FROM usuario WHERE username = 'admin'")).scalar()
+    resp = client.post("/api/v1/secciones", json={"nombre": "Sección RYW"}, headers=headers)
+    assert resp.status_code == 201
+    assert redis_client.exists(f"db:rw:{admin_id}")
+    assert replicas._pick_for(admin_id) is None
+
+    # Una escritura fallida no marca
+    redis_client.delete(f"db:rw:{admin_id}")
+    resp = client.post("/api/v1/secciones", json={}, headers=headers)
+    assert resp.status_code == 422
+    assert not redis_client.exists(f"db:rw:{admin_id}")
+
+    meta = client.get("/_meta/replicas").json()
+    assert meta["enabled"] is True and meta["replicas"][0]["healthy"] is True
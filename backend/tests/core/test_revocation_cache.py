@@ -0,0 +1,146 @@
+# backend/tests/core/test_revocation_cache.py
+import time
+
+import pytest
+
+import app.core.redis_client as redis_client_module
+from app.core.revocation_cache import (
+    REVOCATION_CHANNEL,
+    RevocationCache,
+    start_revocation_cache,
+    stop_revocation_cache,
+)
+from app.core.security import (
+    decode_token,
+    is_epoch_revoked,
+    is_revoked,
+    issue_access_token,
+    issue_refresh_token,
+    revoke_all_user_tokens,
+    revoke_token,
+    revoke_token_by_payload,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    r = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client_module, "_client", r)
+    yield r
+    stop_revocation_cache()
+    r.flushall()
+
+
+def _esperar(cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_snapshot_inicial_y_negativos_locales(fake_redis):
+    fake_redis.setex("jwt:revoked:previo", 60, "1")
+    cache = start_revocation_cache()
+    assert _esperar(lambda: cache.ready)
+
+    assert cache.lookup("previo") is True
+    assert cache.lookup("otro") is False
+
+
+def test_refresh_revocado_solo_en_redis(fake_redis):
+    previo = decode_token(issue_refresh_token(1, "OPERARIO")[0])
+    revoke_token_by_payload(previo)
+    cache = start_revocation_cache()
+    assert _esperar(lambda: cache.ready)
+    assert cache.lookup(previo["jti"]) is False  # el snapshot lo salta
+
+    oyente = fake_redis.pubsub(ignore_subscribe_messages=True)
+    oyente.subscribe(REVOCATION_CHANNEL)
+    refresh = decode_token(issue_refresh_token(1, "OPERARIO")[0])
+    revoke_token_by_payload(refresh)
+    assert oyente.get_message(timeout=0.2) is None  # no se publica
+    assert cache.lookup(refresh["jti"]) is False
+    assert is_revoked(previo["jti"], strict=True) and is_revoked(refresh["jti"], strict=True)
+
+
+def test_revocacion_publicada_por_otro_proceso(fake_redis):
+    cache = start_revocation_cache()
+    assert _esperar(lambda: cache.ready)
+
+    # Otro worker: SETEX + PUBLISH
+    fake_redis.setex("jwt:revoked:remoto", 60, "1")
+    fake_redis.publish(REVOCATION_CHANNEL, "remoto:60")
+
+    assert _esperar(lambda: cache.lookup("remoto") is True)
+
+
+def test_is_revoked_sin_ir_a_redis_cuando_la_cache_esta_lista(fake_redis, monkeypatch):
+    cache = start_revocation_cache()
+    assert _esperar(lambda: cache.ready)
+    assert revoke_token("local", 60) is True
+    assert cache.lookup("local") is True
+
+    llamadas = []
+    monkeypatch.setattr(fake_redis, "exists", lambda *k: llamadas.append(k) or 0)
+    assert is_revoked("local") is True
+    assert is_revoked("no-revocado") is False
+    assert llamadas == []
+
+    # strict (refresh) siempre consulta Redis
+    is_revoked("no-revocado", strict=True)
+    assert len(llamadas) == 1
+
+
+def test_cache_no_lista_consulta_redis(fake_redis):
+    cache = RevocationCache()  # sin arrancar: no sincronizada
+    assert cache.lookup("x") is None
+
+    fake_redis.setex("jwt:revoked:x", 60, "1")
+    assert is_revoked("x") is True
+
+
+def test_epoca_de_token_por_pubsub_y_snapshot(fake_redis):
+    fake_redis.set("jwt:epoch:7", 2)
+    cache = start_revocation_cache()
+    assert _esperar(lambda: cache.ready)
+    assert cache.epoch("7") == 2
+    assert cache.epoch("8") == 0
+
+    # Otro worker: INCR + PUBLISH; los avisos atrasados no hacen retroceder
+    fake_redis.publish(REVOCATION_CHANNEL, "epoch:8:3")
+    fake_redis.publish(REVOCATION_CHANNEL, "epoch:8:1")
+    assert _esperar(lambda: cache.epoch("8") == 3)
+    assert cache.epoch("8") == 3
+
+
+def test_revoke_all_user_tokens_por_epoca(fake_redis):
+    cache = start_revocation_cache()
+    assert _esperar(lambda: cache.ready)
+    viejo = decode_token(issue_access_token(5, "OPERARIO")[0])
+    assert viejo["token_epoch"] == 0 and not is_epoch_revoked(viejo)
+
+    assert revoke_all_user_tokens(5) == 1
+    assert is_epoch_revoked(viejo)
+    assert is_epoch_revoked(viejo, strict=True)
+    nuevo = decode_token(issue_access_token(5, "OPERARIO")[0])
+    assert nuevo["token_epoch"] == 1 and not is_epoch_revoked(nuevo)
+    # Otros usuarios no se ven afectados
+    assert not is_epoch_revoked(decode_token(issue_access_token(6, "OPERARIO")[0]))
+
+
+def test_revoke_all_user_tokens_avisa_a_los_workers(fake_redis):
+    """INCR y PUBLISH van juntos: el aviso lleva la época nueva."""
+    otro_worker = RevocationCache()
+    otro_worker.start()
+    assert _esperar(lambda: otro_worker.ready)
+    try:
+        assert revoke_all_user_tokens(9) == 1
+        assert revoke_all_user_tokens(9) == 2
+        assert _esperar(lambda: otro_worker.epoch("9") == 2)
+        assert fake_redis.get("jwt:epoch:9") == "2"
+    finally:
+        otro_worker.stop()